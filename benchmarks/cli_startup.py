@@ -0,0 +1,56 @@
+"""
+Measures the import time of the cli entry point and the modules used by the commands.
+
+Usage: python benchmarks/cli_startup.py [--budget-ms 60]
+Exits with 1 if the entry point takes longer than the budget.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+MODULES = [
+    ('cli / --help', 'ok8deploy.ok8deploy'),
+    ('plan / deploy', 'ok8deploy.deploy.AppDeploy'),
+    ('reconcile', 'ok8deploy.deploy.Reconciler'),
+    ('backup', 'ok8deploy.backup.BackupGenerator'),
+    ('restore', 'ok8deploy.backup.BackupRestore'),
+]
+
+
+def import_time(module: str) -> int:
+    """
+    Returns the cumulative import time of the module in microseconds (python -X importtime)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], cwd=ROOT,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise Exception('Import time of ' + module + ' not found')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget-ms', dest='budget_ms', type=float, default=60,
+                        help='Max import time of the cli entry point')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for name, module in MODULES:
+        best = min(import_time(module) for _ in range(args.repeat))
+        results.append((name, module, best))
+        print(f'{name:<16}{module:<36}{best / 1000:>8.1f}ms')
+
+    entry_time = results[0][2] / 1000
+    if entry_time > args.budget_ms:
+        print(f'ERROR: The cli entry point takes {entry_time:.1f}ms, the budget is {args.budget_ms:.1f}ms')
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
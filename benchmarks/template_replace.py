@@ -0,0 +1,112 @@
+"""
+Compares the variable substitution of the YmlTemplateProcessor with the previous implementation,
+which called str.replace for every variable on every string and checked str(data) afterwards.
+
+Usage: python benchmarks/template_replace.py [--vars 300] [--objects 200]
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ok8deploy.processing.YmlTemplateProcessor import YmlTemplateProcessor  # noqa: E402
+
+
+class Config:
+    def __init__(self, replacements: Dict[str, any]):
+        self._replacements = replacements
+
+    def get_replacements(self) -> Dict[str, any]:
+        return dict(self._replacements)
+
+    def get_params(self):
+        return []
+
+
+class LegacyProcessor(YmlTemplateProcessor):
+    """
+    Substitution as implemented before: One str.replace per variable and string
+    """
+
+    def _walk_dict(self, replacements, data):
+        result = super()._walk_dict(replacements, data)
+        self._unresolved = '${' in str(data)
+        return result
+
+    def _replace(self, item: str, replacements):
+        for variable in list(replacements.keys()):
+            tag = '${' + variable + '}'
+            if tag not in item:
+                continue
+            value = self._get_value(replacements, variable)
+            if item == tag:
+                return value
+            item = item.replace(tag, str(value))
+
+        if isinstance(item, str):
+            self._missing_vars.extend(self.VAR_PATTERN.findall(item))
+        return item
+
+
+def create_objects(variables: int, objects: int):
+    rnd = random.Random(1)
+    names = [f'VAR_{index}' for index in range(variables)]
+    replacements = {name: f'value-{index}' for index, name in enumerate(names)}
+
+    def text():
+        tags = ''.join('${' + rnd.choice(names) + '}-' for _ in range(rnd.randint(0, 3)))
+        return tags + 'text'
+
+    items = []
+    for index in range(objects):
+        items.append({
+            'apiVersion': 'apps/v1', 'kind': 'Deployment', 'metadata': {'name': text(), 'labels': {'app': text()}},
+            'spec': {'template': {'spec': {'containers': [{
+                'name': 'app', 'image': '${' + rnd.choice(names) + '}', 'args': [text() for _ in range(5)],
+                'env': [{'name': f'ENV_{i}', 'value': text()} for i in range(20)],
+            }]}}},
+        })
+    return replacements, items
+
+
+def measure(processor_type, replacements, items, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        data = copy.deepcopy(items)
+        processor = processor_type(Config(replacements))
+        start = time.perf_counter()
+        for item in data:
+            processor.process(item)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+        result = data
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vars', type=int, default=300, help='Number of variables')
+    parser.add_argument('--objects', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    replacements, items = create_objects(args.vars, args.objects)
+    legacy_time, legacy_result = measure(LegacyProcessor, replacements, items, args.repeat)
+    current_time, current_result = measure(YmlTemplateProcessor, replacements, items, args.repeat)
+    if legacy_result != current_result:
+        print('ERROR: The output of both implementations differs')
+        exit(1)
+
+    print(f'{args.vars} variables, {args.objects} objects')
+    print(f'{"legacy":<10}{legacy_time * 1000:>10.1f}ms')
+    print(f'{"current":<10}{current_time * 1000:>10.1f}ms{legacy_time / current_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
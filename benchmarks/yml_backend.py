@@ -0,0 +1,108 @@
+"""
+Compares the pure python yml loader / dumper with the Yml backend (libyaml if available).
+
+Usage: python benchmarks/yml_backend.py [project folder ...]
+Without arguments a synthetic project tree is generated.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ok8deploy.utils.Yml import Yml  # noqa: E402
+
+
+def create_project(root: str, apps: int, files_per_app: int):
+    for app in range(apps):
+        app_dir = os.path.join(root, f'app-{app}')
+        os.makedirs(app_dir)
+        with open(os.path.join(app_dir, '_index.yml'), 'w') as f:
+            yaml.dump({'enabled': True, 'dc': {'name': f'app-{app}'}, 'vars': {'IMAGE': 'registry/app:1.0'}}, f)
+        for index in range(files_per_app):
+            docs = [
+                {'apiVersion': 'apps/v1', 'kind': 'Deployment', 'metadata': {'name': f'app-{app}-{index}'},
+                 'spec': {'replicas': 2, 'selector': {'matchLabels': {'app': f'app-{app}'}}, 'template': {
+                     'metadata': {'labels': {'app': f'app-{app}'}},
+                     'spec': {'containers': [{
+                         'name': 'app', 'image': '${IMAGE}', 'args': ['--port', '8080', '--verbose'],
+                         'env': [{'name': f'VAR_{i}', 'value': f'value {i}'} for i in range(10)],
+                         'ports': [{'containerPort': 8080, 'protocol': 'TCP'}],
+                         'resources': {'limits': {'cpu': '500m', 'memory': '256Mi'}},
+                     }]}}}},
+                {'apiVersion': 'v1', 'kind': 'Service', 'metadata': {'name': f'app-{app}-{index}'},
+                 'spec': {'ports': [{'port': 80, 'targetPort': 8080}], 'selector': {'app': f'app-{app}'}}},
+                {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': f'app-{app}-{index}'},
+                 'data': {'application.properties': '\n'.join(f'key.{i}=value {i}' for i in range(20)) + '\n',
+                          'settings.json': '{"enabled": true, "level": "info"}'}},
+            ]
+            with open(os.path.join(app_dir, f'objects-{index}.yml'), 'w') as f:
+                yaml.dump_all(docs, f)
+
+
+def find_files(roots):
+    paths = []
+    for root in roots:
+        for dir_path, _, files in os.walk(root):
+            paths.extend(os.path.join(dir_path, name) for name in files if name.endswith('.yml'))
+    return paths
+
+
+def measure(func, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('roots', nargs='*', help='Project folders, a synthetic project is used if not defined')
+    parser.add_argument('--apps', type=int, default=50)
+    parser.add_argument('--files', type=int, default=4, help='Files per app')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        roots = args.roots
+        if len(roots) == 0:
+            create_project(tmp_dir, args.apps, args.files)
+            roots = [tmp_dir]
+        contents = []
+        for path in find_files(roots):
+            with open(path) as f:
+                contents.append(f.read())
+
+    objects = [doc for content in contents for doc in Yml.load_all(content) if isinstance(doc, dict)]
+    print(f'{len(contents)} files, {len(objects)} documents, libyaml: {Yml.LIBYAML}')
+
+    def hash_python():
+        return [hashlib.md5(yaml.dump(data, sort_keys=True).encode('utf-8')).hexdigest() for data in objects]
+
+    def hash_backend():
+        return [hashlib.md5(Yml.dump(data).encode('utf-8')).hexdigest() for data in objects]
+
+    if hash_python() != hash_backend():
+        print('ERROR: The hashes of both dumpers differ')
+        exit(1)
+
+    results = [
+        ('parse', measure(lambda: [list(yaml.load_all(c, Loader=yaml.FullLoader)) for c in contents], args.repeat),
+         measure(lambda: [Yml.load_all(c) for c in contents], args.repeat)),
+        ('hash', measure(hash_python, args.repeat), measure(hash_backend, args.repeat)),
+    ]
+    print(f'{"":<8}{"python":>12}{"backend":>12}{"speedup":>10}')
+    for name, python_time, backend_time in results:
+        print(f'{name:<8}{python_time * 1000:>10.1f}ms{backend_time * 1000:>10.1f}ms{python_time / backend_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,37 +1,181 @@
-import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from typing import List, Optional
 
+from ok8deploy.backup.BackupWriter import ArchiveWriter, BackupWriter, DirectoryWriter, SnapshotWriter
 from ok8deploy.config.Config import ProjectConfig
+from ok8deploy.oc.Model import ApiResource, ItemDescription
+from ok8deploy.oc.Oc import K8Api
 from ok8deploy.utils.Log import Log
 
 
+class BackupMode:
+    DEFAULT_EXCLUDED_KINDS = ['events', 'pods', 'endpoints', 'endpointslices', 'nodes', 'componentstatuses']
+    """
+    Kinds which are changing all the time and are recreated by the cluster anyway
+    """
+
+    def __init__(self):
+        self.all_namespaces = False
+        """
+        True if each resource type should be listed once for the whole cluster instead of once per namespace
+        """
+
+        self.jobs = 1
+        """
+        Number of namespaces (or resource types if all_namespaces is set) which are processed concurrently
+        """
+
+        self.incremental = False
+        """
+        True if the objects should be stored content addressed, only objects which changed since
+        the previous snapshot are written
+        """
+
+        self.archive = False
+        """
+        True if all objects should be streamed into a single (compressed) tar archive
+        """
+
+        self.chunk_size = 500
+        """
+        Number of objects which are fetched per request
+        """
+
+        self.strip = False
+        """
+        True if server managed fields (managedFields, status) should be removed from the objects
+        """
+
+        self.include_kinds = []  # type: List[str]
+        """
+        Kinds / resource names which should be backed up, all kinds are backed up if empty
+        """
+
+        self.exclude_kinds = list(self.DEFAULT_EXCLUDED_KINDS)  # type: List[str]
+        """
+        Kinds / resource names which should be skipped, explicitly included kinds are never skipped
+        """
+
+        self.include_namespaces = []  # type: List[str]
+        """
+        Namespace patterns which should be backed up, all namespaces are backed up if empty
+        """
+
+        self.exclude_namespaces = []  # type: List[str]
+        """
+        Namespace patterns which should be skipped
+        """
+
+
 class BackupGenerator(Log):
     """
     Very crude backup implementation.
+    Each resource type is listed with a single call per namespace, the result is split into one file per object.
     """
 
-    def __init__(self, config: ProjectConfig):
+    def __init__(self, config: ProjectConfig, mode: Optional[BackupMode] = None):
         super().__init__()
         self._config = config
+        self._mode = mode or BackupMode()
 
     def create_backup(self, dir_name: str):
-        if not os.path.exists(dir_name):
-            os.mkdir(dir_name)
-
-        oc = self._config.create_oc()
-        namespaces = oc.get_namespaces()
-        apis = oc._exec(['api-resources', '--namespaced', '-o', 'name']).splitlines()
-        for namespace in namespaces:
-            namespace = namespace.split('/')[1]
-            self.log.info(f'Backup up namespace {namespace}')
-            oc.project(namespace)
-            for api in apis:
-                try:
-                    names = oc._exec(['get', api, '-o', 'name']).splitlines()
-                except Exception:
+        writer = self._create_writer(dir_name)
+        try:
+            oc = self._config.create_oc()
+            apis = self._get_apis(oc, namespaced=True)
+            cluster_apis = self._get_apis(oc, namespaced=False)
+            with ThreadPoolExecutor(max_workers=max(1, self._mode.jobs)) as executor:
+                # Cluster scoped objects only exist once
+                futures = [executor.submit(self._backup_api, oc, writer, api, None) for api in cluster_apis]
+                if self._mode.all_namespaces:
+                    futures.extend(executor.submit(self._backup_api, oc, writer, api, None) for api in apis)
+                else:
+                    namespaces = [namespace.split('/')[1] for namespace in oc.get_namespaces()]
+                    futures.extend(executor.submit(self._backup_namespace, oc, writer, apis, namespace)
+                                   for namespace in namespaces if self._is_namespace_included(namespace))
+                for future in futures:
+                    future.result()
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+
+    def _get_apis(self, oc: K8Api, namespaced: bool) -> List[ApiResource]:
+        """
+        Returns all resource types which should be backed up
+        :param oc: Client
+        :param namespaced: True for namespaced resources, False for cluster scoped ones
+        :return: Resources which can be listed and are not excluded
+        """
+        apis = []
+        for api in oc.get_api_resources(namespaced=namespaced):
+            if 'list' not in api.verbs:
+                continue
+            if not self._is_kind_included(api):
+                self.log.debug(f'Skipping api {api.get_full_name()}')
+                continue
+            apis.append(api)
+        return apis
+
+    def _is_kind_included(self, api: ApiResource) -> bool:
+        if any(api.matches(kind) for kind in self._mode.include_kinds):
+            return True
+        if len(self._mode.include_kinds) > 0:
+            return False
+        return not any(api.matches(kind) for kind in self._mode.exclude_kinds)
+
+    def _is_namespace_included(self, namespace: str) -> bool:
+        if len(self._mode.include_namespaces) > 0 and \
+                not any(fnmatch(namespace, pattern) for pattern in self._mode.include_namespaces):
+            return False
+        return not any(fnmatch(namespace, pattern) for pattern in self._mode.exclude_namespaces)
+
+    def _create_writer(self, dir_name: str) -> BackupWriter:
+        if self._mode.incremental and self._mode.archive:
+            raise Exception('Failed: incremental backups can\'t be written into an archive')
+        if self._mode.incremental:
+            return SnapshotWriter(dir_name)
+        if self._mode.archive:
+            return ArchiveWriter(dir_name)
+        return DirectoryWriter(dir_name)
+
+    def _backup_namespace(self, oc: K8Api, writer: BackupWriter, apis: List[ApiResource], namespace: str):
+        self.log.info(f'Backing up namespace {namespace}')
+        for api in apis:
+            self._backup_api(oc, writer, api, namespace)
+
+    def _backup_api(self, oc: K8Api, writer: BackupWriter, api: ApiResource, namespace: Optional[str]):
+        """
+        Writes all objects of the given resource type
+        :param oc: Client
+        :param writer: Output
+        :param api: Resource type
+        :param namespace: Namespace, all namespaces are backed up if not defined (or the resource is cluster scoped)
+        :raise Exception: Gets raised if the objects could not be listed, the backup would be incomplete
+        """
+        count = 0
+        filter_namespaces = namespace is None and api.namespaced
+        try:
+            for item in oc.iter_all(api, namespace, self._mode.chunk_size):
+                if filter_namespaces and not self._is_namespace_included(item.data['metadata'].get('namespace', '')):
                     continue
-                self.log.info(f'Backing up api {api}')
-                for item in names:
-                    output = oc._exec(['get', item, '-o', 'yaml'])
-                    file_name = namespace + '_' + item.replace('/', '_') + '.yaml'
-                    with open(os.path.join(dir_name, file_name), 'w') as f:
-                        f.write(output)
+                if self._mode.strip:
+                    self._strip(item)
+                writer.write(item)
+                count += 1
+        except Exception as e:
+            # Only listable kinds are backed up, so this is a real failure (auth, network, expired continue token)
+            location = namespace or 'all namespaces'
+            self.log.error(f'Could not list {api.get_full_name()} in {location} after {count} objects: {e}')
+            raise Exception(f'Failed: backup of {api.get_full_name()} in {location} is incomplete') from e
+        if count > 0:
+            self.log.info(f'Backed up api {api.get_full_name()} ({count} objects)')
+
+    @staticmethod
+    def _strip(item: ItemDescription):
+        """
+        Removes fields which are managed by the server
+        """
+        item.data.pop('status', None)
+        item.data.get('metadata', {}).pop('managedFields', None)
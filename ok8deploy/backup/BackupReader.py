@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import tarfile
+from abc import abstractmethod
+from typing import Iterator, Optional, Tuple
+
+from ok8deploy.backup.SnapshotStore import SnapshotStore
+
+
+class BackupReader:
+    """
+    Reads the objects of a backup created by the BackupGenerator
+    """
+
+    @abstractmethod
+    def read(self) -> Iterator[Tuple[str, bytes]]:
+        """
+        Reads all objects
+        :return: Backup file name and content of each object
+        """
+        raise NotImplemented
+
+    @staticmethod
+    def create(path: str, snapshot: Optional[str] = None) -> BackupReader:
+        """
+        Creates a reader for the given backup
+        :param path: Backup folder, incremental backup folder or archive
+        :param snapshot: Snapshot which should be read (incremental backups only), the latest one if not defined
+        :return: Reader
+        """
+        if os.path.isfile(path):
+            return ArchiveReader(path)
+        if os.path.isdir(os.path.join(path, SnapshotStore.SNAPSHOT_DIR)):
+            return SnapshotReader(path, snapshot)
+        if os.path.isdir(path):
+            return DirectoryReader(path)
+        raise FileNotFoundError('Backup not found: ' + path)
+
+
+class DirectoryReader(BackupReader):
+    def __init__(self, dir_name: str):
+        self._dir_name = dir_name
+
+    def read(self) -> Iterator[Tuple[str, bytes]]:
+        for entry in sorted(os.scandir(self._dir_name), key=lambda x: x.name):
+            if not entry.is_file() or not entry.name.endswith('.yaml'):
+                continue
+            with open(entry.path, 'rb') as f:
+                yield entry.name, f.read()
+
+
+class SnapshotReader(BackupReader):
+    def __init__(self, dir_name: str, snapshot: Optional[str]):
+        self._store = SnapshotStore(dir_name)
+        self._snapshot = snapshot
+
+    def read(self) -> Iterator[Tuple[str, bytes]]:
+        return self._store.read_snapshot(self._snapshot)
+
+
+class ArchiveReader(BackupReader):
+    def __init__(self, path: str):
+        self._path = path
+
+    def read(self) -> Iterator[Tuple[str, bytes]]:
+        with open(self._path, 'rb') as f:
+            if self._path.endswith('.zst'):
+                try:
+                    import zstandard
+                except ImportError:
+                    raise Exception('Failed: zstd compression requires the "zstandard" package')
+                stream = zstandard.ZstdDecompressor().stream_reader(f)
+                mode = 'r|'
+            else:
+                stream = f
+                mode = 'r|*'
+            with tarfile.open(fileobj=stream, mode=mode) as tar:
+                for info in tar:
+                    if not info.isfile():
+                        continue
+                    yield info.name, tar.extractfile(info).read()
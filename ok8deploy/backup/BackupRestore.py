@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from typing import Dict, List, Optional
+
+from ok8deploy.backup.BackupReader import BackupReader
+from ok8deploy.config.Config import ProjectConfig
+from ok8deploy.deploy.OcObjectDeployer import OcObjectDeployer, ChangedObject
+from ok8deploy.oc.Oc import K8Api
+from ok8deploy.utils.Log import Log
+from ok8deploy.utils.Yml import Yml
+
+
+class RestoreMode:
+    def __init__(self):
+        self.snapshot = None  # type: Optional[str]
+        """
+        Snapshot which should be restored (incremental backups only), the latest one is used if not defined
+        """
+
+        self.jobs = 1
+        """
+        Number of namespaces which are restored concurrently
+        """
+
+        self.include_namespaces = []  # type: List[str]
+        """
+        Namespace patterns which should be restored, all namespaces (and cluster scoped objects) are restored if empty.
+        Of the cluster scoped objects only the matching namespaces are restored
+        """
+
+
+class BackupRestore(Log):
+    """
+    Restores the objects of a backup.
+    Cluster scoped objects are restored first, afterwards each namespace is restored by its own worker.
+    """
+
+    KIND_ORDER = ['Namespace', 'CustomResourceDefinition', 'StorageClass', 'PriorityClass', 'ClusterRole',
+                  'ClusterRoleBinding', 'PersistentVolume', 'ResourceQuota', 'LimitRange', 'ServiceAccount',
+                  'Secret', 'ConfigMap', 'PersistentVolumeClaim', 'Role', 'RoleBinding', 'Service', None,
+                  'ReplicaSet', 'Deployment', 'DeploymentConfig', 'StatefulSet', 'DaemonSet', 'Job', 'CronJob',
+                  'Ingress', 'Route', 'HorizontalPodAutoscaler']
+    """
+    Objects are restored in this order, None is the position of all other kinds
+    """
+
+    SERVER_FIELDS = ['uid', 'resourceVersion', 'creationTimestamp', 'generation', 'managedFields', 'selfLink',
+                     'deletionTimestamp', 'deletionGracePeriodSeconds']
+    """
+    Metadata fields which are set by the server
+    """
+
+    def __init__(self, config: ProjectConfig, mode: Optional[RestoreMode] = None):
+        super().__init__()
+        self._config = config
+        self._mode = mode or RestoreMode()
+
+    def restore(self, path: str):
+        """
+        Restores the given backup
+        :param path: Backup folder or archive
+        :raise Exception: Gets raised if at least one object could not be restored
+        """
+        groups = {}  # type: Dict[Optional[str], List[dict]]
+        skipped = 0
+        for file_name, content in BackupReader.create(path, self._mode.snapshot).read():
+            data = Yml.load(content)
+            if not self._sanitize(data):
+                skipped += 1
+                continue
+            namespace = data['metadata'].get('namespace')
+            if not self._is_included(data):
+                continue
+            groups.setdefault(namespace, []).append(data)
+        if skipped > 0:
+            self.log.info(f'Skipping {skipped} objects which are managed by other objects')
+
+        oc = self._config.create_oc()
+        failed = []
+        if None in groups:
+            failed.extend(self._restore_group(oc, None, groups.pop(None)))
+        with ThreadPoolExecutor(max_workers=max(1, self._mode.jobs)) as executor:
+            futures = [executor.submit(self._restore_group, oc, namespace, objects)
+                       for namespace, objects in groups.items()]
+            for future in futures:
+                failed.extend(future.result())
+
+        if len(failed) > 0:
+            raise Exception('The following objects could not be restored: ' + str(failed))
+
+    def _is_included(self, data: dict) -> bool:
+        if len(self._mode.include_namespaces) == 0:
+            return True
+        namespace = data['metadata'].get('namespace')
+        if namespace is None:
+            if data['kind'] != 'Namespace':
+                return False
+            # The namespace has to exist before its objects can be restored into a new cluster
+            namespace = data['metadata']['name']
+        return any(fnmatch(namespace, pattern) for pattern in self._mode.include_namespaces)
+
+    def _restore_group(self, oc: K8Api, namespace: Optional[str], objects: List[dict]) -> List[str]:
+        """
+        Applies the given objects in dependency order, the objects are sent in batches
+        :param oc: Client
+        :param namespace: Namespace of all objects, None for cluster scoped objects
+        :param objects: Objects
+        :return: Names of all objects which could not be restored
+        """
+        self.log.info(f'Restoring {len(objects)} objects in {namespace or "cluster scope"}')
+        objects.sort(key=self._get_order)
+        items = [ChangedObject(data, None) for data in objects]
+        failed = []
+        for chunk in OcObjectDeployer.create_chunks(items, OcObjectDeployer.MAX_BATCH_BYTES):
+            try:
+                oc.apply(Yml.dump({
+                    'apiVersion': 'v1',
+                    'kind': 'List',
+                    'items': [item.data for item in chunk]
+                }), namespace)
+                continue
+            except Exception as e:
+                self.log.warning(f'Failed to restore batch, retrying per object: {e}')
+
+            for item in chunk:
+                try:
+                    oc.apply(item.str_repr, namespace)
+                except Exception as e:
+                    self.log.error(f'Failed to restore {item.item_name}: {e}')
+                    failed.append(item.item_name)
+        return failed
+
+    def _get_order(self, data: dict) -> int:
+        kind = data['kind']
+        if kind in self.KIND_ORDER:
+            return self.KIND_ORDER.index(kind)
+        return self.KIND_ORDER.index(None)
+
+    def _sanitize(self, data: dict) -> bool:
+        """
+        Removes all fields which are set by the server
+        :param data: Object
+        :return: False if the object is managed by another object and should not be restored
+        """
+        metadata = data['metadata']
+        if len(metadata.get('ownerReferences') or []) > 0:
+            return False
+
+        data.pop('status', None)
+        for key in self.SERVER_FIELDS:
+            metadata.pop(key, None)
+        annotations = metadata.get('annotations') or {}
+        annotations.pop('kubectl.kubernetes.io/last-applied-configuration', None)
+
+        if data['kind'] == 'Service':
+            # Cluster ips are assigned by the server
+            spec = data.get('spec', {})
+            if spec.get('clusterIP') != 'None':
+                spec.pop('clusterIP', None)
+                spec.pop('clusterIPs', None)
+        if data['kind'] == 'PersistentVolume':
+            # The claim is recreated with a new uid, the volume would stay released otherwise.
+            # Name and namespace are kept, so the volume is bound to the restored claim again
+            claim_ref = data.get('spec', {}).get('claimRef') or {}
+            claim_ref.pop('uid', None)
+            claim_ref.pop('resourceVersion', None)
+        return True
@@ -0,0 +1,189 @@
+import io
+import os
+import tarfile
+import threading
+import time
+from abc import abstractmethod
+from typing import Dict, Optional
+
+from ok8deploy.backup.SnapshotStore import SnapshotStore
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.utils.Log import Log
+from ok8deploy.utils.Yml import Yml
+
+
+class BackupWriter(Log):
+    """
+    Stores the objects of a backup.
+    Writers are called by multiple threads concurrently.
+    """
+
+    def __init__(self, dir_name: str):
+        super().__init__()
+        self._dir_name = dir_name
+
+    @abstractmethod
+    def write(self, item: ItemDescription):
+        """
+        Stores a single object
+        :param item: Object
+        """
+        raise NotImplemented
+
+    def close(self):
+        """
+        Gets called once all objects have been written
+        """
+        pass
+
+    def abort(self):
+        """
+        Gets called instead of close() if the backup failed
+        """
+        pass
+
+    @staticmethod
+    def get_file_name(item: ItemDescription) -> str:
+        """
+        Returns the backup file name of the given object
+        :param item: Object
+        :return: File name in the format <namespace>_<kind>.<group>_<name>.yaml
+        """
+        data = item.data
+        kind = data['kind'].lower()
+        api_version = data.get('apiVersion', '')
+        if '/' in api_version:
+            kind += '.' + api_version.split('/')[0]
+        namespace = data['metadata'].get('namespace', '')
+        return namespace + '_' + kind + '_' + item.get_name() + '.yaml'
+
+    @staticmethod
+    def dump(item: ItemDescription) -> str:
+        return Yml.dump(item.data)
+
+
+class DirectoryWriter(BackupWriter):
+    """
+    Writes each object into its own file
+    """
+
+    def __init__(self, dir_name: str):
+        super().__init__(dir_name)
+        os.makedirs(dir_name, exist_ok=True)
+
+    def write(self, item: ItemDescription):
+        with open(os.path.join(self._dir_name, self.get_file_name(item)), 'w') as f:
+            f.write(self.dump(item))
+
+
+class SnapshotWriter(BackupWriter):
+    """
+    Writes the objects into a SnapshotStore.
+    Objects whose uid and resourceVersion match the previous snapshot are neither serialized nor written again.
+    """
+
+    def __init__(self, dir_name: str):
+        super().__init__(dir_name)
+        self._store = SnapshotStore(dir_name)
+        self._previous = self._store.load_manifest()
+        self._entries = {}  # type: Dict[str, Dict[str, str]]
+        self._lock = threading.Lock()
+        self.unchanged = 0
+        """
+        Number of objects which have been taken over from the previous snapshot
+        """
+
+    def write(self, item: ItemDescription):
+        file_name = self.get_file_name(item)
+        metadata = item.data['metadata']
+        entry = {
+            'uid': metadata.get('uid', ''),
+            'resourceVersion': metadata.get('resourceVersion', ''),
+        }
+
+        previous = self._previous.get(file_name)
+        if previous is not None and entry['resourceVersion'] != '' \
+                and previous['uid'] == entry['uid'] \
+                and previous['resourceVersion'] == entry['resourceVersion'] \
+                and self._store.has_blob(previous['hash']):
+            entry['hash'] = previous['hash']
+            with self._lock:
+                self.unchanged += 1
+                self._entries[file_name] = entry
+            return
+
+        entry['hash'] = self._store.write_blob(self.dump(item).encode('utf-8'))
+        with self._lock:
+            self._entries[file_name] = entry
+
+    def close(self):
+        name = self._store.save_manifest(self._entries)
+        self.log.info(f'Created snapshot {name} with {len(self._entries)} objects '
+                      f'({self.unchanged} unchanged since the previous snapshot)')
+
+
+class ArchiveWriter(BackupWriter):
+    """
+    Streams all objects into a single tar archive.
+    The compression is chosen by the file extension (.tar, .tar.gz / .tgz or .tar.zst),
+    zstd requires the optional "zstandard" package.
+    The archive is written to a temporary file which is renamed once the backup is complete,
+    so an aborted backup never leaves an archive which looks valid.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(os.path.dirname(path))
+        self._lock = threading.Lock()
+        self._path = path
+        self._tmp_path = path + '.partial'
+        self._file = open(self._tmp_path, 'wb')
+        self._compressor = None  # type: Optional[io.RawIOBase]
+        self._tar = None  # type: Optional[tarfile.TarFile]
+        try:
+            if path.endswith('.tar'):
+                self._tar = tarfile.open(fileobj=self._file, mode='w|')
+            elif path.endswith('.zst'):
+                self._compressor = self._create_zstd_writer(self._file)
+                self._tar = tarfile.open(fileobj=self._compressor, mode='w|')
+            else:
+                self._tar = tarfile.open(fileobj=self._file, mode='w|gz')
+        except BaseException:
+            self.abort()
+            raise
+
+    def write(self, item: ItemDescription):
+        content = self.dump(item).encode('utf-8')
+        info = tarfile.TarInfo(self.get_file_name(item))
+        info.size = len(content)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        with self._lock:
+            self._tar.addfile(info, io.BytesIO(content))
+
+    def close(self):
+        self._tar.close()
+        if self._compressor is not None:
+            self._compressor.close()
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+
+    def abort(self):
+        try:
+            # The streams would be flushed into the closed file otherwise
+            if self._tar is not None:
+                self._tar.close()
+            if self._compressor is not None:
+                self._compressor.close()
+        except Exception as e:
+            self.log.debug(f'Could not close the partial archive: {e}')
+        finally:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+    @staticmethod
+    def _create_zstd_writer(file):
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception('Failed: zstd compression requires the "zstandard" package')
+        return zstandard.ZstdCompressor().stream_writer(file)
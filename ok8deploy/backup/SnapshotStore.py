@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class SnapshotStore:
+    """
+    Content addressed backup storage.
+    Object bodies are stored once as blobs named by the hash of their content,
+    each backup run writes a manifest which maps the objects of that run to their blob.
+
+    Layout:
+    - objects/<hash[:2]>/<hash>.yaml
+    - snapshots/<timestamp>.json
+    """
+
+    BLOB_DIR = 'objects'
+    SNAPSHOT_DIR = 'snapshots'
+
+    def __init__(self, root: str):
+        self._root = root
+
+    def get_snapshots(self) -> List[str]:
+        """
+        Returns the names of all snapshots, oldest first
+        """
+        snapshot_dir = os.path.join(self._root, self.SNAPSHOT_DIR)
+        if not os.path.isdir(snapshot_dir):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(snapshot_dir) if name.endswith('.json'))
+
+    def load_manifest(self, name: Optional[str] = None) -> Dict[str, Dict[str, str]]:
+        """
+        Loads the manifest of a snapshot
+        :param name: Snapshot name, the latest snapshot is used if not defined
+        :return: Entries by backup file name, each entry contains the uid, resourceVersion and hash of the object.
+        Empty if there is no snapshot yet
+        """
+        if name is None:
+            snapshots = self.get_snapshots()
+            if len(snapshots) == 0:
+                return {}
+            name = snapshots[-1]
+        with open(os.path.join(self._root, self.SNAPSHOT_DIR, name + '.json'), 'r') as f:
+            return json.load(f)['objects']
+
+    def save_manifest(self, entries: Dict[str, Dict[str, str]]) -> str:
+        """
+        Stores a new snapshot
+        :param entries: Entries by backup file name
+        :return: Snapshot name
+        """
+        name = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        data = json.dumps({'objects': entries}, sort_keys=True, indent=1).encode('utf-8')
+        self._write_atomic(os.path.join(self._root, self.SNAPSHOT_DIR, name + '.json'), data)
+        return name
+
+    def write_blob(self, content: bytes) -> str:
+        """
+        Stores the given content, nothing is written if a blob with the same content exists already
+        :param content: Object body
+        :return: Hash of the content
+        """
+        hash_val = hashlib.sha256(content).hexdigest()
+        path = self._get_blob_path(hash_val)
+        if not os.path.exists(path):
+            self._write_atomic(path, content)
+        return hash_val
+
+    def has_blob(self, hash_val: str) -> bool:
+        return os.path.exists(self._get_blob_path(hash_val))
+
+    def read_blob(self, hash_val: str) -> bytes:
+        with open(self._get_blob_path(hash_val), 'rb') as f:
+            return f.read()
+
+    def read_snapshot(self, name: Optional[str] = None) -> Iterator[Tuple[str, bytes]]:
+        """
+        Reads all objects of a snapshot
+        :param name: Snapshot name, the latest snapshot is used if not defined
+        :return: Backup file name and content of each object
+        """
+        for file_name, entry in sorted(self.load_manifest(name).items()):
+            yield file_name, self.read_blob(entry['hash'])
+
+    def export(self, dir_name: str, name: Optional[str] = None):
+        """
+        Writes all objects of a snapshot as individual files (same layout as a non incremental backup)
+        :param dir_name: Target directory
+        :param name: Snapshot name, the latest snapshot is used if not defined
+        """
+        os.makedirs(dir_name, exist_ok=True)
+        for file_name, content in self.read_snapshot(name):
+            with open(os.path.join(dir_name, file_name), 'wb') as f:
+                f.write(content)
+
+    def _get_blob_path(self, hash_val: str) -> str:
+        return os.path.join(self._root, self.BLOB_DIR, hash_val[:2], hash_val + '.yaml')
+
+    @staticmethod
+    def _write_atomic(path: str, content: bytes):
+        """
+        Writes the file via a temporary file so an interrupted run never leaves partial files behind
+        """
+        dir_name = os.path.dirname(path)
+        os.makedirs(dir_name, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
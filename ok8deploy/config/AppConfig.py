@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from typing import List, Optional, Dict
 
 from ok8deploy.config.BaseConfig import BaseConfig
@@ -17,6 +18,10 @@ class AppConfig(BaseConfig):
     def __init__(self, config_root: str, path: Optional[str], external_vars: Dict[str, str] = None):
         super().__init__(path, external_vars)
         self._config_root = config_root
+        self._yml_files = None  # type: Optional[List[str]]
+        """
+        Caching field
+        """
 
     def get_config_maps(self) -> List[ConfigMap]:
         """
@@ -43,6 +48,26 @@ class AppConfig(BaseConfig):
         """
         return self._config_root
 
+    def get_yml_files(self) -> List[str]:
+        """
+        Returns the path of all object files (yml files not starting with "_") inside the app config folder
+        :return: File paths
+        """
+        if self._yml_files is None:
+            self._yml_files = self.find_yml_files(self._config_root)
+        return self._yml_files
+
+    @staticmethod
+    def find_yml_files(folder: str) -> List[str]:
+        """
+        Returns the path of all object files (yml files not starting with "_") inside the given folder
+        :param folder: App config folder
+        :return: File paths
+        """
+        with os.scandir(folder) as entries:
+            return [entry.path for entry in entries
+                    if entry.name.endswith('.yml') and not entry.name.startswith('_') and entry.is_file()]
+
     def get_for_each(self) -> List[AppConfig]:
         """
         Returns all instances of this app which should be created.
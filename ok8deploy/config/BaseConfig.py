@@ -2,7 +2,7 @@ import os
 from typing import Dict, List, Optional
 
 from ok8deploy.config.YmlConfig import YmlConfig
-from ok8deploy.processing.ValueLoader import ValueLoaderFactory
+from ok8deploy.processing.ValueLoader import ValueLoaderFactory, LazyValue
 from ok8deploy.processing.YmlTemplateProcessor import YmlTemplateProcessor
 
 
@@ -16,7 +16,7 @@ class BaseConfig(YmlConfig):
         if external_vars is not None:
             self._external_vars = external_vars
 
-        self._replacements = {}  # type: Dict[str, str]
+        self._replacements = None  # type: Optional[Dict[str, any]]
         """
         Caching field
         """
@@ -38,10 +38,21 @@ class BaseConfig(YmlConfig):
 
         :return: Key, value map
         """
-        if len(self._replacements) > 0:
-            return self._replacements
+        if self._replacements is None:
+            self._replacements = self._load_vars()
 
-        items = self.data.get('vars', {})
+        # The cached vars are shared, the external vars are applied to a copy
+        items = dict(self._replacements)
+        items.update(self._external_vars)
+        return items
+
+    def _load_vars(self) -> Dict[str, any]:
+        """
+        Returns the declared variables including the values of all loaders
+        :return: Key, value map
+        """
+        # Copy the vars, the config might be shared between threads
+        items = dict(self.data.get('vars', {}))
         new_items = {}
         for key, value in items.items():
             # Value can be a primitive or object
@@ -49,14 +60,13 @@ class BaseConfig(YmlConfig):
                 # Is a object, use a loader to load the value
                 loader_name = value.get('loader')
                 if loader_name is not None:
+                    # The loader is only executed once one of its values is used
                     loader = ValueLoaderFactory.create(self, value['loader'])
-                    new_values = loader.load(value)
-                    for new_key, new_val in new_values.items():
-                        new_items[key + new_key] = new_val
+                    for new_key in loader.get_keys():
+                        new_items[key + new_key] = LazyValue(loader, value, new_key)
                     continue
 
         items.update(new_items)
-        items.update(self._external_vars)
         return items
 
     def get_params(self) -> List[str]:
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import os
-from typing import Optional, Dict, List
+import threading
+from typing import Optional, Dict, List, Tuple
 
 from ok8deploy.config.AppConfig import AppConfig
 from ok8deploy.config.BaseConfig import BaseConfig
@@ -9,6 +10,7 @@ from ok8deploy.oc.Oc import Oc, K8, K8Api
 from ok8deploy.processing.DataPreProcessor import DataPreProcessor, OcToK8PreProcessor
 from ok8deploy.processing.YmlTemplateProcessor import YmlTemplateProcessor
 from ok8deploy.utils.Errors import ConfigError
+from ok8deploy.utils.YmlCache import YmlCache
 
 
 class RunMode:
@@ -28,6 +30,22 @@ class RunMode:
         True if changes should be previewed
         """
 
+        self.batch_apply = False
+        """
+        True if all changed objects of an app should be applied together
+        """
+
+        self.render_cache = False
+        """
+        True if the rendered objects should be cached between runs.
+        The objects contain the values of loaders, so this is opt-in
+        """
+
+        self.changed_only = False
+        """
+        True if instances whose inputs didn't change since their last successful deployment should be skipped
+        """
+
 
 class ProjectConfig(BaseConfig):
     """
@@ -37,8 +55,14 @@ class ProjectConfig(BaseConfig):
     def __init__(self, config_root: str, path: str):
         super().__init__(path)
         self._config_root = config_root
-        self._oc = None
+        self._oc = None  # type: Optional[K8Api]
+        self._oc_lock = threading.Lock()
         self._library = None  # type: Optional[ProjectConfig]
+        self._templates = {}  # type: Dict[str, Tuple[Tuple[int, int, int], AppConfig]]
+        """
+        Loaded templates by name, including the fingerprint of their folder
+        """
+        self._templates_lock = threading.Lock()
 
         inherit = self.data.get('inherit')
         if inherit is not None:
@@ -58,6 +82,12 @@ class ProjectConfig(BaseConfig):
     def get_config_root(self) -> str:
         return self._config_root
 
+    def get_library(self) -> Optional[ProjectConfig]:
+        """
+        Returns the library used by this project
+        """
+        return self._library
+
     def is_library(self) -> bool:
         """
         Indicates if this collection is a library
@@ -78,21 +108,45 @@ class ProjectConfig(BaseConfig):
 
     def create_oc(self) -> K8Api:
         """
-        Creates a new openshift / k8 client
+        Creates a new openshift / k8 client.
+        The client is shared and can be used by multiple threads.
         :return: Client
         """
-        if self._oc is not None:
+        with self._oc_lock:
+            if self._oc is None:
+                self._oc = self._create_oc()
             return self._oc
 
+    def _create_oc(self) -> K8Api:
         mode = self._get_mode()
-        if mode == 'oc':
-            oc = Oc()
-        elif mode == 'k8':
-            oc = K8()
-        else:
+        if mode not in ['oc', 'k8']:
             raise ValueError(f'Invalid mode: {mode}')
-        self._oc = oc
-        return oc
+
+        client = self._get_client()
+        context = self.get_oc_context()
+        if client == 'http':
+            # Only imported when used, the http stack is slow to import
+            from ok8deploy.oc.HttpApi import HttpApi
+            return HttpApi(context, openshift=mode == 'oc', server_side_apply=self._use_server_side_apply())
+        if client != 'cli':
+            raise ValueError(f'Invalid client: {client}')
+        if mode == 'oc':
+            return Oc(context)
+        return K8(context)
+
+    def _get_client(self) -> str:
+        """
+        Returns how the cluster is accessed:
+        "cli" forks oc / kubectl for every call, "http" talks to the api server directly
+        """
+        return self.data.get('client', 'cli')
+
+    def _use_server_side_apply(self) -> bool:
+        """
+        Indicates if the http client should apply the objects using server side apply.
+        Otherwise the objects are applied by oc / kubectl like with the cli client.
+        """
+        return self.data.get('serverSideApply', False)
 
     def get_oc_project_name(self) -> Optional[str]:
         """
@@ -135,10 +189,9 @@ class ProjectConfig(BaseConfig):
         :return:
         """
         items = []
-        for dir_item in os.listdir(self._config_root):
-            path = os.path.join(self._config_root, dir_item)
-            if not os.path.isdir(path):
-                continue
+        with os.scandir(self._config_root) as entries:
+            dir_items = [entry.name for entry in entries if entry.is_dir()]
+        for dir_item in dir_items:
             try:
                 app_config = self.load_app_config(dir_item)
             except FileNotFoundError:
@@ -153,6 +206,42 @@ class ProjectConfig(BaseConfig):
             items.extend(self._library.load_app_configs())
         return items
 
+    def get_app_names(self) -> List[str]:
+        """
+        Returns the folder names of all apps and templates of this project and the library
+        without loading their configuration
+        :return: Names
+        """
+        with os.scandir(self._config_root) as entries:
+            dir_items = sorted(entry.name for entry in entries if entry.is_dir())
+        names = [name for name in dir_items if os.path.isfile(os.path.join(self._config_root, name, '_index.yml'))]
+        if self._library is not None:
+            names.extend(name for name in self._library.get_app_names() if name not in names)
+        return names
+
+    def preload(self, jobs: int):
+        """
+        Parses the index and object files of all apps (including the library) using multiple processes.
+        The parsed files are cached, so loading the apps afterwards doesn't parse them again.
+        :param jobs: Number of processes
+        """
+        index_files = []
+        object_files = []
+        for name in self.get_app_names():
+            folder = self._get_app_folder(name)
+            index_files.append(os.path.join(folder, '_index.yml'))
+            object_files.extend(AppConfig.find_yml_files(folder))
+        YmlCache.get_default().preload(object_files, index_files, jobs)
+
+    def _get_app_folder(self, name: str) -> str:
+        """
+        Returns the folder of the app, which might be part of the library
+        """
+        folder_path = os.path.join(self._config_root, name)
+        if not os.path.isdir(folder_path) and self._library is not None:
+            return self._library._get_app_folder(name)
+        return folder_path
+
     def load_app_config(self, name: str) -> AppConfig:
         folder_path = os.path.join(self._config_root, name)
         if not os.path.isdir(folder_path):
@@ -167,3 +256,32 @@ class ProjectConfig(BaseConfig):
 
         variables = self.get_replacements()
         return AppConfig(folder_path, index_file, variables)
+
+    def load_template_config(self, name: str) -> AppConfig:
+        """
+        Loads the configuration of a template.
+        Templates are referenced by many apps and instances, so they are only loaded once.
+        A template is loaded again if its index file or the content of its folder changes.
+        :param name: Name of the template (folder name)
+        :return: Shared configuration, must not be modified
+        """
+        folder_path = os.path.join(self._config_root, name)
+        if not os.path.isdir(folder_path) and self._library is not None:
+            return self._library.load_template_config(name)
+
+        try:
+            index_stat = os.stat(os.path.join(folder_path, '_index.yml'))
+            fingerprint = (index_stat.st_mtime_ns, index_stat.st_size, os.stat(folder_path).st_mtime_ns)
+        except FileNotFoundError:
+            # Raises the matching error
+            return self.load_app_config(name)
+
+        with self._templates_lock:
+            entry = self._templates.get(name)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        config = self.load_app_config(name)
+        with self._templates_lock:
+            self._templates[name] = (fingerprint, config)
+        return config
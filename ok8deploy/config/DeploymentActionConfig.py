@@ -1,7 +1,10 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, List, Dict
 
+from ok8deploy.oc.Model import PodData
 from ok8deploy.utils.Log import Log
 
 if TYPE_CHECKING:
@@ -16,22 +19,91 @@ class DeploymentActionConfig(Log):
     """
 
     def __init__(self, app_config: AppConfig, data):
+        super().__init__()
         self._data = data
         self._app_config = app_config
 
-    def run(self, oc: K8Api):
+    def run(self, oc: K8Api, namespace: Optional[str] = None):
+        """
+        Executes the action
+        :param oc: Client
+        :param namespace: Namespace of the app
+        :raise Exception: Gets raised if the action failed in at least one pod
+        """
         if self._data == 'deploy':
-            oc.rollout(self._app_config.get_dc_name())
+            oc.rollout(self._app_config.get_dc_name(), namespace)
             return
 
         exec_config = self._data.get('exec', None)
         if exec_config is not None:
-            cmd = exec_config['command']
-            args = exec_config['args']
-
             dc_name = self._app_config.get_dc_name()
-            log.info('Reloading via exec in pods of ' + dc_name)
-            pods = oc.get_pods(dc_name=dc_name)
+            self.log.info('Reloading via exec in pods of ' + dc_name)
+            pods = oc.get_pods(dc_name=dc_name, namespace=namespace)
+            self._exec_in_pods(oc, pods, exec_config, namespace)
+            return
+
+    def _exec_in_pods(self, oc: K8Api, pods: List[PodData], exec_config: Dict[str, any], namespace: Optional[str]):
+        """
+        Executes the configured command in all given pods.
+        The pods are processed concurrently if "concurrency" is set, "maxFailures" stops processing
+        any further pods once the given number of pods failed.
+        :param oc: Client
+        :param pods: Pods
+        :param exec_config: Exec configuration
+        :param namespace: Namespace of the pods
+        :raise Exception: Gets raised if the command failed in at least one pod
+        """
+        cmd = exec_config['command']
+        args = exec_config['args']
+        concurrency = max(1, exec_config.get('concurrency', 1))
+        timeout = exec_config.get('timeout')
+        max_failures = exec_config.get('maxFailures')
+
+        failures = {}  # type: Dict[str, Exception]
+        succeeded = []  # type: List[str]
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def exec_in_pod(pod: PodData):
+            if stop.is_set():
+                return
+            try:
+                oc.exec(pod.name, cmd, args, namespace, timeout=timeout)
+            except Exception as e:
+                with lock:
+                    failures[pod.name] = e
+                    if max_failures is not None and len(failures) >= max_failures:
+                        stop.set()
+                return
+            with lock:
+                succeeded.append(pod.name)
+
+        def exec_buffered(pod: PodData) -> List[str]:
+            Log.start_buffer()
+            try:
+                exec_in_pod(pod)
+            finally:
+                lines = Log.stop_buffer()
+            return lines
+
+        if concurrency == 1:
             for pod in pods:
-                oc.exec(pod.name, cmd, args)
+                exec_in_pod(pod)
+        else:
+            # The workers don't share the buffer of this thread,
+            # their output is added to it in the order of the pods
+            buffer = Log.get_buffer()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(exec_in_pod if buffer is None else exec_buffered, pod) for pod in pods]
+                for future in futures:
+                    lines = future.result()
+                    if buffer is not None:
+                        buffer.extend(lines)
+
+        skipped = len(pods) - len(succeeded) - len(failures)
+        self.log.info(f'Reloaded {len(succeeded)} of {len(pods)} pods ({len(failures)} failed, {skipped} skipped)')
+        if len(failures) == 0:
             return
+        for pod_name, error in failures.items():
+            self.log.error(f'Reload of pod {pod_name} failed: {error}')
+        raise Exception('Reload failed in pods ' + str(sorted(failures.keys())))
@@ -1,6 +1,6 @@
 from typing import Optional
 
-import yaml
+from ok8deploy.utils.YmlCache import YmlCache
 
 
 class YmlConfig:
@@ -8,5 +8,4 @@ class YmlConfig:
         self.data = {}
         self._path = path
         if path is not None:
-            with open(path, 'r') as stream:
-                self.data = yaml.safe_load(stream)
+            self.data = YmlCache.get_default().load(path)
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import os
-from typing import List
-
-import yaml
+from typing import List, Optional
 
 from ok8deploy.config.Config import ProjectConfig, AppConfig, RunMode
 from ok8deploy.deploy.DeploymentBundle import DeploymentBundle
+from ok8deploy.deploy.LiveState import LiveState
 from ok8deploy.deploy.OcObjectDeployer import OcObjectDeployer
+from ok8deploy.deploy.RenderCache import RenderCache, RenderKey
 from ok8deploy.processing.YmlTemplateProcessor import YmlTemplateProcessor
 from ok8deploy.utils.Log import Log
+from ok8deploy.utils.YmlCache import YmlCache
 
 
 class AppDeployment:
@@ -17,10 +18,15 @@ class AppDeployment:
     Deploys a single application
     """
 
-    def __init__(self, root_config: ProjectConfig, app_config: AppConfig, mode: RunMode):
+    def __init__(self, root_config: ProjectConfig, app_config: AppConfig, mode: RunMode,
+                 live_state: Optional[LiveState] = None):
+        """
+        :param live_state: State of the cluster shared by all apps of the run, a new state is used if not defined
+        """
         self._root_config = root_config
         self._app_config = app_config
         self._mode = mode
+        self._live_state = live_state
 
     def deploy(self):
         """
@@ -30,7 +36,7 @@ class AppDeployment:
             if os.path.isfile(self._mode.out_file):
                 os.remove(self._mode.out_file)
 
-        factory = AppDeployRunnerFactory(self._root_config, self._mode)
+        factory = AppDeployRunnerFactory(self._root_config, self._mode, live_state=self._live_state)
         runners = factory.create(self._app_config)
         for runner in runners:
             runner.deploy()
@@ -41,9 +47,16 @@ class AppDeployRunnerFactory:
     Creates AppDeployRunner objects
     """
 
-    def __init__(self, root_config: ProjectConfig, mode: RunMode):
+    def __init__(self, root_config: ProjectConfig, mode: RunMode, yml_cache: Optional[YmlCache] = None,
+                 live_state: Optional[LiveState] = None):
+        """
+        :param yml_cache: Cache for the parsed files, the shared cache is used if not defined
+        :param live_state: State of the cluster, a new state is used by each instance if not defined
+        """
         self._root_config = root_config
         self._mode = mode
+        self._yml_cache = yml_cache
+        self._live_state = live_state
 
     def create(self, root_app_config: AppConfig) -> List[AppDeployRunner]:
         """
@@ -52,7 +65,8 @@ class AppDeployRunnerFactory:
         """
         runners = []
         for app_config in root_app_config.get_for_each():
-            runner = AppDeployRunner(self._root_config, app_config, mode=self._mode)
+            runner = AppDeployRunner(self._root_config, app_config, mode=self._mode, yml_cache=self._yml_cache,
+                                     live_state=self._live_state)
             runners.append(runner)
         return runners
 
@@ -62,30 +76,151 @@ class AppDeployRunner(Log):
     Executes the deployment of a single app
     """
 
-    def __init__(self, root_config: ProjectConfig, app_config: AppConfig, mode: RunMode = RunMode()):
+    def __init__(self, root_config: ProjectConfig, app_config: AppConfig, mode: RunMode = RunMode(),
+                 yml_cache: Optional[YmlCache] = None, live_state: Optional[LiveState] = None):
+        """
+        :param live_state: State of the cluster, a new state is fetched if not defined
+        """
         super().__init__()
         self._root_config = root_config
         self._app_config = app_config
         self._bundle = DeploymentBundle(self._root_config.get_pre_processor())
         self._mode = mode
+        self._yml_cache = yml_cache or YmlCache.get_default()
+        self._live_state = live_state
+        self._source_dirs = []  # type: List[str]
+        """
+        Folders of the app and all referenced templates
+        """
+        self._render_cache = None  # type: Optional[RenderCache]
+        if mode.render_cache or mode.changed_only:
+            self._render_cache = RenderCache.get_default()
+        self._input_hash = None  # type: Optional[str]
+        self._input_dirs = []  # type: List[str]
+        self._input_paths = []  # type: List[str]
+        """
+        Caching fields
+        """
 
-    def deploy(self):
+    def get_app_config(self) -> AppConfig:
+        return self._app_config
+
+    def get_source_dirs(self) -> List[str]:
         """
-        Deploys all items for the given app
+        Returns the folders of the app and all templates which have been rendered
+        """
+        return self._source_dirs
+
+    def render(self) -> DeploymentBundle:
+        """
+        Loads all items of the app and the referenced templates
+        :return: Bundle containing all items
         """
         if not self._app_config.enabled():
             raise ValueError('App is disabled')
         if self._app_config.is_template():
             raise ValueError('App is a template and can\'t be deployed')
 
+        if self._mode.render_cache:
+            cached = self._render_cache.load(self.get_input_hash())
+            if cached is not None:
+                self.log.debug('Using cached objects of ' + self._app_config.get_dc_name())
+                self._bundle.restore(*cached)
+                self._source_dirs.extend(self._input_dirs)
+                return self._bundle
+
         template_processor = self._app_config.get_template_processor()
         template_processor.parent(self._root_config.get_template_processor())
 
+        self._source_dirs.append(self._app_config.get_config_root())
         self._deploy_templates(self._app_config.get_pre_template_refs(), template_processor)
-        self._load_files(self._app_config.get_config_root(), template_processor)
+        self._load_files(self._app_config, template_processor)
         self._deploy_extra_configmaps(template_processor)
         self._deploy_templates(self._app_config.get_post_template_refs(), template_processor)
+        if self._mode.render_cache:
+            self._render_cache.save(self.get_input_hash(), self._bundle.objects, self._bundle.get_hashes())
+        return self._bundle
+
+    def get_input_hash(self) -> str:
+        """
+        Returns the hash of everything the rendered objects depend on:
+        The project and library config, the config and variables of the instance,
+        the files of the app and all referenced templates (recursively), the configmap source files
+        and the files read by loaders
+        :return: Hash
+        """
+        if self._input_hash is not None:
+            return self._input_hash
 
+        key = (self._render_cache or RenderCache.get_default()).create_key()
+        project = self._root_config
+        while project is not None:
+            key.add_value('project', project.data)
+            key.add_value('project vars', project.get_replacements())
+            project = project.get_library()
+
+        source_dirs = [self._app_config.get_config_root()]
+        self._add_config_inputs(key, self._app_config)
+        for config in self._app_config.get_config_maps():
+            for file_obj in config.files:
+                key.add_file(os.path.join(self._app_config.get_config_root(), file_obj['file']))
+        self._add_template_inputs(key, self._app_config, source_dirs)
+
+        self._input_dirs = source_dirs
+        # New object files are detected by the modification time of their folder
+        paths = [os.path.abspath(path) for path in source_dirs]
+        paths.extend(os.path.join(path, '_index.yml') for path in list(paths))
+        paths.extend(key.get_files())
+        paths.extend(os.path.dirname(path) for path in key.get_files())
+        self._input_paths = list(dict.fromkeys(paths))
+        self._input_hash = key.hexdigest()
+        return self._input_hash
+
+    def get_input_paths(self) -> List[str]:
+        """
+        Returns all files and folders the input hash depends on (besides the project config).
+        The hash only has to be calculated again once one of them has been modified.
+        :return: Paths
+        """
+        self.get_input_hash()
+        return self._input_paths
+
+    def _add_template_inputs(self, key: RenderKey, config: AppConfig, source_dirs: List[str]):
+        """
+        Adds the inputs of all templates referenced by the given config (recursively)
+        """
+        for template_name in config.get_pre_template_refs() + config.get_post_template_refs():
+            template = self._root_config.load_template_config(template_name)
+            source_dirs.append(template.get_config_root())
+            key.add_value('template', template_name)
+            self._add_config_inputs(key, template)
+            self._add_template_inputs(key, template, source_dirs)
+
+    @staticmethod
+    def _add_config_inputs(key: RenderKey, config: AppConfig):
+        key.add_value('config', config.data)
+        key.add_value('vars', config.get_replacements())
+        for path in config.get_yml_files():
+            key.add_file(path)
+
+    def _get_instance_id(self) -> str:
+        """
+        Returns the identifier of this instance and the cluster it's deployed to
+        """
+        return repr((os.path.abspath(self._app_config.get_config_root()), self._app_config.get_dc_name(),
+                     self._root_config.get_oc_context(), self._root_config.get_oc_project_name()))
+
+    def deploy(self):
+        """
+        Deploys all items for the given app
+        """
+        deploys = not self._mode.dry_run and not self._mode.plan
+        if self._mode.changed_only and deploys and \
+                self._render_cache.is_deployed(self._get_instance_id(), self.get_input_hash()):
+            self.log.info('Skipping ' + self._app_config.get_dc_name() + ' (no changes since the last deployment)')
+            return
+
+        self.render()
         k8api = self._root_config.create_oc()
         if self._mode.out_file is not None:
             self._bundle.dump_objects(self._mode.out_file)
@@ -93,15 +228,18 @@ class AppDeployRunner(Log):
             return
 
         self.log.info('Checking ' + self._app_config.get_dc_name())
-        object_deployer = OcObjectDeployer(self._root_config, k8api, self._app_config, mode=self._mode)
+        object_deployer = OcObjectDeployer(self._root_config, k8api, self._app_config, mode=self._mode,
+                                           live_state=self._live_state)
         self._bundle.deploy(object_deployer)
+        if self._render_cache is not None and deploys:
+            self._render_cache.set_deployed(self._get_instance_id(), self.get_input_hash())
 
     def _deploy_templates(self, template_names: List[str], template_processor: YmlTemplateProcessor):
         """
         Deploys all referenced templates (recursively)
         """
         for template_name in template_names:
-            template = self._root_config.load_app_config(template_name)
+            template = self._root_config.load_template_config(template_name)
             if not template.is_template():
                 raise ValueError('Referenced app ' + template_name + ' is not declared as template')
             if not template.enabled():
@@ -114,29 +252,21 @@ class AppDeployRunner(Log):
             # since its configuration will be overwritten by the previous template
             child_template_processor.child(template_processor)
 
+            self._source_dirs.append(template.get_config_root())
             # The template might reference other templates
             # -> Recursively deploy them
             self._deploy_templates(template.get_pre_template_refs(), child_template_processor)
-            self._load_files(template.get_config_root(), child_template_processor)
+            self._load_files(template, child_template_processor)
             self._deploy_templates(template.get_post_template_refs(), child_template_processor)
 
-    def _load_files(self, root: str, template_processor: YmlTemplateProcessor):
+    def _load_files(self, config: AppConfig, template_processor: YmlTemplateProcessor):
         """
-        Loads all yml files inside the given folder
-        :param root: Path to the root of the configs folder
+        Loads all yml files of the given app or template
+        :param config: Config of the app or template
         """
-        for item in os.listdir(root):
-            path = os.path.join(root, item)
-            if not os.path.isfile(path) or not item.endswith('.yml') or item.startswith('_'):
-                continue
-
-            with open(path, 'r') as stream:
-                data = yaml.load_all(stream, Loader=yaml.FullLoader)
-                for doc in data:
-                    if doc is None:
-                        # Empty block
-                        continue
-                    self._bundle.add_object(doc, template_processor)
+        for path in config.get_yml_files():
+            for doc in self._yml_cache.load_all(path):
+                self._bundle.add_object(doc, template_processor)
 
     def _deploy_extra_configmaps(self, template_processor: YmlTemplateProcessor):
         """
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from ok8deploy.config.Config import ProjectConfig, AppConfig, RunMode
+from ok8deploy.deploy.AppDeploy import AppDeployment
+from ok8deploy.deploy.LiveState import LiveState
+from ok8deploy.utils.Log import Log
+
+
+class AppDeploymentResult:
+    """
+    Outcome of the deployment of a single app
+    """
+
+    def __init__(self, name: str, duration: float, error: Optional[Exception] = None):
+        self.name = name
+        self.duration = duration
+        """
+        Duration in seconds
+        """
+        self.error = error
+
+    def is_success(self) -> bool:
+        return self.error is None
+
+
+class AppDeploymentPool(Log):
+    """
+    Deploys multiple apps concurrently.
+    The log output of each app is buffered and printed once the app is done.
+    """
+
+    def __init__(self, root_config: ProjectConfig, mode: RunMode, jobs: int, live_state: Optional[LiveState] = None):
+        """
+        :param live_state: State of the cluster, a new state shared by all apps is used if not defined
+        """
+        super().__init__()
+        self._root_config = root_config
+        self._mode = mode
+        self._jobs = jobs
+        self._live_state = live_state or LiveState(root_config.create_oc())
+        self._output_lock = threading.Lock()
+
+    def deploy(self, app_configs: List[AppConfig]) -> List[AppDeploymentResult]:
+        """
+        Deploys all given apps. A failing app doesn't abort the other apps.
+        :param app_configs: Apps
+        :return: Result of each app
+        """
+        with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+            futures = [executor.submit(self._deploy, app_config) for app_config in app_configs]
+            results = [future.result() for future in futures]
+
+        self._log_summary(results)
+        return results
+
+    def _deploy(self, app_config: AppConfig) -> AppDeploymentResult:
+        name = os.path.basename(app_config.get_config_root())
+        error = None
+        start = time.monotonic()
+        Log.start_buffer()
+        try:
+            AppDeployment(self._root_config, app_config, self._mode, self._live_state).deploy()
+        except Exception as e:
+            self.log.error(f'Deployment of {name} failed: {e}')
+            self.log.debug(traceback.format_exc())
+            error = e
+        finally:
+            lines = Log.stop_buffer()
+
+        with self._output_lock:
+            for line in lines:
+                sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+        return AppDeploymentResult(name, time.monotonic() - start, error)
+
+    def _log_summary(self, results: List[AppDeploymentResult]):
+        self.log.info('Summary:')
+        for result in results:
+            if result.is_success():
+                self.log.info(f'  {result.name}: ok ({result.duration:.1f}s)')
+                continue
+            self.log.error(f'  {result.name}: failed ({result.duration:.1f}s): {result.error}')
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 import os
-
-import yaml
+from typing import List, Optional
 
 from ok8deploy.deploy.OcObjectDeployer import OcObjectDeployer
 from ok8deploy.processing.DataPreProcessor import DataPreProcessor
 from ok8deploy.processing.OcObjectMerge import OcObjectMerge
 from ok8deploy.processing.YmlTemplateProcessor import YmlTemplateProcessor
 from ok8deploy.utils.Log import Log
+from ok8deploy.utils.Yml import Yml
 
 
 class DeploymentBundle(Log):
@@ -20,6 +20,10 @@ class DeploymentBundle(Log):
         super().__init__()
         self.objects = []  # All objects which should be deployed
         self._pre_processor = pre_processor
+        self._hashes = None  # type: Optional[List[str]]
+        """
+        Hash of each object, reset whenever the objects change
+        """
 
     def add_object(self, data: dict, template_processor: YmlTemplateProcessor):
         """
@@ -35,6 +39,7 @@ class DeploymentBundle(Log):
             self.log.info('Secrets are ignored')
             return
         
+        self._hashes = None
         # Pre-process any variables
         if template_processor is not None:
             template_processor.process(data)
@@ -49,15 +54,11 @@ class DeploymentBundle(Log):
         self._pre_processor.process(data)
         self.objects.append(data)
 
-    def deploy(self, deploy_runner: OcObjectDeployer):
+    def sort(self):
         """
-        Deploys all object
-        :param deploy_runner: Deployment runner which should be used
+        Sorts the objects in the order in which they should be deployed
         """
-        deploy_runner.select_project()
-
-        # First sort the objects
-        # we want deploymentconfigs to be the last items since a config change might
+        # We want deploymentconfigs to be the last items since a config change might
         # have an impact
         def sorting(x):
             object_kind = x['kind'].lower()
@@ -66,9 +67,39 @@ class DeploymentBundle(Log):
                 return 1
             return 0
 
-        self.objects.sort(key=sorting)
-        for item in self.objects:
-            deploy_runner.deploy_object(item)
+        order = sorted(range(len(self.objects)), key=lambda index: sorting(self.objects[index]))
+        self.objects[:] = [self.objects[index] for index in order]
+        if self._hashes is not None:
+            self._hashes = [self._hashes[index] for index in order]
+
+    def get_hashes(self) -> List[str]:
+        """
+        Returns the hash of each object, which is stored in the cluster
+        :return: Hashes in the order of the objects
+        """
+        if self._hashes is None:
+            self._hashes = [OcObjectDeployer.get_hash(data) for data in self.objects]
+        return self._hashes
+
+    def restore(self, objects: List[dict], hashes: List[str]):
+        """
+        Replaces the objects with already rendered ones
+        :param objects: Rendered objects
+        :param hashes: Hash of each object
+        """
+        self.objects = objects
+        self._hashes = hashes
+
+    def deploy(self, deploy_runner: OcObjectDeployer):
+        """
+        Deploys all object
+        :param deploy_runner: Deployment runner which should be used
+        """
+        self.sort()
+        deploy_runner.prefetch(self.objects)
+        for item, hash_val in zip(self.objects, self.get_hashes()):
+            deploy_runner.deploy_object(item, hash_val)
+        deploy_runner.flush()
 
     def dump_objects(self, path: str):
         """
@@ -76,13 +107,11 @@ class DeploymentBundle(Log):
         If the file does already exist the content will be appended
         :param path: Path to a file
         """
-        all_objects = []
-        if os.path.isfile(path):
-            with open(path) as f:
-                data = yaml.load_all(f, Loader=yaml.FullLoader)
-                for doc in data:
-                    all_objects.append(doc)
-
-        all_objects.extend(self.objects)
-        with open(path, 'w') as file:
-            yaml.dump_all(all_objects, file, default_flow_style=False, sort_keys=True)
+        if len(self.objects) == 0:
+            return
+        # The existing documents are not parsed again, the new ones are appended as separate documents
+        append = os.path.isfile(path) and os.path.getsize(path) > 0
+        with open(path, 'a' if append else 'w') as file:
+            if append:
+                file.write('---\n')
+            Yml.dump_all(self.objects, file)
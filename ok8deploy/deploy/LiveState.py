@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.oc.Oc import K8Api
+from ok8deploy.utils.Log import Log
+
+
+class LiveState(Log):
+    """
+    Index of the objects which are currently deployed in the cluster.
+    The index is filled with one list call per kind and namespace instead of one call per object,
+    it can be kept up to date by a LiveStateWatcher.
+    """
+
+    def __init__(self, k8api: K8Api):
+        super().__init__()
+        self._k8api = k8api
+        self._index = {}  # type: Dict[Tuple[str, Optional[str]], Dict[str, ItemDescription]]
+        """
+        Listed items by (kind, namespace), mapped to their name
+        """
+        self._lock = threading.Lock()
+
+    def prefetch(self, objects: List[dict], default_namespace: Optional[str] = None):
+        """
+        Lists all kinds / namespaces used by the given objects and stores the result in the index
+        :param objects: Objects which will be looked up later on
+        :param default_namespace: Namespace of objects which don't define one
+        """
+        for kind, namespace in self.get_missing_groups(objects, default_namespace):
+            try:
+                items = self._k8api.get_all(kind, namespace)
+            except Exception as e:
+                # The kind might not be listable (or not known yet), such items are queried one by one
+                self.log.debug(f'Could not list {kind}: {e}')
+                continue
+            self.put(kind, namespace, items)
+
+    def get_missing_groups(self, objects: List[dict], default_namespace: Optional[str] = None) \
+            -> List[Tuple[str, Optional[str]]]:
+        """
+        Returns all kinds / namespaces used by the given objects which are not indexed yet
+        :param objects: Objects
+        :param default_namespace: Namespace of objects which don't define one
+        :return: Kind and namespace of each group
+        """
+        groups = []
+        with self._lock:
+            for data in objects:
+                key = (data['kind'], data['metadata'].get('namespace', default_namespace))
+                if key in self._index or key in groups:
+                    continue
+                groups.append(key)
+        return groups
+
+    def put(self, kind: str, namespace: Optional[str], items: List[ItemDescription]):
+        """
+        Replaces all indexed items of the given kind and namespace
+        :param kind: Object kind
+        :param namespace: Namespace
+        :param items: All items of that kind
+        """
+        with self._lock:
+            self._index[(kind, namespace)] = {item.get_name(): item for item in items}
+
+    def update(self, kind: str, namespace: Optional[str], item: ItemDescription, deleted: bool = False):
+        """
+        Updates a single indexed item
+        :param kind: Object kind
+        :param namespace: Namespace
+        :param item: Current state of the item
+        :param deleted: True if the item has been deleted
+        """
+        with self._lock:
+            items = self._index.setdefault((kind, namespace), {})
+            if deleted:
+                items.pop(item.get_name(), None)
+                return
+            items[item.get_name()] = item
+
+    def get(self, kind: str, name: str, namespace: Optional[str] = None) -> Optional[ItemDescription]:
+        """
+        Returns the current state of the given item
+        :param kind: Object kind
+        :param name: Object name
+        :param namespace: Namespace of the object
+        :return: Item or None if it doesn't exist
+        """
+        with self._lock:
+            items = self._index.get((kind, namespace))
+            if items is not None:
+                return items.get(name)
+        # Not prefetched
+        return self._k8api.get(kind + '/' + name, namespace)
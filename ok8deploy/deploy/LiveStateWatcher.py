@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+from typing import List, Optional, Set, Tuple
+
+from ok8deploy.deploy.LiveState import LiveState
+from ok8deploy.oc.Model import ApiResource, ItemDescription
+from ok8deploy.oc.Oc import K8Api
+from ok8deploy.utils.Log import Log
+
+
+class LiveStateWatcher(Log):
+    """
+    Keeps a LiveState up to date using one watch stream per kind and namespace.
+    Each stream is handled by its own daemon thread, the groups are re-listed if a stream breaks.
+    """
+
+    RETRY_DELAY = 5
+    """
+    Time in seconds before a failed watch is restarted
+    """
+
+    def __init__(self, k8api: K8Api, live_state: LiveState):
+        super().__init__()
+        self._k8api = k8api
+        self._live_state = live_state
+        self._watched = set()  # type: Set[Tuple[str, Optional[str]]]
+        self._threads = []  # type: List[threading.Thread]
+        self._stop = threading.Event()
+
+    def watch(self, objects: List[dict], default_namespace: Optional[str] = None):
+        """
+        Starts watching all kinds / namespaces used by the given objects.
+        Each group is listed once before this method returns, groups which are watched already are skipped.
+        :param objects: Objects
+        :param default_namespace: Namespace of objects which don't define one
+        """
+        groups = []
+        for data in objects:
+            key = (data['kind'], data['metadata'].get('namespace', default_namespace))
+            if key in self._watched or key in groups:
+                continue
+            groups.append(key)
+
+        for kind, namespace in groups:
+            self._watched.add((kind, namespace))
+            resource = self._k8api.find_api_resource(kind)
+            if resource is None:
+                # Items are queried one by one
+                self.log.warning(f'Can\'t watch unknown kind {kind}')
+                continue
+            resource_version = self._list(kind, namespace, resource)
+            thread = threading.Thread(target=self._run, args=(kind, namespace, resource, resource_version),
+                                      name=f'watch-{kind}-{namespace}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self):
+        """
+        Stops all watches once their streams return the next event
+        """
+        self._stop.set()
+
+    def _list(self, kind: str, namespace: Optional[str], resource: ApiResource) -> Optional[str]:
+        """
+        Lists all items of the group and replaces them in the live state
+        :return: Resource version of the list or None if the list failed
+        """
+        try:
+            items, resource_version = self._k8api.list_with_version(resource, namespace)
+        except Exception as e:
+            self.log.warning(f'Could not list {kind}: {e}')
+            return None
+        self._live_state.put(kind, namespace, items)
+        return resource_version
+
+    def _run(self, kind: str, namespace: Optional[str], resource: ApiResource, resource_version: Optional[str]):
+        while not self._stop.is_set():
+            if resource_version is None:
+                resource_version = self._list(kind, namespace, resource)
+                if resource_version is None:
+                    self._stop.wait(self.RETRY_DELAY)
+                    continue
+
+            try:
+                for event_type, data in self._k8api.watch(resource, namespace, resource_version):
+                    if self._stop.is_set():
+                        return
+                    if event_type == 'ERROR':
+                        # Usually "410 Gone": The version is too old, start from scratch
+                        self.log.debug(f'Watch of {kind} expired: {data.get("message")}')
+                        resource_version = None
+                        break
+                    resource_version = data['metadata'].get('resourceVersion', resource_version)
+                    if event_type == 'BOOKMARK':
+                        continue
+                    self._live_state.update(kind, namespace, ItemDescription(data), event_type == 'DELETED')
+            except Exception as e:
+                self.log.warning(f'Watch of {kind} failed: {e}')
+                resource_version = None
+                self._stop.wait(self.RETRY_DELAY)
@@ -1,10 +1,13 @@
-import hashlib
+from __future__ import annotations
 
-import yaml
+import hashlib
+from typing import Dict, List, Optional
 
 from ok8deploy.config.Config import ProjectConfig, AppConfig, RunMode
+from ok8deploy.deploy.LiveState import LiveState
 from ok8deploy.oc.Oc import K8Api
 from ok8deploy.utils.Log import Log
+from ok8deploy.utils.Yml import Yml
 
 
 class OcObjectDeployer(Log):
@@ -13,50 +16,61 @@ class OcObjectDeployer(Log):
     """
 
     HASH_ANNOTATION = 'yml-hash'
+    MAX_BATCH_BYTES = 1024 * 1024
+    """
+    Max size of a single apply call in batch mode
+    """
 
-    def __init__(self, root_config: ProjectConfig, oc: K8Api, app_config: AppConfig, mode: RunMode = RunMode()):
+    def __init__(self, root_config: ProjectConfig, oc: K8Api, app_config: AppConfig, mode: RunMode = RunMode(),
+                 live_state: Optional[LiveState] = None):
+        """
+        :param live_state: State of the cluster, a new state is fetched if not defined
+        """
         super().__init__()
         self._root_config = root_config  # type: ProjectConfig
         self._app_config = app_config  # type: AppConfig
         self._oc = oc  # type: K8Api
         self._mode = mode
+        self._live_state = live_state or LiveState(oc)
+        self._pending = []  # type: List[ChangedObject]
+        """
+        Changed objects which will be applied on flush (batch mode only)
+        """
 
-    def select_project(self):
+    def prefetch(self, objects: List[dict]):
         """
-        Selects the required openshift project
+        Fetches the current state of all given objects in bulk
+        :param objects: Objects which will be deployed
         """
-        context = self._root_config.get_oc_context()
-        if context is not None:
-            self._oc.switch_context(context)
-        self._oc.project(self._root_config.get_oc_project_name())
+        self._live_state.prefetch(objects, self._root_config.get_oc_project_name())
 
-    def deploy_object(self, data: dict):
+    def deploy_object(self, data: dict, hash_val: Optional[str] = None):
         """
         Deploy the given object (if a deployment required, otherwise does nothing)
         :param data: Data which should be deployed
+        :param hash_val: Hash of the object, calculated if not defined
         """
 
-        # Sort the content so it's always reproducible
-        str_repr = yaml.dump(data, sort_keys=True)
-
-        hash_val = hashlib.md5(str_repr.encode('utf-8')).hexdigest()
+        if hash_val is None:
+            hash_val = self.get_hash(data)
         metadata = data['metadata']
 
-        # An object might be in a different namespace than the current context
-        namespace = metadata.get('namespace')
-        if namespace is not None:
-            self._oc.project(namespace)
+        # An object might be in a different namespace than the project
+        namespace = metadata.get('namespace', self._root_config.get_oc_project_name())
 
         item_name = data['kind'] + '/' + metadata['name']
-        description = self._oc.get(item_name)
+        description = self._live_state.get(data['kind'], metadata['name'], namespace)
         current_hash = None
         if description is not None:
             current_hash = description.get_annotation(self.HASH_ANNOTATION)
 
         if description is not None and current_hash is None:
             # Item has not been deployed yet with this script, assume both are the same
+            if self._mode.plan:
+                self.log.info('Annotation of ' + item_name + ' would be updated')
+                return
             self.log.info('Updating annotation of ' + item_name)
-            self._oc.annotate(item_name, self.HASH_ANNOTATION, hash_val)
+            self._oc.annotate(item_name, self.HASH_ANNOTATION, hash_val, namespace)
             return
 
         if current_hash == hash_val:
@@ -67,17 +81,115 @@ class OcObjectDeployer(Log):
             self.log.warning('Update required for ' + item_name)
             return
 
+        changed = ChangedObject(self.with_hash(data, hash_val), hash_val, namespace)
+        if self._mode.batch_apply:
+            self.log.info('Queueing update ' + item_name + ' (item has changed)')
+            self._pending.append(changed)
+            return
+
         self.log.info('Applying update ' + item_name + ' (item has changed)')
-        self._oc.apply(str_repr)
-        self._oc.annotate(item_name, 'yml-hash', hash_val)
+        self._oc.apply(changed.str_repr, namespace)
 
-        if namespace is not None:
-            # Use project namespace as default again
-            self._oc.project(self._root_config.get_oc_project_name())
+        if changed.is_config_map():
+            self._reload_config()
 
-        item_kind = data['kind'].lower()
-        if item_kind == 'ConfigMap'.lower():
+    @staticmethod
+    def get_hash(data: dict) -> str:
+        """
+        Returns the hash of the given object which is stored in the HASH_ANNOTATION
+        :param data: Object (without the hash annotation)
+        :return: Hash
+        """
+        # Sort the content so it's always reproducible
+        str_repr = Yml.dump(data)
+        return hashlib.md5(str_repr.encode('utf-8')).hexdigest()
+
+    def flush(self):
+        """
+        Applies all objects which have been queued in batch mode.
+        The objects are sent as "List" documents per namespace, each one limited to MAX_BATCH_BYTES.
+        :raise Exception: Gets raised if at least one object could not be applied
+        """
+        pending = self._pending
+        self._pending = []
+        # The namespace of the call has to match the namespace of every object in it
+        by_namespace = {}  # type: Dict[Optional[str], List[ChangedObject]]
+        for item in pending:
+            by_namespace.setdefault(item.namespace, []).append(item)
+
+        failed = []
+        reload_config = False
+        for namespace, items in by_namespace.items():
+            for chunk in self.create_chunks(items, self.MAX_BATCH_BYTES):
+                self.log.info(f'Applying {len(chunk)} objects')
+                try:
+                    self._oc.apply(Yml.dump({
+                        'apiVersion': 'v1',
+                        'kind': 'List',
+                        'items': [item.data for item in chunk]
+                    }), namespace)
+                    applied = chunk
+                except Exception as e:
+                    # Apply the objects one by one to find out which one failed
+                    self.log.warning(f'Failed to apply batch, retrying per object: {e}')
+                    applied = []
+                    for item in chunk:
+                        try:
+                            self._oc.apply(item.str_repr, namespace)
+                        except Exception as item_error:
+                            self.log.error(f'Failed to apply {item.item_name}: {item_error}')
+                            failed.append(item.item_name)
+                            continue
+                        applied.append(item)
+
+                for item in applied:
+                    reload_config |= item.is_config_map()
+
+        if reload_config:
             self._reload_config()
+        if len(failed) > 0:
+            raise Exception('The following objects could not be applied: ' + str(failed))
+
+    @staticmethod
+    def create_chunks(items: List[ChangedObject], max_bytes: int) -> List[List[ChangedObject]]:
+        """
+        Splits the given objects into chunks which don't exceed the given size.
+        An object which is larger than the limit will be placed in its own chunk.
+        :param items: Objects
+        :param max_bytes: Max size of a single chunk
+        :return: Chunks
+        """
+        chunks = []
+        chunk = []
+        chunk_size = 0
+        for item in items:
+            size = len(item.str_repr.encode('utf-8'))
+            if len(chunk) > 0 and chunk_size + size > max_bytes:
+                chunks.append(chunk)
+                chunk = []
+                chunk_size = 0
+            chunk.append(item)
+            chunk_size += size
+        if len(chunk) > 0:
+            chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def with_hash(data: dict, hash_val: str) -> dict:
+        """
+        Returns a copy of the given object which contains the hash annotation.
+        Only the metadata is copied, the remaining data is shared with the original object.
+        :param data: Object
+        :param hash_val: Hash of the object
+        :return: Object with annotation
+        """
+        metadata = dict(data['metadata'])
+        annotations = dict(metadata.get('annotations') or {})
+        annotations[OcObjectDeployer.HASH_ANNOTATION] = hash_val
+        metadata['annotations'] = annotations
+        annotated = dict(data)
+        annotated['metadata'] = metadata
+        return annotated
 
     def _reload_config(self):
         """
@@ -85,4 +197,29 @@ class OcObjectDeployer(Log):
         """
         reload_actions = self._app_config.get_reload_actions()
         for action in reload_actions:
-            action.run(self._oc)
+            action.run(self._oc, self._root_config.get_oc_project_name())
+
+
+class ChangedObject:
+    """
+    Object which differs from the deployed state
+    """
+
+    def __init__(self, data: dict, hash_val: Optional[str], namespace: Optional[str] = None):
+        """
+        :param namespace: Namespace into which the object is applied
+        """
+        self.data = data
+        """
+        Object including the hash annotation
+        """
+        self.str_repr = Yml.dump(data)
+        """
+        Yml representation of the object
+        """
+        self.hash_val = hash_val
+        self.namespace = namespace
+        self.item_name = data['kind'] + '/' + data['metadata']['name']
+
+    def is_config_map(self) -> bool:
+        return self.data['kind'].lower() == 'ConfigMap'.lower()
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import os
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+from ok8deploy.config.Config import ProjectConfig, AppConfig, RunMode
+from ok8deploy.deploy.AppDeploy import AppDeployRunnerFactory
+from ok8deploy.deploy.LiveState import LiveState
+from ok8deploy.deploy.LiveStateWatcher import LiveStateWatcher
+from ok8deploy.deploy.OcObjectDeployer import OcObjectDeployer
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.utils.Log import Log
+from ok8deploy.utils.YmlCache import YmlCache
+
+
+class ReconciledApp:
+    """
+    Rendered state of a single app
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.instances = []  # type: List[Tuple[AppConfig, List[Tuple[dict, str]]]]
+        """
+        Config of each instance and the rendered objects including their hash
+        """
+        self.input_hash = None  # type: Optional[str]
+        """
+        Hash of all inputs of the instances, the app is rendered again once it changes
+        """
+        self.fingerprint = {}  # type: Dict[str, Optional[Tuple[int, int]]]
+        """
+        Modification time and size of all files and folders the input hash depends on,
+        the hash is only calculated again once the fingerprint changes
+        """
+
+    def get_hashes(self, default_namespace: Optional[str]) -> Dict[Tuple[str, str, Optional[str]], str]:
+        """
+        Returns the hash of all rendered objects
+        :param default_namespace: Namespace of objects which don't define one
+        :return: Hash by kind, name and namespace
+        """
+        hashes = {}
+        for _, items in self.instances:
+            for data, hash_val in items:
+                metadata = data['metadata']
+                hashes[(data['kind'], metadata['name'], metadata.get('namespace', default_namespace))] = hash_val
+        return hashes
+
+
+class Reconciler(Log):
+    """
+    Keeps the cluster in sync with the configuration.
+    The configuration and the rendered objects are kept in memory and are only rendered again if
+    an input of the app changes (the same inputs which are used by the render cache).
+    The state of the cluster is kept up to date using watches,
+    so finding objects which differ from the configuration doesn't require any calls.
+    """
+
+    def __init__(self, config_dir: str, mode: RunMode, interval: float = 10, app_names: Optional[List[str]] = None):
+        """
+        :param config_dir: Project folder
+        :param mode: Run mode, objects are only reported if plan is set
+        :param interval: Time in seconds between two reconciliations
+        :param app_names: Apps which should be reconciled, all apps are used if not defined
+        """
+        super().__init__()
+        self._config_dir = config_dir
+        self._mode = mode
+        self._interval = interval
+        self._app_names = app_names
+        self._yml_cache = YmlCache.get_default()
+        self._root_config = None  # type: Optional[ProjectConfig]
+        self._project_fingerprint = {}  # type: Dict[str, Tuple[int, int]]
+        self._apps = {}  # type: Dict[str, ReconciledApp]
+        self._live_state = None  # type: Optional[LiveState]
+        self._watcher = None  # type: Optional[LiveStateWatcher]
+        self._reported = {}  # type: Dict[Tuple[str, str, Optional[str]], str]
+        """
+        Hash of the objects which have been reported in plan mode by kind, name and namespace
+        """
+
+    def run(self):
+        """
+        Reconciles until interrupted
+        """
+        try:
+            while True:
+                start = time.monotonic()
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    self.log.error(f'Reconciliation failed: {e}')
+                    self.log.debug(traceback.format_exc())
+                time.sleep(max(0.0, self._interval - (time.monotonic() - start)))
+        finally:
+            if self._watcher is not None:
+                self._watcher.stop()
+
+    def reconcile(self) -> int:
+        """
+        Renders all changed apps and applies all objects which differ from the cluster state
+        :return: Number of objects which differ
+        """
+        if self._root_config is None or self._get_project_fingerprint() != self._project_fingerprint:
+            self._load_project()
+        self._refresh_apps()
+
+        objects = [data for app in self._apps.values() for _, items in app.instances for data, _ in items]
+        self._watcher.watch(objects, self._root_config.get_oc_project_name())
+
+        drifted = 0
+        for app in self._apps.values():
+            try:
+                drifted += self._reconcile_app(app)
+            except Exception as e:
+                self.log.error(f'Reconciliation of {app.name} failed: {e}')
+        return drifted
+
+    def _load_project(self):
+        self.log.info('Loading project ' + self._config_dir)
+        if self._watcher is not None:
+            self._watcher.stop()
+        self._project_fingerprint = self._get_project_fingerprint()
+        # The files are parsed on demand: The threads of the previous watches might still be running,
+        # forking processes to parse the files in parallel could deadlock
+        self._root_config = ProjectConfig.load(self._config_dir)
+        oc = self._root_config.create_oc()
+        self._live_state = LiveState(oc)
+        self._watcher = LiveStateWatcher(oc, self._live_state)
+        self._apps = {}
+
+    def _get_project_fingerprint(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Returns the state of all project level files (_root.yml of the project and library)
+        """
+        paths = [os.path.join(self._config_dir, '_root.yml')]
+        if self._root_config is not None and self._root_config.get_library() is not None:
+            paths.append(os.path.join(self._root_config.get_library().get_config_root(), '_root.yml'))
+        fingerprint = {}
+        for path in paths:
+            stat = os.stat(path)
+            fingerprint[path] = (stat.st_mtime_ns, stat.st_size)
+        return fingerprint
+
+    def _get_input_hash(self, name: str) -> Tuple[str, List[str]]:
+        """
+        Returns the hash of all inputs of the given app: The config and variables of all instances,
+        the files of the app and all referenced templates (recursively), the configmap source files
+        and the files read by loaders
+        :param name: App name
+        :return: Hash and all files / folders the hash depends on
+        """
+        folder = os.path.abspath(os.path.join(self._config_dir, name))
+        paths = [folder, os.path.join(folder, '_index.yml')]
+        try:
+            app_config = self._root_config.load_app_config(name)
+            # Apps of the library are located in another folder
+            app_folder = os.path.abspath(app_config.get_config_root())
+            paths.extend([app_folder, os.path.join(app_folder, '_index.yml')])
+            if app_config.is_template() or not app_config.enabled():
+                return repr(app_config.data), list(dict.fromkeys(paths))
+            factory = AppDeployRunnerFactory(self._root_config, self._mode, self._yml_cache)
+            hashes = []
+            for runner in factory.create(app_config):
+                hashes.append(runner.get_input_hash())
+                paths.extend(runner.get_input_paths())
+            return ','.join(hashes), list(dict.fromkeys(paths))
+        except Exception as e:
+            # Rendered again once the error changes, e.g. a template folder might be added
+            return 'Failed: ' + str(e), paths + [os.path.abspath(self._config_dir)]
+
+    @staticmethod
+    def _get_fingerprint(paths: List[str]) -> Dict[str, Optional[Tuple[int, int]]]:
+        """
+        Returns the modification time and size of the given files / folders
+        """
+        fingerprint = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                fingerprint[path] = None
+                continue
+            fingerprint[path] = (stat.st_mtime_ns, stat.st_size)
+        return fingerprint
+
+    def _refresh_apps(self):
+        """
+        Renders all new apps and apps whose files have changed
+        """
+        names = self._root_config.get_app_names()
+        if self._app_names is not None:
+            missing = [name for name in self._app_names if name not in names]
+            if len(missing) > 0:
+                raise FileNotFoundError(f'App folder not found: {missing}')
+            names = self._app_names
+        for name in list(self._apps.keys()):
+            if name not in names:
+                self.log.info(f'App {name} has been removed')
+                del self._apps[name]
+
+        for name in names:
+            app = self._apps.get(name)
+            if app is not None and self._get_fingerprint(list(app.fingerprint.keys())) == app.fingerprint:
+                # Cheap check, hashing all inputs reads all files
+                continue
+            input_hash, paths = self._get_input_hash(name)
+            fingerprint = self._get_fingerprint(paths)
+            if app is not None and app.input_hash == input_hash:
+                app.fingerprint = fingerprint
+                continue
+            self._apps[name] = self._render_app(name)
+            self._apps[name].input_hash = input_hash
+            self._apps[name].fingerprint = fingerprint
+            if app is not None:
+                self._log_delta(app, self._apps[name])
+
+    def _log_delta(self, previous: ReconciledApp, current: ReconciledApp):
+        """
+        Logs which rendered objects of an app have changed
+        """
+        project = self._root_config.get_oc_project_name()
+        previous_hashes = previous.get_hashes(project)
+        current_hashes = current.get_hashes(project)
+        changes = []
+        for key, hash_val in current_hashes.items():
+            previous_hash = previous_hashes.get(key)
+            if previous_hash is None:
+                changes.append('Added ' + self._format_key(key))
+            elif previous_hash != hash_val:
+                changes.append('Changed ' + self._format_key(key))
+        for key in previous_hashes:
+            if key not in current_hashes:
+                changes.append('Removed ' + self._format_key(key) + ' (the object is not deleted)')
+
+        if len(changes) == 0:
+            self.log.info(f'No changes in {current.name}')
+            return
+        for change in changes:
+            self.log.info(change)
+
+    @staticmethod
+    def _format_key(key: Tuple[str, str, Optional[str]]) -> str:
+        kind, name, namespace = key
+        return f'{kind}/{name} ({namespace})'
+
+    def _render_app(self, name: str) -> ReconciledApp:
+        """
+        Renders all instances of the given app
+        :param name: App name
+        :return: Rendered app, without instances if the app is a template, disabled or invalid
+        """
+        app = ReconciledApp(name)
+        try:
+            app_config = self._root_config.load_app_config(name)
+            if app_config.is_template() or not app_config.enabled():
+                return app
+
+            self.log.info(f'Rendering {name}')
+            factory = AppDeployRunnerFactory(self._root_config, self._mode, self._yml_cache)
+            for runner in factory.create(app_config):
+                bundle = runner.render()
+                bundle.sort()
+                items = list(zip(bundle.objects, bundle.get_hashes()))
+                app.instances.append((runner.get_app_config(), items))
+        except Exception as e:
+            # Rendered again once the files have been fixed
+            self.log.error(f'Rendering of {name} failed: {e}')
+            app.instances = []
+        return app
+
+    def _reconcile_app(self, app: ReconciledApp) -> int:
+        """
+        Applies all objects of the app which differ from the cluster state
+        :return: Number of objects which differ
+        """
+        drifted_count = 0
+        oc = self._root_config.create_oc()
+        project = self._root_config.get_oc_project_name()
+        for app_config, items in app.instances:
+            drifted = []
+            for data, hash_val in items:
+                metadata = data['metadata']
+                namespace = metadata.get('namespace', project)
+                key = (data['kind'], metadata['name'], namespace)
+                live = self._live_state.get(data['kind'], metadata['name'], namespace)
+                if live is not None and live.get_annotation(OcObjectDeployer.HASH_ANNOTATION) == hash_val:
+                    if self._reported.pop(key, None) is not None:
+                        self.log.info(self._format_key(key) + ' matches the cluster again')
+                    continue
+                if self._mode.plan:
+                    if self._reported.get(key) == hash_val:
+                        continue
+                    self._reported[key] = hash_val
+                drifted.append((data, hash_val, namespace))
+
+            if len(drifted) == 0:
+                continue
+            drifted_count += len(drifted)
+            deployer = OcObjectDeployer(self._root_config, oc, app_config, self._mode, self._live_state)
+            for data, hash_val, _ in drifted:
+                deployer.deploy_object(data, hash_val)
+            deployer.flush()
+            if self._mode.plan:
+                continue
+
+            # Don't apply the objects again until the watch reports the new state
+            for data, hash_val, namespace in drifted:
+                applied = OcObjectDeployer.with_hash(data, hash_val)
+                self._live_state.update(data['kind'], namespace, ItemDescription(applied))
+        return drifted_count
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from ok8deploy.processing.ValueLoader import LazyValue
+from ok8deploy.utils.FileUtils import FileUtils
+from ok8deploy.utils.Log import Log
+from ok8deploy.utils.YmlCache import YmlCache
+
+
+class RenderCache(Log):
+    """
+    Stores the rendered objects of app instances by the hash of all inputs of the instance (content addressed).
+    Additionally the input hash of the last successful deployment of each instance is stored,
+    which allows skipping instances which have not changed since.
+    The input hash includes the code of the package, so entries of other ok8deploy versions are never used.
+    The rendered objects might contain values of loaders (e.g. keys), so all entries are only readable by the user.
+    """
+
+    CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ok8deploy', 'render')
+    """
+    Folder in which the rendered objects and deployed hashes are stored
+    """
+
+    CACHE_VERSION = 1
+    """
+    Version of the cache format, changes of the rendering are detected using the hash of the package code
+    """
+
+    MAX_ENTRY_AGE = 30 * 24 * 3600
+    """
+    Rendered objects which haven't been used for this many seconds are removed
+    """
+
+    PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    """
+    Folder of the ok8deploy package, all of its modules are part of the input hash
+    """
+
+    _default = None  # type: Optional[RenderCache]
+    _default_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str):
+        super().__init__()
+        self._cache_dir = cache_dir
+        self._file_hashes = {}  # type: Dict[str, Tuple[Tuple[int, int], str]]
+        """
+        Fingerprint and content hash by path, files are shared by many instances
+        """
+        self._code_hash = None  # type: Optional[str]
+        """
+        Caching field
+        """
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls) -> RenderCache:
+        """
+        Returns the cache shared by the whole process, which is backed by CACHE_DIR
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = RenderCache(cls.CACHE_DIR)
+                YmlCache.prune_folder(os.path.join(cls.CACHE_DIR, 'objects'), cls.MAX_ENTRY_AGE,
+                                      YmlCache.PRUNE_INTERVAL)
+            return cls._default
+
+    def get_code_hash(self) -> str:
+        """
+        Returns the hash of all modules of the package, so an update of ok8deploy invalidates all entries
+        """
+        with self._lock:
+            if self._code_hash is not None:
+                return self._code_hash
+        code_hash = hashlib.sha256()
+        for dir_path, dir_names, files in os.walk(self.PACKAGE_DIR):
+            dir_names.sort()
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(dir_path, name)
+                    code_hash.update(os.path.relpath(path, self.PACKAGE_DIR).encode('utf-8'))
+                    code_hash.update(self.get_file_hash(path).encode('utf-8'))
+        with self._lock:
+            self._code_hash = code_hash.hexdigest()
+            return self._code_hash
+
+    def create_key(self) -> RenderKey:
+        """
+        Creates a new builder for the input hash of an instance
+        """
+        return RenderKey(self)
+
+    def get_file_hash(self, path: str) -> str:
+        """
+        Returns the hash of the content of the given file
+        :param path: Path to the file
+        :return: Hash or an empty string if the file doesn't exist
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return ''
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._file_hashes.get(path)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        content_hash = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                content_hash.update(block)
+        file_hash = content_hash.hexdigest()
+        with self._lock:
+            self._file_hashes[path] = (fingerprint, file_hash)
+        return file_hash
+
+    def load(self, key: str) -> Optional[Tuple[List[dict], List[str]]]:
+        """
+        Returns the rendered objects stored for the given input hash
+        :param key: Input hash
+        :return: Objects and their hash or None if not cached
+        """
+        path = self._get_objects_path(key)
+        try:
+            with open(path, 'rb') as f:
+                version, entry_key, objects, hashes = pickle.load(f)
+            # The modification time marks when the entry has been used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.log.debug(f'Ignoring invalid render cache entry {key}: {e}')
+            return None
+        if version != (self.CACHE_VERSION, yaml.__version__) or entry_key != key:
+            return None
+        return objects, hashes
+
+    def save(self, key: str, objects: List[dict], hashes: List[str]):
+        """
+        Stores the rendered objects of an instance
+        :param key: Input hash
+        :param objects: Rendered objects
+        :param hashes: Hash of each object
+        """
+        entry = ((self.CACHE_VERSION, yaml.__version__), key, objects, hashes)
+        self._write(self._get_objects_path(key), pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def is_deployed(self, instance: str, key: str) -> bool:
+        """
+        Checks if the given inputs have been deployed successfully the last time the instance was deployed
+        :param instance: Identifier of the instance and its target
+        :param key: Input hash
+        """
+        try:
+            with open(self._get_deployed_path(instance), 'r') as f:
+                return f.read() == key
+        except OSError:
+            return False
+
+    def set_deployed(self, instance: str, key: str):
+        """
+        Stores the input hash of a successful deployment
+        :param instance: Identifier of the instance and its target
+        :param key: Input hash
+        """
+        self._write(self._get_deployed_path(instance), key.encode('utf-8'))
+
+    def _get_objects_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, 'objects', key[:2], key + '.pickle')
+
+    def _get_deployed_path(self, instance: str) -> str:
+        name = hashlib.sha1(instance.encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, 'deployed', name[:2], name)
+
+    def _write(self, path: str, content: bytes):
+        try:
+            FileUtils.write_private(path, content)
+        except OSError as e:
+            self.log.debug(f'Could not write render cache entry {path}: {e}')
+
+
+class RenderKey:
+    """
+    Builds the hash of all inputs of a rendered instance
+    """
+
+    def __init__(self, cache: RenderCache):
+        self._cache = cache
+        self._files = []  # type: List[str]
+        """
+        All files which have been added, including the files of loaders
+        """
+        self._hash = hashlib.sha256()
+        self._hash.update(repr((RenderCache.CACHE_VERSION, yaml.__version__, cache.get_code_hash())).encode('utf-8'))
+
+    def add_value(self, name: str, value: any):
+        """
+        Adds a config or variables, values of loaders are represented by their configuration and files
+        :param name: Name of the input
+        :param value: Value consisting of yml types
+        """
+        if isinstance(value, dict):
+            value = {key: self._get_loader_inputs(item) if isinstance(item, LazyValue) else item
+                     for key, item in value.items()}
+        self._update(name, repr(value))
+
+    def add_file(self, path: str):
+        """
+        Adds the content of a file
+        :param path: Path to the file
+        """
+        path = os.path.abspath(path)
+        self._files.append(path)
+        self._update('file:' + path, self._cache.get_file_hash(path))
+
+    def get_files(self) -> List[str]:
+        """
+        Returns all files the hash depends on
+        """
+        return self._files
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def _get_loader_inputs(self, value: LazyValue) -> Tuple[str, str, List[str]]:
+        loader_name, data, files = value.get_inputs()
+        self._files.extend(os.path.abspath(path) for path in files)
+        return loader_name, repr(data), [self._cache.get_file_hash(path) for path in files]
+
+    def _update(self, name: str, value: str):
+        # Length prefixed, so the inputs can't be confused with each other
+        for part in [name, value]:
+            encoded = part.encode('utf-8')
+            self._hash.update(len(encoded).to_bytes(8, 'big'))
+            self._hash.update(encoded)
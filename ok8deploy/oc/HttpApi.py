@@ -0,0 +1,545 @@
+from __future__ import annotations
+
+import base64
+import http.client
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+from ok8deploy.oc.KubeConfig import KubeConfig
+from ok8deploy.oc.Model import ApiResource, ItemDescription, PodData
+from ok8deploy.oc.Oc import K8Api, Oc, K8
+from ok8deploy.utils.Yml import Yml
+
+
+class ConnectionPool:
+    """
+    Keeps idle keep-alive connections to a single server so they can be reused by later requests
+    """
+
+    IDEMPOTENT_METHODS = ['GET', 'PUT', 'PATCH', 'DELETE']
+    """
+    Requests which can be sent again if the server closed a reused connection
+    """
+
+    def __init__(self, url: str, ssl_context: Optional[ssl.SSLContext], max_idle: int = 16, timeout: float = 60):
+        parsed = urlparse(url)
+        self._https = parsed.scheme == 'https'
+        self._host = parsed.hostname
+        self._port = parsed.port or (443 if self._https else 80)
+        self._path_prefix = parsed.path.rstrip('/')
+        self._ssl_context = ssl_context
+        self._max_idle = max_idle
+        self._timeout = timeout
+        self._idle = []  # type: List[http.client.HTTPConnection]
+        self._lock = threading.Lock()
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Dict[str, str] = None) -> Tuple[int, bytes]:
+        """
+        Executes a single request
+        :param method: Http method
+        :param path: Path including the query
+        :param body: Request body
+        :param headers: Request headers
+        :return: Status code and response body
+        """
+        headers = headers or {}
+        for attempt in range(2):
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, self._path_prefix + path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                # The state of the connection is unknown (e.g. after a timeout), it can't be reused
+                conn.close()
+                closed = isinstance(e, (http.client.HTTPException, ConnectionError))
+                if reused and attempt == 0 and closed and method in self.IDEMPOTENT_METHODS:
+                    # The server closed the idle connection, try again with a new one.
+                    # Other requests (e.g. POST) might have been processed already.
+                    continue
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, data
+
+    def open(self, method: str, path: str, headers: Dict[str, str],
+             timeout: Optional[float] = None) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Executes a request on a new connection without reading the response (used for streams).
+        The caller has to close the connection.
+        :param method: Http method
+        :param path: Path including the query
+        :param headers: Request headers
+        :param timeout: Socket timeout, the timeout of the pool is used if not defined
+        :return: Connection and response
+        """
+        timeout = timeout or self._timeout
+        if self._https:
+            conn = http.client.HTTPSConnection(self._host, self._port, timeout=timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+        try:
+            conn.request(method, self._path_prefix + path, headers=headers)
+            return conn, conn.getresponse()
+        except BaseException:
+            conn.close()
+            raise
+
+    def connect(self) -> socket.socket:
+        """
+        Opens a new raw socket to the server (used for protocol upgrades)
+        """
+        sock = socket.create_connection((self._host, self._port), timeout=self._timeout)
+        if self._https:
+            sock = self._ssl_context.wrap_socket(sock, server_hostname=self._host)
+        return sock
+
+    def get_host(self) -> str:
+        return self._host
+
+    def get_path_prefix(self) -> str:
+        return self._path_prefix
+
+    def close(self):
+        """
+        Closes all idle connections
+        """
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if len(self._idle) > 0:
+                return self._idle.pop(), True
+        if self._https:
+            return http.client.HTTPSConnection(self._host, self._port, timeout=self._timeout,
+                                               context=self._ssl_context), False
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout), False
+
+    def _release(self, conn: http.client.HTTPConnection):
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+class HttpApi(K8Api):
+    """
+    Talks to the api server directly instead of forking oc / kubectl for every call.
+    Objects are applied using oc / kubectl (client side apply) so the ownership of fields is the same
+    as with the cli client. Server side apply has to be enabled explicitly.
+    """
+
+    FIELD_MANAGER = 'ok8deploy'
+    EXEC_PROTOCOL = 'v4.channel.k8s.io'
+    STREAM_TIMEOUT = 600
+    """
+    Socket timeout in seconds for watch streams, needs to be larger than the timeout of the watch itself
+    """
+
+    def __init__(self, context: Optional[str] = None, openshift: bool = False, server_side_apply: bool = False):
+        """
+        :param context: Kubeconfig context, the current context is used if not defined
+        :param openshift: True if openshift specific calls (e.g. for deployment configs) should be used
+        :param server_side_apply: True if objects should be applied using server side apply (with forced conflicts)
+        """
+        super().__init__(context)
+        self._openshift = openshift
+        self._server_side_apply = server_side_apply
+        self._cli = Oc(context) if openshift else K8(context)
+        """
+        Client used for client side apply
+        """
+        self._config = None  # type: Optional[KubeConfig]
+        self._pool = None  # type: Optional[ConnectionPool]
+        self._group_resources = {}  # type: Dict[str, List[ApiResource]]
+        """
+        Discovered resources by group version
+        """
+        self._preferred_versions = None  # type: Optional[List[str]]
+        self._lock = threading.RLock()
+
+    def get_namespaces(self) -> List[str]:
+        data = self._request('GET', '/api/v1/namespaces')
+        return ['namespace/' + item['metadata']['name'] for item in data['items']]
+
+    def tag(self, source: str, dest: str, namespace: Optional[str] = None):
+        raise NotImplementedError('Not available for the http client')
+
+    def get(self, name: str, namespace: Optional[str] = None) -> Optional[ItemDescription]:
+        kind, item_name = name.split('/', 1)
+        resource = self._find_resource(kind)
+        data = self._request('GET', resource.get_path(self._get_namespace(namespace), item_name),
+                             allow_not_found=True)
+        if data is None:
+            return None
+        return ItemDescription(data)
+
+    def get_all(self, kind: str, namespace: Optional[str] = None) -> List[ItemDescription]:
+        resource = self._find_resource(kind)
+        data = self._request('GET', resource.get_path(self._get_namespace(namespace)))
+        items = []
+        for item in data.get('items', []):
+            # Items of a list don't contain their type
+            item.setdefault('apiVersion', resource.api_version)
+            item.setdefault('kind', resource.kind)
+            items.append(ItemDescription(item))
+        return items
+
+    def _discover_api_resources(self) -> List[ApiResource]:
+        resources = []
+        for group_version in self._get_preferred_versions():
+            resources.extend(self._get_group_resources(group_version))
+        return resources
+
+    def _get_cluster_id(self) -> Optional[str]:
+        config = self._get_config()
+        return config.server + '|' + config.context
+
+    def _get_raw(self, path: str) -> dict:
+        return self._request('GET', path)
+
+    def _stream_raw(self, path: str) -> Iterator[str]:
+        self.log.debug(f'GET {path} (stream)')
+        conn, response = self._get_pool().open('GET', path, self._get_headers(), timeout=self.STREAM_TIMEOUT)
+        try:
+            if response.status >= 400:
+                self._raise_error('GET', path, response.status, response.read())
+            for line in response:
+                yield line.decode('utf-8')
+        finally:
+            conn.close()
+
+    def apply(self, yml: str, namespace: Optional[str] = None) -> str:
+        self._invalidate_pods(yml)
+        if not self._server_side_apply:
+            return self._cli.apply(yml, namespace)
+
+        objects = []
+        for doc in Yml.load_all(yml):
+            if doc.get('kind') == 'List':
+                objects.extend(doc.get('items', []))
+                continue
+            objects.append(doc)
+
+        output = []
+        errors = []
+        for data in objects:
+            metadata = data['metadata']
+            resource = self._find_resource(data['kind'], data.get('apiVersion'))
+            path = resource.get_path(metadata.get('namespace', self._get_namespace(namespace)),
+                                  metadata['name'])
+            query = urlencode({'fieldManager': self.FIELD_MANAGER, 'force': 'true'})
+            try:
+                self._request('PATCH', path + '?' + query, json.dumps(data),
+                              content_type='application/apply-patch+yaml')
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            output.append(f'{resource.kind.lower()}/{metadata["name"]} serverside-applied')
+
+        if len(errors) > 0:
+            raise Exception('\n'.join(errors))
+        return '\n'.join(output)
+
+    def _get_pods(self, label_selector: Optional[str], field_selector: Optional[str],
+                  namespace: Optional[str]) -> List[PodData]:
+        query = {}
+        if label_selector is not None:
+            query['labelSelector'] = label_selector
+        if field_selector is not None:
+            query['fieldSelector'] = field_selector
+        path = f'/api/v1/namespaces/{self._get_namespace(namespace)}/pods'
+        if len(query) > 0:
+            path += '?' + urlencode(query)
+        return self._parse_pods(self._request('GET', path))
+
+    def _get_pod_selector(self, dc_name: str, namespace: Optional[str]) -> Optional[str]:
+        if self._openshift:
+            return super()._get_pod_selector(dc_name, namespace)
+        return self._get_deployment_selector(dc_name, namespace)
+
+    def rollout(self, name: str, namespace: Optional[str] = None):
+        self._invalidate_pods()
+        namespace = self._get_namespace(namespace)
+        if self._openshift:
+            self._request('POST', f'/apis/apps.openshift.io/v1/namespaces/{namespace}/deploymentconfigs/{name}'
+                                  f'/instantiate', json.dumps({
+                'kind': 'DeploymentRequest',
+                'apiVersion': 'apps.openshift.io/v1',
+                'name': name,
+                'latest': True,
+                'force': True
+            }))
+            return
+
+        # Same as "kubectl rollout restart"
+        restarted_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self._request('PATCH', f'/apis/apps/v1/namespaces/{namespace}/deployments/{name}', json.dumps({
+            'spec': {'template': {'metadata': {'annotations': {
+                'kubectl.kubernetes.io/restartedAt': restarted_at
+            }}}}
+        }), content_type='application/strategic-merge-patch+json')
+
+    def exec(self, pod_name: str, cmd: str, args: List[str], namespace: Optional[str] = None,
+             timeout: Optional[float] = None):
+        query = [('command', cmd)]
+        query.extend([('command', arg) for arg in args])
+        query.extend([('stdout', 'true'), ('stderr', 'true')])
+        path = f'/api/v1/namespaces/{self._get_namespace(namespace)}/pods/{pod_name}/exec?' + urlencode(query)
+        self.log.info(str([pod_name, cmd] + args))
+
+        stdout, stderr, error = self._exec_websocket(path, timeout)
+        if error is not None and error.get('status') != 'Success':
+            raise Exception('Failed: ' + error.get('message', '') + '\n' + stderr)
+        self.log.info(stdout)
+
+    def annotate(self, name: str, key: str, value: str, namespace: Optional[str] = None):
+        patch = json.dumps({'metadata': {'annotations': {key: value}}})
+        kind, item_name = name.split('/', 1)
+        resource = self._find_resource(kind)
+        self._request('PATCH', resource.get_path(self._get_namespace(namespace), item_name), patch,
+                      content_type='application/merge-patch+json')
+
+    def close(self):
+        """
+        Closes all idle connections
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+
+    def _get_namespace(self, namespace: Optional[str]) -> str:
+        """
+        Returns the given namespace or the default namespace of the context
+        """
+        if namespace is not None:
+            return namespace
+        return self._get_config().namespace
+
+    def _get_config(self) -> KubeConfig:
+        with self._lock:
+            if self._config is None:
+                self._config = KubeConfig.load(self._context)
+            return self._config
+
+    def _get_pool(self) -> ConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                config = self._get_config()
+                self._pool = ConnectionPool(config.server, config.create_ssl_context())
+            return self._pool
+
+    def _get_headers(self) -> Dict[str, str]:
+        headers = {'Accept': 'application/json'}
+        authorization = self._get_config().get_authorization()
+        if authorization is not None:
+            headers['Authorization'] = authorization
+        return headers
+
+    def _request(self, method: str, path: str, body: Optional[str] = None,
+                 content_type: str = 'application/json', allow_not_found: bool = False) -> Optional[dict]:
+        """
+        Executes a request against the api server
+        :param method: Http method
+        :param path: Path (including query)
+        :param body: Request body
+        :param content_type: Content type of the body
+        :param allow_not_found: True if None should be returned if the object doesn't exist
+        :return: Parsed response
+        :raise Exception: Gets raised if the server returns an error
+        """
+        self.log.debug(f'{method} {path}')
+        headers = self._get_headers()
+        body_bytes = None
+        if body is not None:
+            headers['Content-Type'] = content_type
+            body_bytes = body.encode('utf-8')
+
+        status, data = self._get_pool().request(method, path, body_bytes, headers)
+        if status == 404 and allow_not_found:
+            return None
+        if status >= 400:
+            self._raise_error(method, path, status, data)
+        if len(data) == 0:
+            return {}
+        return json.loads(data)
+
+    @staticmethod
+    def _raise_error(method: str, path: str, status: int, data: bytes):
+        message = data.decode('utf-8', errors='replace')
+        try:
+            error = json.loads(message)
+            message = f'{error.get("reason", "")}: {error.get("message", "")}'
+        except ValueError:
+            pass
+        raise Exception(f'Failed: {method} {path} returned {status} {message}')
+
+    def _find_resource(self, kind: str, api_version: Optional[str] = None) -> ApiResource:
+        """
+        Finds the resource type for the given kind
+        :param kind: Kind or resource name, optionally suffixed by the group (e.g. "deployments.apps")
+        :param api_version: Group version of the kind
+        :return: Resource
+        :raise Exception: Gets raised if the kind is not known by the server
+        """
+        resource = self._match_resource(self.get_api_resources(), kind, api_version)
+        if resource is None and self.is_discovery_cached():
+            # The disk cache might be outdated (e.g. a new CRD has been added)
+            self.invalidate_discovery()
+            resource = self._match_resource(self.get_api_resources(), kind, api_version)
+        if resource is None and api_version is not None:
+            # Not the preferred version of the group
+            resource = self._match_resource(self._get_group_resources(api_version), kind, api_version)
+        if resource is None:
+            raise Exception(f'Failed: the server doesn\'t have a resource type "{kind}"')
+        return resource
+
+    @staticmethod
+    def _match_resource(resources: List[ApiResource], kind: str, api_version: Optional[str]) -> Optional[ApiResource]:
+        for resource in resources:
+            if api_version is not None and resource.api_version != api_version:
+                continue
+            if resource.matches(kind):
+                return resource
+        return None
+
+    def _get_preferred_versions(self) -> List[str]:
+        """
+        Returns the preferred version of all api groups, the core group comes first
+        """
+        if self._preferred_versions is not None:
+            return self._preferred_versions
+
+        versions = ['v1']
+        data = self._request('GET', '/apis')
+        for group in data.get('groups', []):
+            versions.append(group['preferredVersion']['groupVersion'])
+        self._preferred_versions = versions
+        return versions
+
+    def _get_group_resources(self, group_version: str) -> List[ApiResource]:
+        """
+        Returns all resources of the given group version
+        """
+        resources = self._group_resources.get(group_version)
+        if resources is not None:
+            return resources
+
+        path = '/api/v1' if group_version == 'v1' else '/apis/' + group_version
+        try:
+            data = self._request('GET', path)
+        except Exception as e:
+            # Aggregated apis might not be available
+            self.log.debug(f'Discovery of {group_version} failed: {e}')
+            data = {}
+
+        resources = []
+        for item in data.get('resources', []):
+            if '/' in item['name']:
+                # Sub resource
+                continue
+            resources.append(ApiResource(item['name'], group_version, item['kind'], item['namespaced'],
+                                         item.get('verbs'), item.get('shortNames'),
+                                         item.get('singularName', '')))
+        self._group_resources[group_version] = resources
+        return resources
+
+    def _exec_websocket(self, path: str, timeout: Optional[float] = None) -> Tuple[str, str, Optional[dict]]:
+        """
+        Executes the given exec request using the websocket protocol
+        :param path: Exec path including the query
+        :param timeout: Timeout in seconds
+        :return: Stdout, stderr and the status reported by the server
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        pool = self._get_pool()
+        headers = self._get_headers()
+        headers.update({
+            'Host': pool.get_host(),
+            'Connection': 'Upgrade',
+            'Upgrade': 'websocket',
+            'Sec-WebSocket-Version': '13',
+            'Sec-WebSocket-Key': base64.b64encode(os.urandom(16)).decode('utf-8'),
+            'Sec-WebSocket-Protocol': self.EXEC_PROTOCOL,
+        })
+        request = f'GET {pool.get_path_prefix()}{path} HTTP/1.1\r\n'
+        request += ''.join(f'{key}: {value}\r\n' for key, value in headers.items()) + '\r\n'
+
+        with pool.connect() as sock, sock.makefile('rb') as reader:
+            sock.sendall(request.encode('utf-8'))
+            status_line = reader.readline().decode('utf-8', errors='replace')
+            while reader.readline() not in [b'\r\n', b'\n', b'']:
+                # Skip headers
+                pass
+            if ' 101 ' not in status_line:
+                raise Exception(f'Failed: exec returned {status_line.strip()}')
+
+            channels = {1: bytearray(), 2: bytearray(), 3: bytearray()}
+            channel = None
+            while True:
+                if deadline is not None:
+                    sock.settimeout(max(deadline - time.monotonic(), 0.001))
+                try:
+                    frame = self.read_frame(reader)
+                except socket.timeout:
+                    raise Exception(f'Failed: timeout after {timeout}s')
+                if frame is None:
+                    break
+                opcode, payload = frame
+                if opcode == 8:
+                    # Close
+                    break
+                if opcode in [1, 2] and len(payload) > 0:
+                    channel = payload[0]
+                    payload = payload[1:]
+                elif opcode != 0:
+                    # Ping / pong
+                    continue
+                if channel in channels:
+                    channels[channel].extend(payload)
+
+        error = None
+        if len(channels[3]) > 0:
+            error = json.loads(channels[3].decode('utf-8'))
+        return channels[1].decode('utf-8', errors='replace'), channels[2].decode('utf-8', errors='replace'), error
+
+    @staticmethod
+    def read_frame(reader) -> Optional[Tuple[int, bytes]]:
+        """
+        Reads a single websocket frame
+        :param reader: Binary stream
+        :return: Opcode and payload or None if the stream ended
+        """
+        header = reader.read(2)
+        if len(header) < 2:
+            return None
+        opcode = header[0] & 0x0f
+        masked = header[1] & 0x80
+        length = header[1] & 0x7f
+        if length == 126:
+            length = struct.unpack('>H', reader.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', reader.read(8))[0]
+        mask = reader.read(4) if masked else None
+        payload = reader.read(length)
+        if mask is not None:
+            payload = bytes(byte ^ mask[idx % 4] for idx, byte in enumerate(payload))
+        return opcode, payload
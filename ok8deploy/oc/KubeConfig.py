@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from ok8deploy.utils.Errors import ConfigError
+from ok8deploy.utils.Yml import Yml
+
+
+class KubeConfig:
+    """
+    Minimal kubeconfig reader which provides everything required for talking to the api server directly
+    """
+
+    PATH_KEYS = ['certificate-authority', 'client-certificate', 'client-key', 'tokenFile']
+    """
+    Keys which reference files relative to the kubeconfig file
+    """
+
+    def __init__(self, data: dict, context: Optional[str] = None):
+        if context is None:
+            context = data.get('current-context')
+        if context is None or context == '':
+            raise ConfigError('No kubeconfig context selected')
+
+        context_data = self._find(data, 'contexts', 'context', context)
+        self.context = context
+        self.namespace = context_data.get('namespace', 'default')  # type: str
+        """
+        Default namespace of the context
+        """
+        self._cluster = self._find(data, 'clusters', 'cluster', context_data['cluster'])
+        self._user = {}  # type: Dict[str, any]
+        if context_data.get('user') is not None:
+            self._user = self._find(data, 'users', 'user', context_data['user'])
+        self.server = self._cluster['server'].rstrip('/')  # type: str
+
+        self._exec_token = None  # type: Optional[str]
+        self._exec_token_expiry = None  # type: Optional[datetime]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, context: Optional[str] = None) -> KubeConfig:
+        """
+        Loads the kubeconfig referenced by the KUBECONFIG environment variable (or ~/.kube/config)
+        :param context: Context which should be used, the current context is used if not defined
+        :return: Config
+        """
+        paths = [path for path in os.environ.get('KUBECONFIG', '').split(os.pathsep) if path != '']
+        if len(paths) == 0:
+            paths = [os.path.join(os.path.expanduser('~'), '.kube', 'config')]
+
+        merged = {'clusters': [], 'users': [], 'contexts': []}
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            with open(path, 'r') as stream:
+                data = Yml.load(stream) or {}
+            base_dir = os.path.dirname(os.path.abspath(path))
+            for key in ['clusters', 'users', 'contexts']:
+                for entry in data.get(key) or []:
+                    cls._resolve_paths(entry, base_dir)
+                    merged[key].append(entry)
+            if 'current-context' not in merged and data.get('current-context'):
+                merged['current-context'] = data['current-context']
+        return KubeConfig(merged, context)
+
+    def create_ssl_context(self) -> Optional[ssl.SSLContext]:
+        """
+        Creates the ssl context for the configured cluster and user
+        :return: Context or None if the server doesn't use TLS
+        """
+        if not self.server.startswith('https://'):
+            return None
+
+        context = ssl.create_default_context()
+        if self._cluster.get('insecure-skip-tls-verify', False):
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+
+        ca_data = self._cluster.get('certificate-authority-data')
+        if ca_data is not None:
+            context.load_verify_locations(cadata=base64.b64decode(ca_data).decode('utf-8'))
+        elif self._cluster.get('certificate-authority') is not None:
+            context.load_verify_locations(cafile=self._cluster['certificate-authority'])
+
+        cert_data = self._user.get('client-certificate-data')
+        key_data = self._user.get('client-key-data')
+        if cert_data is not None and key_data is not None:
+            self._load_cert_data(context, base64.b64decode(cert_data), base64.b64decode(key_data))
+        elif self._user.get('client-certificate') is not None:
+            context.load_cert_chain(self._user['client-certificate'], self._user.get('client-key'))
+        return context
+
+    def get_authorization(self) -> Optional[str]:
+        """
+        Returns the value of the authorization header
+        :return: Header value or None if no token based authentication is configured
+        """
+        token = self._user.get('token')
+        if token is None and self._user.get('tokenFile') is not None:
+            with open(self._user['tokenFile'], 'r') as f:
+                token = f.read().strip()
+        if token is None and self._user.get('exec') is not None:
+            token = self._get_exec_token()
+        if token is not None:
+            return 'Bearer ' + token
+
+        username = self._user.get('username')
+        if username is not None:
+            credentials = username + ':' + self._user.get('password', '')
+            return 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
+        return None
+
+    def _get_exec_token(self) -> str:
+        """
+        Runs the configured credential plugin and returns the token.
+        The token is cached until it expires.
+        """
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            if self._exec_token is not None and (self._exec_token_expiry is None or self._exec_token_expiry > now):
+                return self._exec_token
+
+            exec_config = self._user['exec']
+            args = [exec_config['command']]
+            args.extend(exec_config.get('args') or [])
+            env = dict(os.environ)
+            for item in exec_config.get('env') or []:
+                env[item['name']] = item['value']
+
+            result = subprocess.run(args, capture_output=True, env=env)
+            if result.returncode != 0:
+                raise Exception('Credential plugin failed: ' + result.stderr.decode('utf-8'))
+            status = json.loads(result.stdout.decode('utf-8')).get('status', {})
+            if 'token' not in status:
+                raise ConfigError('Credential plugin did not return a token')
+
+            self._exec_token = status['token']
+            self._exec_token_expiry = None
+            expiry = status.get('expirationTimestamp')
+            if expiry is not None:
+                self._exec_token_expiry = datetime.fromisoformat(expiry.replace('Z', '+00:00'))
+            return self._exec_token
+
+    @staticmethod
+    def _load_cert_data(context: ssl.SSLContext, cert: bytes, key: bytes):
+        """
+        Loads the given client certificate into the context.
+        The ssl module only supports files, so the data is written into a temporary directory.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cert_file = os.path.join(temp_dir, 'cert.pem')
+            key_file = os.path.join(temp_dir, 'key.pem')
+            with open(cert_file, 'wb') as f:
+                f.write(cert)
+            with open(key_file, 'wb') as f:
+                f.write(key)
+            context.load_cert_chain(cert_file, key_file)
+
+    @classmethod
+    def _resolve_paths(cls, entry: dict, base_dir: str):
+        """
+        Makes all file references of the given entry absolute
+        """
+        for value in entry.values():
+            if not isinstance(value, dict):
+                continue
+            for key in cls.PATH_KEYS:
+                path = value.get(key)
+                if path is not None and not os.path.isabs(path):
+                    value[key] = os.path.join(base_dir, path)
+
+    @staticmethod
+    def _find(data: dict, list_key: str, item_key: str, name: str) -> dict:
+        items = data.get(list_key) or []  # type: List[dict]
+        for item in items:
+            if item.get('name') == name:
+                return item.get(item_key) or {}
+        raise ConfigError(f'{item_key} {name} not found in kubeconfig')
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+from urllib.parse import quote
 
 from ok8deploy.utils.DictUtils import DictUtils
 
@@ -19,11 +20,100 @@ class ItemDescription:
     def __init__(self, data):
         self.data = data
 
+    def get_name(self) -> str:
+        return self.data.get('metadata', {}).get('name')
+
     def get_annotation(self, key: str) -> str:
         item = self.data.get('metadata', {}).get('annotations', {}).get(key)
         return item
 
 
+class ApiResource:
+    """
+    Resource type as reported by the api discovery
+    """
+
+    def __init__(self, name: str, api_version: str, kind: str, namespaced: bool, verbs: List[str] = None,
+                 short_names: List[str] = None, singular_name: str = ''):
+        self.name = name
+        """
+        Plural resource name (e.g. "deployments")
+        """
+        self.api_version = api_version
+        """
+        Group and version (e.g. "apps/v1")
+        """
+        self.kind = kind
+        self.namespaced = namespaced
+        self.verbs = verbs or []
+        self.short_names = short_names or []
+        self.singular_name = singular_name
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'apiVersion': self.api_version,
+            'kind': self.kind,
+            'namespaced': self.namespaced,
+            'verbs': self.verbs,
+            'shortNames': self.short_names,
+            'singularName': self.singular_name,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> ApiResource:
+        return ApiResource(data['name'], data['apiVersion'], data['kind'], data['namespaced'], data.get('verbs'),
+                           data.get('shortNames'), data.get('singularName', ''))
+
+    def get_group(self) -> str:
+        """
+        Returns the api group, empty for the core group
+        """
+        if '/' not in self.api_version:
+            return ''
+        return self.api_version.split('/')[0]
+
+    def get_full_name(self) -> str:
+        """
+        Returns the resource name suffixed by the group (e.g. "deployments.apps")
+        """
+        group = self.get_group()
+        if group == '':
+            return self.name
+        return self.name + '.' + group
+
+    def get_path(self, namespace: Optional[str] = None, name: Optional[str] = None) -> str:
+        """
+        Returns the api path of this resource
+        :param namespace: Namespace, the path refers to all namespaces if not defined
+        :param name: Object name, the path refers to the collection if not defined
+        :return: Path
+        """
+        if self.get_group() == '':
+            path = '/api/' + self.api_version
+        else:
+            path = '/apis/' + self.api_version
+        if self.namespaced and namespace is not None:
+            path += '/namespaces/' + namespace
+        path += '/' + self.name
+        if name is not None:
+            path += '/' + quote(name)
+        return path
+
+    def matches(self, name: str) -> bool:
+        """
+        Checks if the given kind / resource name (optionally suffixed with the group) refers to this resource
+        :param name: Name, e.g. "Deployment", "deployments" or "deployments.apps"
+        """
+        name = name.lower()
+        group = None
+        if '.' in name:
+            name, group = name.split('.', 1)
+        if group is not None and group != self.get_group():
+            return False
+        return name in [self.kind.lower(), self.name, self.singular_name] or name in self.short_names
+
+
 class PodData:
     def __init__(self):
         self.name = ''
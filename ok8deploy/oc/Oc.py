@@ -1,23 +1,65 @@
 import json
+import os
 import platform
+import re
 import subprocess
+import threading
+import time
 from abc import abstractmethod
-from typing import Optional, List
+from typing import Dict, Iterator, Optional, List, Tuple
+from urllib.parse import urlencode
 
-from ok8deploy.oc.Model import ItemDescription, PodData
+from ok8deploy.oc.Model import ApiResource, ItemDescription, PodData
 from ok8deploy.utils.Log import Log
 
 
 class K8Api(Log):
-    def __init__(self):
+    """
+    Client for the cluster api.
+    The client doesn't keep any state, the namespace is passed to every call
+    so a single instance can be used by multiple threads.
+    """
+
+    POD_CACHE_TTL = 10
+    """
+    Time in seconds for which pods are cached
+    """
+    WORKLOAD_PATTERN = re.compile(r'^\s*kind: (Pod|Deployment|DeploymentConfig|ReplicaSet|ReplicationController|'
+                                  r'StatefulSet|DaemonSet)\s*$', re.MULTILINE)
+    """
+    Matches yml which contains objects that affect pods
+    """
+    DISCOVERY_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.kube', 'cache', 'ok8deploy')
+    DISCOVERY_CACHE_TTL = 6 * 3600
+    """
+    Time in seconds for which the discovered resource types are cached on disk
+    """
+
+    def __init__(self, context: Optional[str] = None):
+        """
+        :param context: Configuration context which should be used, the current context is used if not defined
+        """
         super().__init__('K8Api')
+        self._context = context
+        self._pod_cache = {}  # type: Dict[Tuple[Optional[str], Optional[str], Optional[str]], Tuple[float, List[PodData]]]
+        """
+        Pods by (namespace, dc name, pod name) and the time they have been fetched
+        """
+        self._pod_cache_lock = threading.Lock()
+        self._api_resources = None  # type: Optional[List[ApiResource]]
+        self._api_resources_cached = False
+        """
+        True if the resource types have been loaded from the disk cache
+        """
+        self._discovery_lock = threading.RLock()
 
     @abstractmethod
-    def tag(self, source: str, dest: str):
+    def tag(self, source: str, dest: str, namespace: Optional[str] = None):
         """
         Tags the given image stream (OC only!)
         :param source: Source tag
         :param dest: Destination tag
+        :param namespace: Namespace, the default namespace of the context is used if not defined
         """
         raise NotImplemented
 
@@ -28,85 +70,395 @@ class K8Api(Log):
         """
 
     @abstractmethod
-    def get(self, name: str) -> Optional[ItemDescription]:
+    def get(self, name: str, namespace: Optional[str] = None) -> Optional[ItemDescription]:
         """
         Returns the given item
         :param name: Name
+        :param namespace: Namespace, the default namespace of the context is used if not defined
         :return: Data (if found)
         """
         raise NotImplemented
 
     @abstractmethod
-    def apply(self, yml: str) -> str:
+    def get_all(self, kind: str, namespace: Optional[str] = None) -> List[ItemDescription]:
+        """
+        Returns all items of the given kind
+        :param kind: Object kind
+        :param namespace: Namespace, the default namespace of the context is used if not defined
+        :return: Items
+        """
+        raise NotImplemented
+
+    def iter_all(self, resource: ApiResource, namespace: Optional[str] = None, chunk_size: int = 500) \
+            -> Iterator[ItemDescription]:
+        """
+        Returns all items of the given resource type.
+        The items are fetched page by page, only a single page is kept in memory.
+        :param resource: Resource type
+        :param namespace: Namespace, the items of all namespaces are returned if not defined
+        :param chunk_size: Number of items per page
+        :return: Items
+        """
+        path = resource.get_path(namespace)
+        continue_token = None
+        while True:
+            query = {'limit': chunk_size}
+            if continue_token is not None:
+                query['continue'] = continue_token
+            data = self._get_raw(path + '?' + urlencode(query))
+            for item in data.get('items', []):
+                # Items of a list don't contain their type
+                item.setdefault('apiVersion', resource.api_version)
+                item.setdefault('kind', resource.kind)
+                yield ItemDescription(item)
+            continue_token = data.get('metadata', {}).get('continue')
+            if not continue_token:
+                return
+
+    def get_api_resources(self, namespaced: Optional[bool] = None) -> List[ApiResource]:
+        """
+        Returns all resource types known by the server.
+        The result is cached on disk per cluster and context for DISCOVERY_CACHE_TTL seconds.
+        :param namespaced: True if only namespaced resources should be returned, False for cluster scoped ones
+        :return: Resources
+        """
+        with self._discovery_lock:
+            if self._api_resources is None:
+                self._api_resources = self._load_discovery_cache()
+                self._api_resources_cached = self._api_resources is not None
+            if self._api_resources is None:
+                self._api_resources = self._discover_api_resources()
+                self._save_discovery_cache(self._api_resources)
+            resources = self._api_resources
+        if namespaced is None:
+            return list(resources)
+        return [resource for resource in resources if resource.namespaced == namespaced]
+
+    def is_discovery_cached(self) -> bool:
+        """
+        Returns true if the current resource types have been loaded from the disk cache
+        """
+        return self._api_resources_cached
+
+    def invalidate_discovery(self):
+        """
+        Drops the cached resource types, the next call to get_api_resources() queries the server again
+        """
+        with self._discovery_lock:
+            self._api_resources = None
+            self._api_resources_cached = False
+            path = self._get_discovery_cache_path()
+            if path is not None and os.path.isfile(path):
+                os.remove(path)
+
+    @abstractmethod
+    def _discover_api_resources(self) -> List[ApiResource]:
+        """
+        Queries all resource types from the server
+        :return: Resources, the preferred version of each group
+        """
+        raise NotImplemented
+
+    def _get_cluster_id(self) -> Optional[str]:
+        """
+        Returns an identifier of the cluster and context used for the disk caches
+        :return: Identifier or None if the cluster is not known
+        """
+        # Only imported when used, parsing certificates requires the slow to import ssl stack
+        from ok8deploy.oc.KubeConfig import KubeConfig
+        try:
+            config = KubeConfig.load(self._context)
+        except Exception as e:
+            self.log.debug(f'Could not load kubeconfig: {e}')
+            return None
+        return config.server + '|' + config.context
+
+    def _get_discovery_cache_path(self) -> Optional[str]:
+        cluster_id = self._get_cluster_id()
+        if cluster_id is None:
+            return None
+        file_name = re.sub(r'[^A-Za-z0-9.\-]', '_', cluster_id) + '.json'
+        return os.path.join(self.DISCOVERY_CACHE_DIR, 'discovery', file_name)
+
+    def _load_discovery_cache(self) -> Optional[List[ApiResource]]:
+        path = self._get_discovery_cache_path()
+        if path is None or not os.path.isfile(path):
+            return None
+        if time.time() - os.path.getmtime(path) > self.DISCOVERY_CACHE_TTL:
+            return None
+        try:
+            with open(path, 'r') as f:
+                return [ApiResource.from_dict(item) for item in json.load(f)]
+        except (OSError, ValueError, KeyError) as e:
+            self.log.debug(f'Ignoring discovery cache {path}: {e}')
+            return None
+
+    def _save_discovery_cache(self, resources: List[ApiResource]):
+        path = self._get_discovery_cache_path()
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.' + str(os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump([resource.to_dict() for resource in resources], f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.log.debug(f'Could not write discovery cache {path}: {e}')
+
+    def find_api_resource(self, kind: str, api_version: Optional[str] = None) -> Optional[ApiResource]:
+        """
+        Finds the resource type of the given kind in the (cached) discovery
+        :param kind: Kind or resource name, optionally suffixed by the group (e.g. "deployments.apps")
+        :param api_version: Group version of the kind
+        :return: Resource or None if not known
+        """
+        for resource in self.get_api_resources():
+            if api_version is not None and resource.api_version != api_version:
+                continue
+            if resource.matches(kind):
+                return resource
+        return None
+
+    def list_with_version(self, resource: ApiResource, namespace: Optional[str] = None) \
+            -> Tuple[List[ItemDescription], str]:
+        """
+        Lists all items of the given resource type
+        :param resource: Resource type
+        :param namespace: Namespace, the items of all namespaces are returned if not defined
+        :return: Items and the resource version of the list (which can be used to start a watch)
+        """
+        data = self._get_raw(resource.get_path(namespace))
+        items = []
+        for item in data.get('items', []):
+            item.setdefault('apiVersion', resource.api_version)
+            item.setdefault('kind', resource.kind)
+            items.append(ItemDescription(item))
+        return items, data.get('metadata', {}).get('resourceVersion', '')
+
+    def watch(self, resource: ApiResource, namespace: Optional[str], resource_version: str,
+              timeout: int = 300) -> Iterator[Tuple[str, dict]]:
+        """
+        Watches all changes of the given resource type.
+        The iterator ends once the server closes the stream (after the given timeout).
+        :param resource: Resource type
+        :param namespace: Namespace, the items of all namespaces are watched if not defined
+        :param resource_version: Version from which on changes should be reported
+        :param timeout: Timeout in seconds after which the server ends the watch
+        :return: Event type (ADDED, MODIFIED, DELETED, BOOKMARK, ERROR) and the object of each event
+        """
+        query = urlencode({
+            'watch': 'true',
+            'resourceVersion': resource_version,
+            'allowWatchBookmarks': 'true',
+            'timeoutSeconds': timeout,
+        })
+        for line in self._stream_raw(resource.get_path(namespace) + '?' + query):
+            if line.strip() == '':
+                continue
+            event = json.loads(line)
+            yield event['type'], event['object']
+
+    @abstractmethod
+    def _stream_raw(self, path: str) -> Iterator[str]:
+        """
+        Executes a streaming get request against the given api path
+        :param path: Path including the query
+        :return: Lines of the response
+        """
+        raise NotImplemented
+
+    @abstractmethod
+    def _get_raw(self, path: str) -> dict:
+        """
+        Executes a get request against the given api path
+        :param path: Path including the query
+        :return: Response
+        """
+        raise NotImplemented
+
+    @abstractmethod
+    def apply(self, yml: str, namespace: Optional[str] = None) -> str:
         """
         Applies the given yml file
         :param yml: Yml file
+        :param namespace: Namespace for all objects which don't define one
         :return: Stdout
         """
         raise NotImplemented
 
-    @abstractmethod
-    def get_pod(self, dc_name: str = None, pod_name: str = None) -> Optional[PodData]:
+    def get_pod(self, dc_name: str = None, pod_name: str = None, namespace: Optional[str] = None) -> Optional[PodData]:
         """
         Returns a pod by deployment name or pod name
         :param dc_name: Deployment name
         :param pod_name: Pod name
+        :param namespace: Namespace, the default namespace of the context is used if not defined
         :return: Pod (if found)
         :raise Exception: More than one pod found
         """
-        raise NotImplemented
+        pods = self.get_pods(dc_name=dc_name, pod_name=pod_name, namespace=namespace)
+        if len(pods) == 0:
+            return None
+        if len(pods) > 1:
+            raise Exception('More than one match found')
+        return pods[0]
 
-    @abstractmethod
-    def get_pods(self, dc_name: str = None, pod_name: str = None) -> List[PodData]:
+    def get_pods(self, dc_name: str = None, pod_name: str = None, namespace: Optional[str] = None) -> List[PodData]:
         """
-        Returns all pods which match the given deployment name or pod name
+        Returns all pods which match the given deployment name or pod name.
+        The filtering is done by the server, the result is cached for POD_CACHE_TTL seconds
+        or until a change which affects pods has been applied.
         :param dc_name: Deployment name
         :param pod_name: Pod name
+        :param namespace: Namespace, the default namespace of the context is used if not defined
         :return: Pods
         """
-        raise NotImplemented
+        key = (namespace, dc_name, pod_name)
+        with self._pod_cache_lock:
+            entry = self._pod_cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.POD_CACHE_TTL:
+                return list(entry[1])
+
+        label_selector = None
+        if dc_name is not None:
+            label_selector = self._get_pod_selector(dc_name, namespace)
+            if label_selector is None:
+                # Deployment doesn't exist
+                return []
+        field_selector = None
+        if pod_name is not None:
+            field_selector = 'metadata.name=' + pod_name
+
+        pods = self._get_pods(label_selector, field_selector, namespace)
+        with self._pod_cache_lock:
+            self._pod_cache[key] = (time.monotonic(), pods)
+        return list(pods)
 
     @abstractmethod
-    def rollout(self, name: str):
+    def _get_pods(self, label_selector: Optional[str], field_selector: Optional[str],
+                  namespace: Optional[str]) -> List[PodData]:
         """
-        Re-Deploys the latest DC with the given name
-        :param name: Deployment name
+        Returns all pods which match the given selectors
+        :param label_selector: Label selector
+        :param field_selector: Field selector
+        :param namespace: Namespace, the default namespace of the context is used if not defined
+        :return: Pods
         """
         raise NotImplemented
 
-    @abstractmethod
-    def exec(self, pod_name: str, cmd: str, args: List[str]):
+    def _get_pod_selector(self, dc_name: str, namespace: Optional[str]) -> Optional[str]:
         """
-        Executes a command in the given pod
-        :param pod_name: Pod name
-        :param cmd: Command
-        :param args: Arguments
+        Returns the label selector which matches all pods of the given deployment config
+        :param dc_name: Deployment config name
+        :param namespace: Namespace
+        :return: Selector or None if no pods can match
         """
-        raise NotImplemented
+        return 'deploymentconfig=' + dc_name
+
+    def _get_deployment_selector(self, name: str, namespace: Optional[str]) -> Optional[str]:
+        """
+        Returns the label selector which matches all pods of the given deployment
+        :param name: Deployment name
+        :param namespace: Namespace
+        :return: Selector or None if the deployment doesn't exist
+        """
+        deployment = self.get('deployment/' + name, namespace)
+        if deployment is None:
+            return None
+        return self._format_selector(deployment.data.get('spec', {}).get('selector') or {})
+
+    @staticmethod
+    def _format_selector(selector: dict) -> Optional[str]:
+        """
+        Converts a label selector object into the textual representation
+        :param selector: Selector with matchLabels / matchExpressions
+        :return: Selector or None if the selector is empty
+        """
+        parts = [key + '=' + str(value) for key, value in sorted((selector.get('matchLabels') or {}).items())]
+        for expression in selector.get('matchExpressions') or []:
+            key = expression['key']
+            operator = expression['operator']
+            values = ','.join(expression.get('values') or [])
+            if operator == 'In':
+                parts.append(f'{key} in ({values})')
+            elif operator == 'NotIn':
+                parts.append(f'{key} notin ({values})')
+            elif operator == 'Exists':
+                parts.append(key)
+            elif operator == 'DoesNotExist':
+                parts.append('!' + key)
+        if len(parts) == 0:
+            return None
+        return ','.join(parts)
+
+    def _invalidate_pods(self, yml: Optional[str] = None):
+        """
+        Clears the pod cache
+        :param yml: Applied objects, the cache is only cleared if they might affect pods.
+        The cache is always cleared if not defined
+        """
+        if yml is not None and self.WORKLOAD_PATTERN.search(yml) is None:
+            return
+        with self._pod_cache_lock:
+            self._pod_cache = {}
+
+    @staticmethod
+    def _parse_pods(data: dict) -> List[PodData]:
+        """
+        Parses a pod list
+        :param data: Pod list
+        :return: Pods
+        """
+        pods = []
+        for pod in data['items']:
+            metadata = pod['metadata']
+            version = int(metadata['annotations'].get('openshift.io/deployment-config.latest-version', 0))
+            labels = metadata.get('labels', {})
+            name = metadata['name']
+            status = pod['status'].get('containerStatuses', [{}])
+            if len(status) > 0:
+                status = status[0]
+
+            pod_data = PodData()
+            pod_data.name = name
+            pod_data.version = version
+            pod_data.ready = status.get('ready', False)
+            pod_data.set_labels(labels)
+            pods.append(pod_data)
+
+        return pods
 
     @abstractmethod
-    def project(self, project: str):
+    def rollout(self, name: str, namespace: Optional[str] = None):
         """
-        Changes the default project / namespace
-        :param project: Project
+        Re-Deploys the latest DC with the given name
+        :param name: Deployment name
+        :param namespace: Namespace, the default namespace of the context is used if not defined
         """
         raise NotImplemented
 
     @abstractmethod
-    def switch_context(self, context: str):
+    def exec(self, pod_name: str, cmd: str, args: List[str], namespace: Optional[str] = None,
+             timeout: Optional[float] = None):
         """
-        Changes the configuration context
-        :param context: Context
+        Executes a command in the given pod
+        :param pod_name: Pod name
+        :param cmd: Command
+        :param args: Arguments
+        :param namespace: Namespace, the default namespace of the context is used if not defined
+        :param timeout: Timeout in seconds
+        :raise Exception: Gets raised if the command fails or doesn't finish in time
         """
         raise NotImplemented
 
     @abstractmethod
-    def annotate(self, name: str, key: str, value: str):
+    def annotate(self, name: str, key: str, value: str, namespace: Optional[str] = None):
         """
         Add / updates the annotation at the given item
         :param name: Name
         :param key: Annotation key
         :param value: Annotation value
+        :param namespace: Namespace, the default namespace of the context is used if not defined
         """
         raise NotImplemented
 
@@ -116,12 +468,12 @@ class Oc(K8Api):
         lines = self._exec(['get', 'namespaces', '-o', 'name'])
         return lines.splitlines()
 
-    def tag(self, source: str, dest: str):
-        self._exec(['tag', source, dest], print_out=True)
+    def tag(self, source: str, dest: str, namespace: Optional[str] = None):
+        self._exec(['tag', source, dest], namespace=namespace, print_out=True)
 
-    def get(self, name: str) -> Optional[ItemDescription]:
+    def get(self, name: str, namespace: Optional[str] = None) -> Optional[ItemDescription]:
         try:
-            json_str = self._exec(['get', name, '-o', 'json'])
+            json_str = self._exec(['get', name, '-o', 'json'], namespace=namespace)
         except Exception as e:
             if 'NotFound' in str(e):
                 return None
@@ -129,86 +481,130 @@ class Oc(K8Api):
 
         return ItemDescription(json.loads(json_str))
 
-    def apply(self, yml: str) -> str:
-        return self._exec(['apply', '-f', '-'], stdin=yml)
+    def get_all(self, kind: str, namespace: Optional[str] = None) -> List[ItemDescription]:
+        data = json.loads(self._exec(['get', kind, '-o', 'json'], namespace=namespace))
+        return [ItemDescription(item) for item in data.get('items', [])]
 
-    def get_pod(self, dc_name: str = None, pod_name: str = None) -> Optional[PodData]:
-        pods = self.get_pods(dc_name=dc_name, pod_name=pod_name)
-        if len(pods) == 0:
-            return None
-        if len(pods) > 1:
-            raise Exception('More than one match found')
-        return pods[0]
+    def _discover_api_resources(self) -> List[ApiResource]:
+        return self._parse_api_resources(self._exec(['api-resources', '-o', 'wide']))
 
-    def get_pods(self, dc_name: str = None, pod_name: str = None) -> List[PodData]:
-        pods = []
-        json_str = self._exec(['get', 'pods', '-o', 'json'])
-        data = json.loads(json_str)
-        items = data['items']
-        for pod in items:
-            metadata = pod['metadata']
-            version = int(metadata['annotations'].get('openshift.io/deployment-config.latest-version', 0))
-            labels = metadata.get('labels', {})
-            name = metadata['name']
-            status = pod['status'].get('containerStatuses', [{}])
-            if len(status) > 0:
-                status = status[0]
-
-            pod_data = PodData()
-            pod_data.name = name
-            pod_data.version = version
-            pod_data.ready = status.get('ready', False)
-            pod_data.set_labels(labels)
+    def _get_raw(self, path: str) -> dict:
+        return json.loads(self._exec(['get', '--raw', path]))
 
-            if pod_name is not None and pod_data.name != pod_name:
-                continue
-            if dc_name is not None and pod_data.deployment_config != dc_name:
+    def _stream_raw(self, path: str) -> Iterator[str]:
+        args = self._get_args(['get', '--raw', path])
+        self.log.debug('Streaming ' + str(args))
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for line in proc.stdout:
+                yield line.decode('utf-8')
+            if proc.wait() != 0:
+                raise Exception('Failed: ' + proc.stderr.read().decode('utf-8'))
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+            proc.stderr.close()
+
+    @staticmethod
+    def _parse_api_resources(output: str) -> List[ApiResource]:
+        """
+        Parses the table printed by "api-resources -o wide"
+        :param output: Output
+        :return: Resources
+        """
+        lines = output.splitlines()
+        if len(lines) == 0:
+            return []
+        header = lines[0]
+        if 'APIVERSION' not in header:
+            raise Exception('Failed: api-resources doesn\'t report the api version, the client is too old')
+
+        # Columns are aligned, but some of them can be empty
+        names = header.split()
+        starts = [header.index(name) for name in names]
+        resources = []
+        for line in lines[1:]:
+            if line.strip() == '':
                 continue
-            pods.append(pod_data)
-
-        return pods
-
-    def rollout(self, name: str):
+            columns = {}
+            for idx, name in enumerate(names):
+                end = starts[idx + 1] if idx + 1 < len(starts) else len(line)
+                columns[name] = line[starts[idx]:end].strip()
+            verbs = columns.get('VERBS', '').strip('[]').split()
+            short_names = [name for name in columns.get('SHORTNAMES', '').split(',') if name != '']
+            resources.append(ApiResource(columns['NAME'], columns['APIVERSION'], columns['KIND'],
+                                         columns['NAMESPACED'] == 'true', verbs, short_names))
+        return resources
+
+    def apply(self, yml: str, namespace: Optional[str] = None) -> str:
+        self._invalidate_pods(yml)
+        return self._exec(['apply', '-f', '-'], namespace=namespace, stdin=yml)
+
+    def _get_pods(self, label_selector: Optional[str], field_selector: Optional[str],
+                  namespace: Optional[str]) -> List[PodData]:
+        args = ['get', 'pods', '-o', 'json']
+        if label_selector is not None:
+            args.append('--selector=' + label_selector)
+        if field_selector is not None:
+            args.append('--field-selector=' + field_selector)
+        json_str = self._exec(args, namespace=namespace)
+        return self._parse_pods(json.loads(json_str))
+
+    def rollout(self, name: str, namespace: Optional[str] = None):
         """
         Re-Deploys the latest DC with the given name
         :param name: DC name
+        :param namespace: Namespace
         """
-        self._exec(['rollout', 'latest', name])
+        self._invalidate_pods()
+        self._exec(['rollout', 'latest', name], namespace=namespace)
 
-    def exec(self, pod_name: str, cmd: str, args: List[str]):
+    def exec(self, pod_name: str, cmd: str, args: List[str], namespace: Optional[str] = None,
+             timeout: Optional[float] = None):
         proc_args = ['exec', pod_name, '--', cmd]
         proc_args.extend(args)
-        self._exec(proc_args, print_out=True)
+        self._exec(proc_args, namespace=namespace, print_out=True, timeout=timeout)
 
-    def project(self, project: str):
-        self._exec(['project', project])
+    def annotate(self, name: str, key: str, value: str, namespace: Optional[str] = None):
+        self._exec(['annotate', '--overwrite=true', name, key + '=' + value], namespace=namespace)
 
-    def switch_context(self, context: str):
-        raise NotImplemented('Not available for openshift')
-
-    def annotate(self, name: str, key: str, value: str):
-        self._exec(['annotate', '--overwrite=true', name, key + '=' + value])
-
-    def _exec(self, args, print_out: bool = False, stdin: str = None) -> str:
-        args.insert(0, self._get_bin())
+    def _exec(self, args, namespace: Optional[str] = None, print_out: bool = False, stdin: str = None,
+              timeout: Optional[float] = None) -> str:
+        args = self._get_args(args, namespace)
         if print_out:
-            print(str(args))
+            self.log.info(str(args))
 
         stdin_bytes = None
         if stdin is not None:
             stdin_bytes = stdin.encode('utf-8')
 
         self.log.debug('Executing ' + str(args))
-        result = subprocess.run(args, capture_output=True, input=stdin_bytes)
+        try:
+            result = subprocess.run(args, capture_output=True, input=stdin_bytes, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise Exception(f'Failed: timeout after {timeout}s')
         if result.returncode != 0:
             if stdin is not None:
-                print(stdin.replace('\\n', '\n'))
+                self.log.error(stdin.replace('\\n', '\n'))
             raise Exception('Failed: ' + str(result.stderr.decode('utf-8')))
         output = result.stdout.decode('utf-8')
         if print_out:
-            print(output)
+            self.log.info(output)
         return output
 
+    def _get_args(self, args: List[str], namespace: Optional[str] = None) -> List[str]:
+        """
+        Returns the full command line for the given arguments
+        """
+        args = [self._get_bin()] + args
+        if self._context is not None:
+            args.append('--context=' + self._context)
+        if namespace is not None:
+            args.append('--namespace=' + namespace)
+        return args
+
     def _get_bin(self) -> str:
         if platform.system() == 'Windows':
             return 'oc.exe'
@@ -216,24 +612,15 @@ class Oc(K8Api):
 
 
 class K8(Oc):
-    _namespace: str = ''
-
-    def rollout(self, name: str):
-        self._exec(['rollout', 'restart', 'deployments', name])
+    def rollout(self, name: str, namespace: Optional[str] = None):
+        self._invalidate_pods()
+        self._exec(['rollout', 'restart', 'deployments', name], namespace=namespace)
 
-    def tag(self, source: str, dest: str):
+    def tag(self, source: str, dest: str, namespace: Optional[str] = None):
         raise NotImplemented('Not available for k8')
 
-    def project(self, project: str):
-        self._namespace = project
-
-    def switch_context(self, context: str):
-        self._exec(['config', 'use-context', context])
-
-    def _exec(self, args, print_out: bool = False, stdin: str = None):
-        if self._namespace != '':
-            args.append('--namespace=' + self._namespace)
-        return super()._exec(args, print_out, stdin)
+    def _get_pod_selector(self, dc_name: str, namespace: Optional[str]) -> Optional[str]:
+        return self._get_deployment_selector(dc_name, namespace)
 
     def _get_bin(self) -> str:
         if platform.system() == 'Windows':
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
 import argparse
+import os
+from typing import List, Optional, TYPE_CHECKING
 
-from ok8deploy.backup.BackupGenerator import BackupGenerator
-from ok8deploy.config.Config import ProjectConfig, RunMode
-from ok8deploy.deploy.AppDeploy import AppDeployment
 from ok8deploy.utils.Log import Log
 
+# The modules of the commands are imported by the command itself,
+# this keeps the startup time of the cli (and --help) low
+if TYPE_CHECKING:
+    from ok8deploy.config.Config import ProjectConfig, RunMode
+
 log_instance = Log('Ok8Deploy')
 
+PLAN_WATCH_INTERVAL = 1
+"""
+Time in seconds between two checks for changed files in watch mode
+"""
+
 
 def load_project(config_dir: str) -> ProjectConfig:
+    from ok8deploy.config.Config import ProjectConfig
     if config_dir != '':
         return ProjectConfig.load(config_dir)
 
@@ -38,11 +48,12 @@ def reload_config(args):
     log_instance.log.info('Reloading ' + app_config.get_dc_name())
     reload_actions = app_config.get_reload_actions()
     for action in reload_actions:
-        action.run(oc)
+        action.run(oc, root_config.get_oc_project_name())
     log_instance.log.info('Done')
 
 
 def _run_app_deploy(config_dir: str, app_name: str, mode: RunMode):
+    from ok8deploy.deploy.AppDeploy import AppDeployment
     root_config = load_project(config_dir)
     app_config = root_config.load_app_config(app_name)
     deployment = AppDeployment(root_config, app_config, mode)
@@ -50,44 +61,122 @@ def _run_app_deploy(config_dir: str, app_name: str, mode: RunMode):
     log_instance.log.info('Done')
 
 
-def _run_apps_deploy(config_dir: str, mode: RunMode):
+def _run_apps_deploy(config_dir: str, mode: RunMode, jobs: int = 1, load_jobs: int = 1):
+    from ok8deploy.deploy.AppDeploy import AppDeployment
+    from ok8deploy.deploy.AppDeploymentPool import AppDeploymentPool
+    from ok8deploy.deploy.LiveState import LiveState
     root_config = load_project(config_dir)
+    root_config.preload(load_jobs if load_jobs > 0 else os.cpu_count() or 1)
     configs = root_config.load_app_configs()
     log_instance.log.info(f'Got {len(configs)} configs')
-    for app_config in configs:
-        AppDeployment(root_config, app_config, mode).deploy()
+    # The kinds are only listed once for all apps
+    live_state = LiveState(root_config.create_oc())
+    if jobs <= 1:
+        for app_config in configs:
+            AppDeployment(root_config, app_config, mode, live_state).deploy()
+        log_instance.log.info('Done')
+        return
+
+    if mode.out_file is not None:
+        log_instance.log.error('--out-file can\'t be combined with --jobs')
+        exit(1)
+    results = AppDeploymentPool(root_config, mode, jobs, live_state).deploy(configs)
+    if not all(result.is_success() for result in results):
+        exit(1)
     log_instance.log.info('Done')
 
 
+def _watch_plan(config_dir: str, app_names: Optional[List[str]]):
+    from ok8deploy.config.Config import RunMode
+    from ok8deploy.deploy.Reconciler import Reconciler
+    root_config = load_project(config_dir)
+    mode = RunMode()
+    mode.plan = True
+    log_instance.log.info('Watching for changes, press Ctrl+C to stop')
+    try:
+        Reconciler(root_config.get_config_root(), mode, PLAN_WATCH_INTERVAL, app_names).run()
+    except KeyboardInterrupt:
+        pass
+
+
 def plan_app(args):
+    from ok8deploy.config.Config import RunMode
+    if args.watch:
+        _watch_plan(args.config_dir, [args.name[0]])
+        return
     mode = RunMode()
     mode.plan = True
+    mode.render_cache = args.render_cache
     _run_app_deploy(args.config_dir, args.name[0], mode)
 
 
 def deploy_app(args):
+    from ok8deploy.config.Config import RunMode
     mode = RunMode()
     mode.out_file = args.out_file
     mode.dry_run = args.dry_run
+    mode.batch_apply = args.batch_apply
+    mode.render_cache = args.render_cache
     _run_app_deploy(args.config_dir, args.name[0], mode)
 
 
 def plan_all(args):
+    from ok8deploy.config.Config import RunMode
+    if args.watch:
+        _watch_plan(args.config_dir, None)
+        return
     mode = RunMode()
     mode.plan = True
-    _run_apps_deploy(args.config_dir, mode)
+    mode.render_cache = args.render_cache
+    _run_apps_deploy(args.config_dir, mode, args.jobs, args.load_jobs)
 
 
 def deploy_all(args):
+    from ok8deploy.config.Config import RunMode
     mode = RunMode()
     mode.out_file = args.out_file
     mode.dry_run = args.dry_run
-    _run_apps_deploy(args.config_dir, mode)
+    mode.batch_apply = args.batch_apply
+    mode.render_cache = args.render_cache
+    mode.changed_only = args.changed_only
+    _run_apps_deploy(args.config_dir, mode, args.jobs, args.load_jobs)
+
+
+def reconcile(args):
+    from ok8deploy.config.Config import RunMode
+    from ok8deploy.deploy.Reconciler import Reconciler
+    root_config = load_project(args.config_dir)
+    mode = RunMode()
+    mode.plan = args.plan
+    mode.batch_apply = args.batch_apply
+    Reconciler(root_config.get_config_root(), mode, args.interval).run()
 
 
 def create_backup(args):
+    from ok8deploy.backup.BackupGenerator import BackupGenerator, BackupMode
     root_config = load_project(args.config_dir)
-    BackupGenerator(root_config).create_backup(args.name[0])
+    mode = BackupMode()
+    mode.all_namespaces = args.all_namespaces
+    mode.jobs = args.jobs
+    mode.incremental = args.incremental
+    mode.archive = args.archive
+    mode.chunk_size = args.chunk_size
+    mode.strip = args.strip
+    mode.include_kinds = args.include_kinds
+    mode.exclude_kinds.extend(args.exclude_kinds)
+    mode.include_namespaces = args.include_namespaces
+    mode.exclude_namespaces = args.exclude_namespaces
+    BackupGenerator(root_config, mode).create_backup(args.name[0])
+
+
+def restore_backup(args):
+    from ok8deploy.backup.BackupRestore import BackupRestore, RestoreMode
+    root_config = load_project(args.config_dir)
+    mode = RestoreMode()
+    mode.snapshot = args.snapshot
+    mode.jobs = args.jobs
+    mode.include_namespaces = args.include_namespaces
+    BackupRestore(root_config, mode).restore(args.name[0])
 
 
 def main():
@@ -99,19 +188,68 @@ def main():
 
     subparsers = parser.add_subparsers(help='Commands')
     backup_parser = subparsers.add_parser('backup', help='Creates a backup of all resources in the cluster')
-    backup_parser.add_argument('name', help='Name of the backup folder', nargs=1)
+    backup_parser.add_argument('name', help='Name of the backup folder (or archive)', nargs=1)
+    backup_parser.add_argument('--all-namespaces', dest='all_namespaces', action='store_true',
+                               help='List each resource type once for the whole cluster')
+    backup_parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                               help='Number of namespaces which are backed up concurrently')
+    backup_parser.add_argument('--incremental', dest='incremental', action='store_true',
+                               help='Store the objects content addressed and only write objects '
+                                    'which changed since the previous backup into that folder')
+    backup_parser.add_argument('--archive', dest='archive', action='store_true',
+                               help='Write a single archive instead of a folder, the compression is chosen by '
+                                    'the file extension (.tar, .tar.gz, .tar.zst)')
+    backup_parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=500,
+                               help='Number of objects which are fetched per request')
+    backup_parser.add_argument('--strip', dest='strip', action='store_true',
+                               help='Remove managedFields and status from the objects')
+    backup_parser.add_argument('--include-kind', dest='include_kinds', action='append', default=[],
+                               help='Only backup the given kind / resource name (can be used multiple times)')
+    backup_parser.add_argument('--exclude-kind', dest='exclude_kinds', action='append', default=[],
+                               help='Skip the given kind / resource name (can be used multiple times). '
+                                    'Events, pods, endpoints and nodes are always skipped unless included')
+    backup_parser.add_argument('--include-namespace', dest='include_namespaces', action='append', default=[],
+                               help='Only backup namespaces matching the given pattern (can be used multiple times)')
+    backup_parser.add_argument('--exclude-namespace', dest='exclude_namespaces', action='append', default=[],
+                               help='Skip namespaces matching the given pattern (can be used multiple times)')
     backup_parser.set_defaults(func=create_backup)
 
+    restore_parser = subparsers.add_parser('restore', help='Restores all resources of a backup')
+    restore_parser.add_argument('name', help='Name of the backup folder (or archive)', nargs=1)
+    restore_parser.add_argument('--snapshot', dest='snapshot',
+                                help='Snapshot which should be restored (incremental backups only)')
+    restore_parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                                help='Number of namespaces which are restored concurrently')
+    restore_parser.add_argument('--include-namespace', dest='include_namespaces', action='append', default=[],
+                                help='Only restore namespaces matching the given pattern (can be used multiple times)')
+    restore_parser.set_defaults(func=restore_backup)
+
     reload_parser = subparsers.add_parser('reload', help='Reloads the configuration of a running application')
     reload_parser.add_argument('name', help='Name of the app which should be reloaded (folder name)', nargs=1)
     reload_parser.set_defaults(func=reload_config)
 
     plan_parser = subparsers.add_parser('plan', help='Verifies what changes have to be applied for a single app')
     plan_parser.add_argument('name', help='Name of the app which should be checked (folder name)', nargs=1)
+    plan_parser.add_argument('--watch', dest='watch', action='store_true',
+                             help='Keeps running and prints the changes whenever a file of the app '
+                                  'or one of its templates changes')
+    plan_parser.add_argument('--render-cache', dest='render_cache', action='store_true',
+                             help='Reuses the rendered objects while the inputs of an app are unchanged, '
+                                  'stores them (including values of loaders) in the cache folder of the user')
     plan_parser.set_defaults(func=plan_app)
 
     plan_all_parser = subparsers.add_parser('plan-all',
                                             help='Verifies what changes have to be applied for all apps')
+    plan_all_parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                                 help='Number of apps which are processed concurrently')
+    plan_all_parser.add_argument('--watch', dest='watch', action='store_true',
+                                 help='Keeps running and prints the changes whenever a file changes')
+    plan_all_parser.add_argument('--load-jobs', dest='load_jobs', type=int, default=1,
+                                 help='Number of processes used to parse the yml files, '
+                                      '0 uses the number of cores (default: 1)')
+    plan_all_parser.add_argument('--render-cache', dest='render_cache', action='store_true',
+                                 help='Reuses the rendered objects while the inputs of an app are unchanged, '
+                                      'stores them (including values of loaders) in the cache folder of the user')
     plan_all_parser.set_defaults(func=plan_all)
 
     deploy_parser = subparsers.add_parser('deploy', help='Deploys the configuration of an application')
@@ -120,7 +258,13 @@ def main():
                                     'This does not communicate with openshift in any way')
     deploy_parser.add_argument('--dry-run', dest='dry_run', help='Does not interact with openshift',
                                action='store_true')
+    deploy_parser.add_argument('--batch-apply', dest='batch_apply',
+                               help='Applies all changed objects of an app with as few calls as possible',
+                               action='store_true')
     deploy_parser.add_argument('name', help='Name of the app which should be deployed (folder name)', nargs=1)
+    deploy_parser.add_argument('--render-cache', dest='render_cache', action='store_true',
+                               help='Reuses the rendered objects while the inputs of an app are unchanged, '
+                                    'stores them (including values of loaders) in the cache folder of the user')
     deploy_parser.set_defaults(func=deploy_app)
 
     deploy_all_parser = subparsers.add_parser('deploy-all',
@@ -130,8 +274,35 @@ def main():
                                         'This does not communicate with openshift in any way')
     deploy_all_parser.add_argument('--dry-run', dest='dry_run', help='Does not interact with openshift',
                                    action='store_true')
+    deploy_all_parser.add_argument('--batch-apply', dest='batch_apply',
+                                   help='Applies all changed objects of an app with as few calls as possible',
+                                   action='store_true')
+    deploy_all_parser.add_argument('--jobs', dest='jobs', type=int, default=1,
+                                   help='Number of apps which are deployed concurrently')
+    deploy_all_parser.add_argument('--load-jobs', dest='load_jobs', type=int, default=1,
+                                   help='Number of processes used to parse the yml files, '
+                                        '0 uses the number of cores (default: 1)')
+    deploy_all_parser.add_argument('--changed-only', dest='changed_only', action='store_true',
+                                   help='Skips all app instances whose files, templates and variables did not change '
+                                        'since their last successful deployment. '
+                                        'Changes made directly in the cluster are not detected')
+    deploy_all_parser.add_argument('--render-cache', dest='render_cache', action='store_true',
+                                   help='Reuses the rendered objects while the inputs of an app are unchanged, '
+                                        'stores them (including values of loaders) in the cache folder of the user')
     deploy_all_parser.set_defaults(func=deploy_all)
 
+    reconcile_parser = subparsers.add_parser('reconcile',
+                                             help='Continuously deploys all apps whose configuration or '
+                                                  'cluster state has changed')
+    reconcile_parser.add_argument('--interval', dest='interval', type=float, default=10,
+                                  help='Seconds between two reconciliations')
+    reconcile_parser.add_argument('--plan', dest='plan', action='store_true',
+                                  help='Only report objects which differ from the configuration')
+    reconcile_parser.add_argument('--batch-apply', dest='batch_apply',
+                                  help='Applies all changed objects of an app with as few calls as possible',
+                                  action='store_true')
+    reconcile_parser.set_defaults(func=reconcile)
+
     args = parser.parse_args()
     if 'func' not in args.__dict__:
         parser.print_help()
@@ -1,6 +1,10 @@
 from __future__ import annotations
+
+import json
+import os
+import threading
 from abc import abstractmethod
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from typing import TYPE_CHECKING
 
@@ -14,13 +18,42 @@ class ValueLoader:
     def __init__(self, config: BaseConfig):
         self._config = config
 
+    @abstractmethod
+    def get_keys(self) -> List[str]:
+        """
+        Returns the suffixes of all variables created by this loader
+        """
+        pass
+
     @abstractmethod
     def load(self, data: Dict) -> Dict[str, str]:
         pass
 
+    def get_files(self, data: Dict) -> List[str]:
+        """
+        Returns all files read by the loader, the cached values are loaded again if one of them changes
+        :param data: Loader configuration
+        :return: Paths
+        """
+        return []
+
+    def load_cached(self, data: Dict) -> Dict[str, str]:
+        """
+        Returns the values of the loader, the values are shared by all loaders with the same configuration
+        :param data: Loader configuration
+        :return: Values by suffix
+        """
+        return ValueLoaderCache.get(self, data)
+
 
 class PemLoader(ValueLoader):
 
+    def get_keys(self) -> List[str]:
+        return ['_PUBLIC', '_KEY', '_CACERT']
+
+    def get_files(self, data: Dict) -> List[str]:
+        return [self._config.get_file(data['file'])]
+
     def load(self, data: Dict) -> Dict[str, str]:
         file = data['file']
         cert = Cert(self._config.get_file(file))
@@ -31,6 +64,63 @@ class PemLoader(ValueLoader):
         }
 
 
+class LazyValue:
+    """
+    Variable created by a loader, the loader is only executed once the value is used
+    """
+
+    def __init__(self, loader: ValueLoader, data: Dict, key: str):
+        self._loader = loader
+        self._data = data
+        self._key = key
+
+    def get(self) -> any:
+        return self._loader.load_cached(self._data)[self._key]
+
+    def get_inputs(self) -> Tuple[str, Dict, List[str]]:
+        """
+        Returns everything the value depends on without loading it
+        :return: Loader type, loader configuration and the files read by the loader
+        """
+        return type(self._loader).__name__ + self._key, self._data, self._loader.get_files(self._data)
+
+
+class ValueLoaderCache:
+    """
+    Caches the values of all loaders of the process.
+    An entry is identified by the loader type and its configuration and is valid as long as
+    the files used by the loader don't change.
+    """
+
+    _entries = {}  # type: Dict[Tuple[str, str, Tuple[str, ...]], Tuple[Tuple, Dict[str, str]]]
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, loader: ValueLoader, data: Dict) -> Dict[str, str]:
+        files = tuple(os.path.abspath(path) for path in loader.get_files(data))
+        try:
+            fingerprint = tuple((stat.st_mtime_ns, stat.st_size) for stat in map(os.stat, files))
+        except OSError:
+            # Let the loader report the error
+            return loader.load(data)
+
+        key = (type(loader).__name__, json.dumps(data, sort_keys=True, default=str), files)
+        with cls._lock:
+            entry = cls._entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+
+        values = loader.load(data)
+        with cls._lock:
+            cls._entries[key] = (fingerprint, values)
+        return values
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+
 class ValueLoaderFactory:
 
     @staticmethod
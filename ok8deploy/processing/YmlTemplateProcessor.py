@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+import copy
 import re
 from typing import Optional, Dict, List, Set
 from typing import TYPE_CHECKING
 
+from ok8deploy.processing.ValueLoader import LazyValue
 from ok8deploy.utils.Log import Log
 
 if TYPE_CHECKING:
     from ok8deploy.config.BaseConfig import BaseConfig
-from ok8deploy.utils.Errors import MissingParam
+from ok8deploy.utils.Errors import MissingParam, ConfigError
 
 
 class YmlTemplateProcessor(Log):
@@ -16,7 +18,10 @@ class YmlTemplateProcessor(Log):
     Processes yml files by replacing any string placeholders.
     """
 
-    VAR_PATTERN = re.compile(r'\${(.+?)}')
+    VAR_PATTERN = re.compile(r'\${((?:[^}$]|\$(?!{))+)}')
+    """
+    Variable tag, the name can't contain another tag start
+    """
     KEY_FIELD_MERGE: str = '_ok8merge'
 
     def __init__(self, config: BaseConfig):
@@ -26,9 +31,17 @@ class YmlTemplateProcessor(Log):
         List of all variables which have not been replace because
         there was no value defined for them
         """
+        self._unresolved = False
+        """
+        True if the processed data still contains at least one variable tag
+        """
         self._config = config  # type: BaseConfig
         self._parent = None  # type: Optional[YmlTemplateProcessor]
         self._child = None  # type: Optional[YmlTemplateProcessor]
+        self._resolved = None  # type: Optional[Dict[str, any]]
+        """
+        Caching field for the replacements of the processor chain
+        """
 
     def process(self, data: dict):
         """
@@ -36,37 +49,10 @@ class YmlTemplateProcessor(Log):
 
         :param data: Data of the app, the data will be modified in place
         :raise MissingParam: Gets raised if at least one parameter is not defined
+        :raise ConfigError: Gets raised if variables reference each other
         """
-        replacements = self._get_replacements()
-        # Replace any variables
-        depth = 0
-        found_var = True
-        while depth < 10 and found_var:  # Lazily assume there are only 10 levels of chained reference
-            found_var = False
-            for key, value in replacements.items():
-                if isinstance(value, dict):
-                    # A replacement might be an object
-                    # So we need to walk though every item and see if there is someting to replace
-                    self._walk_dict(replacements, value)
-                    continue
-                if not isinstance(value, str):
-                    continue
-
-                # The replacement value might refer to another variable
-                for variable_name in self.VAR_PATTERN.findall(value):
-                    new_value = replacements.get(variable_name)
-                    if new_value is None:
-                        self.log.warning('Missing referenced variable: ' + variable_name)
-                        continue
-                    if value == '${' + variable_name + '}':
-                        # Replace the entire value since the replacement value only consists of the ${} tag
-                        replacements[key] = new_value
-                        found_var = True
-                        continue
-
-                    replacements[key] = value.replace('${' + variable_name + '}', str(new_value))
-                    found_var = True
-
+        replacements = self._get_resolved_replacements()
+        self._unresolved = False
         self._walk_dict(replacements, data)
 
         # Check if any of the missing vars are declared as "params"
@@ -82,12 +68,121 @@ class YmlTemplateProcessor(Log):
                 raise MissingParam('The following params are not defined: ' + str(missing_params))
             self.log.warning('The following vars are not defined: ' + str(self._missing_vars))
 
-        self._sanity_check(data)
-
-    def _sanity_check(self, data: Dict[str, any]):
-        if '${' in str(data):
+        if self._unresolved:
             self.log.warning('At least one variable could not been resolved: ' + str(data))
 
+    def _get_resolved_replacements(self) -> Dict[str, any]:
+        """
+        Returns all replacements of the processor chain, references between them are resolved.
+        The variables are resolved once, in the order of their dependencies.
+        :return: Replacements, objects must be copied before they are modified
+        :raise ConfigError: Gets raised if variables reference each other
+        """
+        if self._resolved is not None:
+            return self._resolved
+
+        # Objects are resolved in place, they might be shared with other instances of the config
+        replacements = {key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+                        for key, value in self._get_replacements().items()}
+        dependencies = {key: self._get_references(replacements, value) for key, value in replacements.items()}
+        for key in self._sort_by_dependencies(dependencies):
+            self._resolve(replacements, key)
+        self._resolved = replacements
+        return replacements
+
+    def _get_references(self, replacements: Dict[str, any], value: any) -> List[str]:
+        """
+        Returns the names of all known variables referenced by the given variable value
+        """
+        if isinstance(value, dict):
+            # A replacement might be an object, all strings inside of it are replaced
+            return [name for name in self._find_tags(value) if name in replacements]
+        if not isinstance(value, str) or '${' not in value:
+            return []
+
+        references = []
+        for variable_name in self.VAR_PATTERN.findall(value):
+            if replacements.get(variable_name) is None:
+                self.log.warning('Missing referenced variable: ' + variable_name)
+                continue
+            references.append(variable_name)
+        return references
+
+    @classmethod
+    def _find_tags(cls, value: any) -> List[str]:
+        """
+        Returns the names of all variable tags inside the given object
+        """
+        if isinstance(value, str):
+            return cls.VAR_PATTERN.findall(value)
+        if isinstance(value, dict):
+            items = value.values()
+        elif isinstance(value, list):
+            items = value
+        else:
+            return []
+        names = []
+        for item in items:
+            names.extend(cls._find_tags(item))
+        return names
+
+    @staticmethod
+    def _sort_by_dependencies(dependencies: Dict[str, List[str]]) -> List[str]:
+        """
+        Sorts the variables so each variable is placed after all variables it references
+        :param dependencies: Referenced variables by variable name
+        :return: Variable names
+        :raise ConfigError: Gets raised if variables reference each other
+        """
+        order = []
+        done = set()
+        path = []  # type: List[str]
+
+        def visit(key: str):
+            if key in done:
+                return
+            if key in path:
+                cycle = path[path.index(key):] + [key]
+                raise ConfigError('Variables reference each other: ' + ' -> '.join(cycle))
+            path.append(key)
+            for dependency in dependencies[key]:
+                visit(dependency)
+            path.pop()
+            done.add(key)
+            order.append(key)
+
+        for name in dependencies:
+            visit(name)
+        return order
+
+    def _resolve(self, replacements: Dict[str, any], key: str):
+        """
+        Replaces all references in the given variable, the referenced variables must be resolved already
+        """
+        value = replacements[key]
+        if isinstance(value, dict):
+            self._walk_dict(replacements, value)
+            return
+        if not isinstance(value, str) or '${' not in value:
+            return
+
+        match = self.VAR_PATTERN.match(value)
+        if match is not None and match.end() == len(value):
+            new_value = replacements.get(match.group(1))
+            if new_value is not None:
+                # Replace the entire value since the replacement value only consists of the ${} tag
+                replacements[key] = new_value
+            return
+
+        def substitute(var_match) -> str:
+            new_value = self._get_value(replacements, var_match.group(1))
+            if new_value is None:
+                return var_match.group(0)
+            return str(new_value)
+
+        # The replacement value might refer to other variables
+        replacements[key] = self.VAR_PATTERN.sub(substitute, value)
+
     def _get_params(self) -> Set[str]:
         """
         Returns all defined params
@@ -131,6 +226,9 @@ class YmlTemplateProcessor(Log):
                 data.update(new_dict)
                 continue
 
+            if isinstance(key, str) and '${' in key:
+                # Keys are not replaced
+                self._unresolved = True
             data[key] = self._walk_item(replacements, obj, data, key)
         return data
 
@@ -147,17 +245,50 @@ class YmlTemplateProcessor(Log):
             return self._walk_dict(replacements, obj)
         return obj
 
+    @staticmethod
+    def _get_value(replacements: Dict[str, any], variable: str) -> any:
+        """
+        Returns the value of the variable, values of loaders are loaded on first use
+        """
+        value = replacements.get(variable)
+        if isinstance(value, LazyValue):
+            value = value.get()
+            replacements[variable] = value
+        return value
+
     def _replace(self, item: str, replacements: Dict[str, any]) -> any:
-        for variable, value in replacements.items():
-            if item == '${' + variable + '}':
-                # Item only contains a tag, simple replace (non textual)
-                return value
-            # The variable tag is surrounded by other str or other tags
-            item = item.replace('${' + variable + '}', str(value))
-
-        # Search for any missing variables
-        if isinstance(item, str):
-            self._missing_vars.extend(self.VAR_PATTERN.findall(item))
+        """
+        Replaces all variable tags of the given string in a single scan.
+        Variables without value are tracked as missing.
+        """
+        if '${' not in item:
+            return item
+
+        match = self.VAR_PATTERN.match(item)
+        if match is not None and match.end() == len(item) and match.group(1) in replacements:
+            # Item only contains a tag, simple replace (non textual)
+            value = self._get_value(replacements, match.group(1))
+            if isinstance(value, (dict, list)):
+                # The replacements are shared by all processed objects
+                value = copy.deepcopy(value)
+                if '${' in str(value):
+                    self._unresolved = True
+            return value
+
+        def substitute(var_match) -> str:
+            variable = var_match.group(1)
+            if variable not in replacements:
+                self._missing_vars.append(variable)
+                return var_match.group(0)
+            value = str(self._get_value(replacements, variable))
+            if '${' in value:
+                # The value itself references variables which could not be resolved
+                self._missing_vars.extend(self.VAR_PATTERN.findall(value))
+            return value
+
+        item = self.VAR_PATTERN.sub(substitute, item)
+        if '${' in item:
+            self._unresolved = True
         return item
 
     def parent(self, template_processor: YmlTemplateProcessor):
@@ -171,6 +302,7 @@ class YmlTemplateProcessor(Log):
         if self._parent is not None:
             raise ValueError('Parent processor already defined')
         self._parent = template_processor
+        self._resolved = None
 
     def child(self, template_processor: YmlTemplateProcessor):
         """
@@ -183,3 +315,4 @@ class YmlTemplateProcessor(Log):
         if self._child is not None:
             raise ValueError('Child processor already defined')
         self._child = template_processor
+        self._resolved = None
@@ -0,0 +1,40 @@
+import os
+import threading
+
+
+class FileUtils:
+    @staticmethod
+    def write_private(path: str, content: bytes):
+        """
+        Writes a file which is only readable by the user, missing folders are created with the same restriction.
+        The content is written to a temporary file first so concurrent readers never see a partial file.
+        :param path: Path of the file
+        :param content: Content
+        :raise OSError: Gets raised if the file could not be written
+        """
+        FileUtils.make_private_dirs(os.path.dirname(path))
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def make_private_dirs(path: str):
+        """
+        Creates the given folder and all missing parents, which are only accessible by the user
+        :param path: Folder
+        """
+        if os.path.isdir(path):
+            return
+        parent = os.path.dirname(path)
+        if parent != path:
+            FileUtils.make_private_dirs(parent)
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
@@ -1,5 +1,7 @@
 import logging
 import sys
+import threading
+from typing import List, Optional
 
 
 class ColorFormatter(logging.Formatter):
@@ -24,8 +26,25 @@ class ColorFormatter(logging.Formatter):
         return formatter.format(record)
 
 
+class BufferingStreamHandler(logging.StreamHandler):
+    """
+    Stream handler which writes the records of threads with an active buffer into that buffer
+    """
+
+    def emit(self, record):
+        lines = Log.get_buffer()
+        if lines is None:
+            super().emit(record)
+            return
+        try:
+            lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
 class Log:
     log_level = logging.INFO
+    _local = threading.local()
 
     def __init__(self, name: str = None):
         if not hasattr(self, 'log'):
@@ -33,7 +52,7 @@ class Log:
                 name = self.__class__.__name__
             log = logging.getLogger(name)
             if not log.hasHandlers():
-                handler = logging.StreamHandler(stream=sys.stdout)
+                handler = BufferingStreamHandler(stream=sys.stdout)
                 handler.setFormatter(ColorFormatter())
                 log.addHandler(handler)
                 log.setLevel(Log.log_level)
@@ -42,3 +61,29 @@ class Log:
     @classmethod
     def set_debug(cls):
         cls.log_level = logging.DEBUG
+
+    @classmethod
+    def start_buffer(cls):
+        """
+        Collects all log output of the current thread instead of writing it
+        until stop_buffer is called
+        """
+        cls._local.lines = []
+
+    @classmethod
+    def stop_buffer(cls) -> List[str]:
+        """
+        Stops collecting the log output of the current thread
+        :return: All collected lines
+        """
+        lines = cls.get_buffer() or []
+        cls._local.lines = None
+        return lines
+
+    @classmethod
+    def get_buffer(cls) -> Optional[List[str]]:
+        """
+        Returns the buffer of the current thread
+        :return: Buffer or None if the output is not buffered
+        """
+        return getattr(cls._local, 'lines', None)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import re
+from typing import IO, List, Optional, Union
+
+import yaml
+
+try:
+    # The full representer is used for dumping since that's what yaml.dump used for hashing so far
+    from yaml import CSafeLoader as _SafeLoader, CDumper as _FastDumper
+except ImportError:
+    # PyYAML has been built without libyaml
+    from yaml import SafeLoader as _SafeLoader
+    _FastDumper = None
+
+
+class Yml:
+    """
+    Parses and serializes yml using the libyaml bindings if available.
+    The output of dump is always identical to the pure python dumper, which is required
+    since the hash of the dumped objects is stored in the cluster.
+    """
+
+    LIBYAML = _FastDumper is not None
+    """
+    True if the libyaml bindings are used
+    """
+
+    _UNSAFE_OUTPUT = re.compile(r'"|^[ -]*\?( |$)|\'\':|^[ -]*[^ \n].{100,}:( |$)', re.M)
+    """
+    Constructs for which libyaml might produce a different output than the python dumper:
+    Double quoted (escaped / folded) scalars, complex, empty and long keys
+    """
+
+    @staticmethod
+    def load(stream: Union[str, IO]) -> any:
+        """
+        Parses a single document
+        :param stream: Content or open file
+        :return: Document
+        """
+        return yaml.load(stream, Loader=_SafeLoader)
+
+    @staticmethod
+    def load_all(stream: Union[str, IO]) -> List[any]:
+        """
+        Parses all documents, empty documents are skipped
+        :param stream: Content or open file
+        :return: Documents
+        """
+        return [doc for doc in yaml.load_all(stream, Loader=_SafeLoader) if doc is not None]
+
+    @classmethod
+    def dump(cls, data: any, stream: Optional[IO] = None) -> Optional[str]:
+        """
+        Serializes a single document with sorted keys in block style
+        :param data: Document
+        :param stream: File to which the output should be written
+        :return: Output or None if a stream is used
+        """
+        output = cls._dump(data)
+        if stream is None:
+            return output
+        stream.write(output)
+        return None
+
+    @classmethod
+    def dump_all(cls, documents: List[any], stream: Optional[IO] = None) -> Optional[str]:
+        """
+        Serializes multiple documents with sorted keys in block style
+        :param documents: Documents
+        :param stream: File to which the output should be written
+        :return: Output or None if a stream is used
+        """
+        output = '---\n'.join(cls._dump(data) for data in documents)
+        if stream is None:
+            return output
+        stream.write(output)
+        return None
+
+    @classmethod
+    def _dump(cls, data: any) -> str:
+        if _FastDumper is not None:
+            output = yaml.dump(data, Dumper=_FastDumper, default_flow_style=False, sort_keys=True)
+            if cls._UNSAFE_OUTPUT.search(output) is None:
+                return output
+        return yaml.dump(data, Dumper=yaml.Dumper, default_flow_style=False, sort_keys=True)
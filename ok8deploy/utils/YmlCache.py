@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from stat import S_ISREG
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from ok8deploy.utils.FileUtils import FileUtils
+from ok8deploy.utils.Log import Log
+from ok8deploy.utils.Yml import Yml
+
+
+class YmlCache(Log):
+    """
+    Caches the parsed documents of yml files.
+    Entries are kept in memory and in a cache folder which is shared between runs.
+    In memory an entry is valid as long as the modification time and size of the file match,
+    entries on disk are only used if the hash of the file content matches.
+    The cache folder is only accessible by the user, unused entries are removed after MAX_ENTRY_AGE.
+    """
+
+    CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ok8deploy', 'yml')  # type: Optional[str]
+    """
+    Folder in which the parsed files are stored, the files are only cached in memory if None
+    """
+
+    MAX_ENTRY_AGE = 30 * 24 * 3600
+    """
+    Entries which haven't been used for this many seconds are removed
+    """
+
+    PRUNE_INTERVAL = 24 * 3600
+    """
+    Min time in seconds between two checks for unused entries
+    """
+
+    CACHE_VERSION = 2
+    """
+    Version of the cache format, entries of other versions (or PyYAML versions) are ignored
+    """
+
+    MIN_PRELOAD_FILES = 16
+    """
+    Min number of files for which a process pool is used
+    """
+
+    _default = None  # type: Optional[YmlCache]
+    _default_lock = threading.Lock()
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        :param cache_dir: Folder for the entries, the entries are only kept in memory if not defined
+        """
+        super().__init__()
+        self._cache_dir = cache_dir
+        self._entries = {}  # type: Dict[Tuple[str, str], Tuple[Tuple[int, int], bytes]]
+        """
+        Fingerprint and pickled documents by loader and path
+        """
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls) -> YmlCache:
+        """
+        Returns the cache shared by the whole process, which is backed by CACHE_DIR
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = YmlCache(cls.CACHE_DIR)
+                cls._default.prune()
+            return cls._default
+
+    def prune(self):
+        """
+        Removes all entries on disk which haven't been used for MAX_ENTRY_AGE.
+        The folder is checked at most once per PRUNE_INTERVAL.
+        """
+        if self._cache_dir is not None:
+            self.prune_folder(self._cache_dir, self.MAX_ENTRY_AGE, self.PRUNE_INTERVAL)
+
+    @classmethod
+    def prune_folder(cls, folder: str, max_age: float, interval: float):
+        """
+        Removes all files of a cache folder whose modification time is older than max_age
+        :param folder: Cache folder
+        :param max_age: Max age in seconds
+        :param interval: Min time in seconds between two checks of the same folder
+        """
+        if not os.path.isdir(folder):
+            return
+        try:
+            # Folders created by previous versions used the default permissions
+            os.chmod(folder, 0o700)
+        except OSError:
+            pass
+        marker = os.path.join(folder, '.pruned')
+        now = time.time()
+        try:
+            if now - os.stat(marker).st_mtime < interval:
+                return
+        except FileNotFoundError:
+            pass
+
+        removed = 0
+        try:
+            for dir_path, _, files in os.walk(folder):
+                for name in files:
+                    path = os.path.join(dir_path, name)
+                    try:
+                        if path != marker and now - os.stat(path).st_mtime > max_age:
+                            os.remove(path)
+                            removed += 1
+                    except FileNotFoundError:
+                        # Removed by a concurrent run
+                        continue
+            with open(marker, 'w'):
+                pass
+            os.utime(marker)
+        except OSError as e:
+            Log('YmlCache').log.debug(f'Could not prune cache {folder}: {e}')
+            return
+        if removed > 0:
+            Log('YmlCache').log.debug(f'Removed {removed} unused entries from {folder}')
+
+    def load(self, path: str) -> any:
+        """
+        Returns the (single) document of the given file, parsed with the safe loader
+        :param path: Path to the file
+        :return: Copy of the document, the caller is free to modify it
+        """
+        return self._load('safe', path)
+
+    def load_all(self, path: str) -> List[dict]:
+        """
+        Returns all documents of the given file, empty documents are skipped.
+        :param path: Path to the file
+        :return: Copy of the documents, the caller is free to modify them
+        """
+        return self._load('full', path)
+
+    def _load(self, loader: str, path: str) -> any:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat is None or not S_ISREG(stat.st_mode):
+            # Not a regular file, nothing to cache
+            return self._parse(loader, self._read(path))
+        path = os.path.abspath(path)
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+
+        key = (loader, path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return pickle.loads(entry[1])
+
+        payload = self._get_payload(loader, path)
+        with self._lock:
+            self._entries[key] = (fingerprint, payload)
+        return pickle.loads(payload)
+
+    def preload(self, paths: List[str], single_paths: List[str], jobs: int):
+        """
+        Parses all files which are not cached yet on a process pool.
+        Files which can't be parsed are skipped, the error is raised once they are loaded.
+        :param paths: Files which will be loaded using load_all
+        :param single_paths: Files which will be loaded using load
+        :param jobs: Number of processes
+        """
+        pending = []
+        for loader, loader_paths in [('full', paths), ('safe', single_paths)]:
+            for path in loader_paths:
+                path = os.path.abspath(path)
+                with self._lock:
+                    entry = self._entries.get((loader, path))
+                if entry is None:
+                    pending.append((loader, path))
+        if jobs <= 1 or len(pending) < self.MIN_PRELOAD_FILES:
+            # Not worth starting processes, the files are parsed on demand
+            return
+
+        self.log.debug(f'Parsing {len(pending)} files using {jobs} processes')
+        chunk_size = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(jobs) as executor:
+            results = executor.map(_preload_file, [(self._cache_dir, loader, path) for loader, path in pending],
+                                   chunksize=chunk_size)
+            for result in results:
+                if result is None:
+                    continue
+                loader, path, fingerprint, payload = result
+                with self._lock:
+                    self._entries[(loader, path)] = (fingerprint, payload)
+
+    def _get_payload(self, loader: str, path: str) -> bytes:
+        """
+        Returns the pickled documents of the file, either from disk or by parsing the file
+        """
+        content = self._read(path)
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        payload = self._load_entry(loader, path, content_hash)
+        if payload is None:
+            payload = pickle.dumps(self._parse(loader, content), protocol=pickle.HIGHEST_PROTOCOL)
+            self._save_entry(loader, path, content_hash, payload)
+        return payload
+
+    @staticmethod
+    def _read(path: str) -> str:
+        with open(path, 'r') as stream:
+            return stream.read()
+
+    @staticmethod
+    def _parse(loader: str, content: str) -> any:
+        if loader == 'safe':
+            return Yml.load(content)
+        return Yml.load_all(content)
+
+    def _get_entry_path(self, loader: str, path: str) -> str:
+        name = hashlib.sha1((loader + ':' + path).encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, name[:2], name + '.pickle')
+
+    def _load_entry(self, loader: str, path: str, content_hash: str) -> Optional[bytes]:
+        """
+        Returns the pickled documents stored on disk if they match the given content hash
+        """
+        if self._cache_dir is None:
+            return None
+        entry_file = self._get_entry_path(loader, path)
+        try:
+            with open(entry_file, 'rb') as f:
+                version, entry_path, entry_hash, payload = pickle.load(f)
+                used = os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.log.debug(f'Ignoring invalid cache entry of {path}: {e}')
+            return None
+        if version != (self.CACHE_VERSION, yaml.__version__) or entry_path != path or entry_hash != content_hash:
+            return None
+        if time.time() - used > self.PRUNE_INTERVAL:
+            # The modification time marks when the entry has been used, see prune()
+            try:
+                os.utime(entry_file)
+            except OSError:
+                pass
+        return payload
+
+    def _save_entry(self, loader: str, path: str, content_hash: str, payload: bytes):
+        if self._cache_dir is None:
+            return
+        entry = ((self.CACHE_VERSION, yaml.__version__), path, content_hash, payload)
+        self._write(self._get_entry_path(loader, path), pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _write(self, path: str, content: bytes):
+        """
+        Writes a file inside the cache folder, the entries are only readable by the user
+        since the vars of the configs might be sensitive
+        """
+        try:
+            FileUtils.write_private(path, content)
+        except OSError as e:
+            self.log.debug(f'Could not write cache entry {path}: {e}')
+
+
+def _preload_file(args: Tuple[Optional[str], str, str]) -> Optional[Tuple[str, str, Tuple[int, int], bytes]]:
+    """
+    Parses a single file inside a worker process
+    :param args: Cache folder, loader and path
+    :return: Loader, path, fingerprint and pickled documents or None if the file can't be parsed
+    """
+    cache_dir, loader, path = args
+    try:
+        stat = os.stat(path)
+        return loader, path, (stat.st_mtime_ns, stat.st_size), YmlCache(cache_dir)._get_payload(loader, path)
+    except Exception:
+        return None
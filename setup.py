@@ -14,6 +14,9 @@ setuptools.setup(
     url='https://github.com/davidgiga1993/OpenK8Deploy',
     packages=setuptools.find_packages(),
     install_requires=['pyyaml'],
+    extras_require={
+        'zstd': ['zstandard'],
+    },
     entry_points={
         'console_scripts': ['ok8deploy=ok8deploy.ok8deploy:main'],
     },
@@ -0,0 +1,61 @@
+import os
+import threading
+from typing import List, Optional
+from unittest import TestCase, mock
+
+from ok8deploy.config.Config import ProjectConfig, RunMode
+from ok8deploy.deploy.AppDeploymentPool import AppDeploymentPool
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.oc.Oc import K8Api
+from ok8deploy.utils.Log import Log
+
+
+class ListingApi(K8Api):
+    def __init__(self):
+        super().__init__()
+        self.listed = []
+        self._lock = threading.Lock()
+
+    def get_all(self, kind: str, namespace: Optional[str] = None) -> List[ItemDescription]:
+        with self._lock:
+            self.listed.append((kind, namespace))
+        return []
+
+
+class AppDeploymentPoolTest(TestCase):
+
+    def test_deploy(self):
+        mode = RunMode()
+        mode.dry_run = True
+        prj_config = ProjectConfig.load(os.path.join(os.path.dirname(__file__), 'app_deploy_test'))
+        configs = prj_config.load_app_configs()
+
+        results = AppDeploymentPool(prj_config, mode, 3).deploy(configs)
+        results = {result.name: result for result in results}
+        self.assertEqual({'app', 'app-params', 'app-for-each'}, set(results.keys()))
+
+        # The missing param only fails its own app
+        self.assertFalse(results['app-params'].is_success())
+        self.assertTrue(results['app'].is_success())
+        self.assertTrue(results['app-for-each'].is_success())
+
+    def test_shared_live_state(self):
+        mode = RunMode()
+        mode.plan = True
+        prj_config = ProjectConfig.load(os.path.join(os.path.dirname(__file__), 'app_deploy_test'))
+        api = ListingApi()
+        with mock.patch.object(ProjectConfig, 'create_oc', return_value=api):
+            configs = [prj_config.load_app_config('app'), prj_config.load_app_config('app')]
+            results = AppDeploymentPool(prj_config, mode, 2).deploy(configs)
+        self.assertTrue(all(result.is_success() for result in results))
+        # Each kind is only listed once for all apps
+        self.assertEqual([('DeploymentConfig', 'oc-project')], api.listed)
+
+    def test_log_buffer(self):
+        log = Log('BufferTest')
+        Log.start_buffer()
+        log.log.info('buffered')
+        lines = Log.stop_buffer()
+        self.assertEqual(1, len(lines))
+        self.assertIn('buffered', lines[0])
+        self.assertIsNone(Log.get_buffer())
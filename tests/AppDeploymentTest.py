@@ -94,3 +94,16 @@ KEY STUFF
         self.assertEqual('DEF', data['metadata']['name2'])
         self.assertEqual('3', data['metadata']['base'])
         self.assertEqual('global', data['metadata']['GLOBAL_TEST'])
+
+    def test_template_cache(self):
+        prj_config = ProjectConfig.load(os.path.join(self._base_path, 'app_deploy_test'))
+        template = prj_config.load_template_config('app-template-2')
+        self.assertIs(template, prj_config.load_template_config('app-template-2'))
+
+        # All instances share the template, the variables are resolved per instance
+        app_config = prj_config.load_app_config('app-for-each')
+        AppDeployment(prj_config, app_config, self._mode).deploy()
+        with open(self._tmp_file) as f:
+            docs = list(yaml.load_all(f, Loader=yaml.FullLoader))
+        self.assertEqual(['8080', '8081'], [str(doc['metadata']['REMAPPED2']) for doc in docs])
+        self.assertEqual('${PARAM_A}', template.get_replacements()['REMAPPED2'])
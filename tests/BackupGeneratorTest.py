@@ -0,0 +1,201 @@
+import os
+import tarfile
+import tempfile
+import threading
+from typing import List
+from unittest import TestCase
+from urllib.parse import urlparse, parse_qs
+
+import yaml
+
+from ok8deploy.backup.BackupGenerator import BackupGenerator, BackupMode
+from ok8deploy.backup.SnapshotStore import SnapshotStore
+from ok8deploy.oc.Model import ApiResource
+from ok8deploy.oc.Oc import K8Api
+
+
+class ListingApi(K8Api):
+    NAMESPACES = ['a', 'b']
+
+    def __init__(self):
+        super().__init__()
+        self.list_calls = []
+        self.version = '1'
+        self._lock = threading.Lock()
+
+    def get_namespaces(self) -> List[str]:
+        return ['namespace/' + namespace for namespace in self.NAMESPACES]
+
+    def get_api_resources(self, namespaced: bool = True) -> List[ApiResource]:
+        verbs = ['get', 'list', 'watch']
+        if not namespaced:
+            return [ApiResource('clusterroles', 'rbac.authorization.k8s.io/v1', 'ClusterRole', False, verbs),
+                    ApiResource('nodes', 'v1', 'Node', False, verbs)]
+        return [ApiResource('configmaps', 'v1', 'ConfigMap', True, verbs, ['cm']),
+                ApiResource('deployments', 'apps/v1', 'Deployment', True, verbs),
+                ApiResource('bindings', 'v1', 'Binding', True, ['create']),
+                ApiResource('events', 'v1', 'Event', True, verbs)]
+
+    def _get_raw(self, path: str) -> dict:
+        url = urlparse(path)
+        query = parse_qs(url.query)
+        offset = int(query.get('continue', ['0'])[0])
+        limit = int(query['limit'][0])
+        with self._lock:
+            self.list_calls.append((url.path, offset))
+
+        parts = url.path.split('/')
+        namespaces = [parts[parts.index('namespaces') + 1]] if 'namespaces' in parts else self.NAMESPACES
+        if parts[-1] == 'clusterroles':
+            items = [{'metadata': {'name': 'admin'}}]
+        elif parts[-1] == 'configmaps':
+            items = [{'metadata': {'name': 'config-' + str(idx), 'namespace': ns}}
+                     for ns in namespaces for idx in range(3)]
+        elif parts[-1] == 'deployments':
+            items = [{'metadata': {'name': 'app', 'namespace': ns, 'uid': 'uid-' + ns,
+                                   'resourceVersion': self.version, 'managedFields': [{}]},
+                      'spec': {'replicas': int(self.version)},
+                      'status': {'replicas': 0}} for ns in namespaces]
+        else:
+            items = []
+
+        page = {'items': items[offset:offset + limit], 'metadata': {}}
+        if offset + limit < len(items):
+            page['metadata']['continue'] = str(offset + limit)
+        return page
+
+
+class StaticConfig:
+    def __init__(self, api: K8Api):
+        self._api = api
+
+    def create_oc(self) -> K8Api:
+        return self._api
+
+
+class BackupGeneratorTest(TestCase):
+    FILES = ['_clusterrole.rbac.authorization.k8s.io_admin.yaml',
+             'a_configmap_config-0.yaml', 'a_configmap_config-1.yaml', 'a_configmap_config-2.yaml',
+             'a_deployment.apps_app.yaml',
+             'b_configmap_config-0.yaml', 'b_configmap_config-1.yaml', 'b_configmap_config-2.yaml',
+             'b_deployment.apps_app.yaml']
+
+    def test_backup_per_namespace(self):
+        api = ListingApi()
+        mode = BackupMode()
+        mode.jobs = 2
+        mode.chunk_size = 2
+        with tempfile.TemporaryDirectory() as dir_name:
+            BackupGenerator(StaticConfig(api), mode).create_backup(dir_name)
+            self.assertEqual(self.FILES, sorted(os.listdir(dir_name)))
+            with open(os.path.join(dir_name, 'b_deployment.apps_app.yaml')) as f:
+                data = yaml.safe_load(f)
+            self.assertEqual('b', data['metadata']['namespace'])
+            self.assertEqual('Deployment', data['kind'])
+            self.assertIn('status', data)
+        # Config maps are fetched in two pages
+        self.assertEqual([('/api/v1/namespaces/a/configmaps', 0), ('/api/v1/namespaces/a/configmaps', 2),
+                          ('/apis/apps/v1/namespaces/a/deployments', 0)],
+                         [call for call in api.list_calls if '/a/' in call[0]])
+        # Cluster scoped objects are only listed once
+        self.assertEqual(1, len([call for call in api.list_calls if 'clusterroles' in call[0]]))
+
+    def test_backup_all_namespaces(self):
+        api = ListingApi()
+        mode = BackupMode()
+        mode.all_namespaces = True
+        with tempfile.TemporaryDirectory() as dir_name:
+            BackupGenerator(StaticConfig(api), mode).create_backup(dir_name)
+            self.assertEqual(self.FILES, sorted(os.listdir(dir_name)))
+        self.assertEqual([('/apis/rbac.authorization.k8s.io/v1/clusterroles', 0), ('/api/v1/configmaps', 0),
+                          ('/apis/apps/v1/deployments', 0)], api.list_calls)
+
+    def test_incremental_backup(self):
+        api = ListingApi()
+        mode = BackupMode()
+        mode.incremental = True
+        with tempfile.TemporaryDirectory() as dir_name:
+            BackupGenerator(StaticConfig(api), mode).create_backup(dir_name)
+            api.version = '2'
+            BackupGenerator(StaticConfig(api), mode).create_backup(dir_name)
+
+            store = SnapshotStore(dir_name)
+            snapshots = store.get_snapshots()
+            self.assertEqual(2, len(snapshots))
+            first = store.load_manifest(snapshots[0])
+            second = store.load_manifest(snapshots[1])
+            self.assertEqual(self.FILES, sorted(second.keys()))
+            # Config maps didn't change and share their blob, the deployments have been updated
+            self.assertEqual(first['a_configmap_config-0.yaml'], second['a_configmap_config-0.yaml'])
+            self.assertNotEqual(first['a_deployment.apps_app.yaml']['hash'],
+                                second['a_deployment.apps_app.yaml']['hash'])
+
+            # Both snapshots can still be restored
+            store.export(os.path.join(dir_name, 'export'), snapshots[0])
+            with open(os.path.join(dir_name, 'export', 'b_deployment.apps_app.yaml')) as f:
+                self.assertEqual(1, yaml.safe_load(f)['spec']['replicas'])
+            self.assertEqual(2, yaml.safe_load(dict(store.read_snapshot())['b_deployment.apps_app.yaml'])
+                             ['spec']['replicas'])
+
+    def test_archive(self):
+        api = ListingApi()
+        mode = BackupMode()
+        mode.archive = True
+        mode.strip = True
+        with tempfile.TemporaryDirectory() as dir_name:
+            path = os.path.join(dir_name, 'backup.tar.gz')
+            BackupGenerator(StaticConfig(api), mode).create_backup(path)
+            with tarfile.open(path, 'r:gz') as tar:
+                self.assertEqual(self.FILES, sorted(tar.getnames()))
+                data = yaml.safe_load(tar.extractfile('a_deployment.apps_app.yaml'))
+        self.assertNotIn('status', data)
+        self.assertNotIn('managedFields', data['metadata'])
+        self.assertEqual(1, data['spec']['replicas'])
+
+    def test_filters(self):
+        api = ListingApi()
+        mode = BackupMode()
+        mode.include_kinds = ['cm', 'events']
+        mode.exclude_namespaces = ['b*']
+        for all_namespaces in [False, True]:
+            mode.all_namespaces = all_namespaces
+            with tempfile.TemporaryDirectory() as dir_name:
+                BackupGenerator(StaticConfig(api), mode).create_backup(dir_name)
+                self.assertEqual(['a_configmap_config-0.yaml', 'a_configmap_config-1.yaml',
+                                  'a_configmap_config-2.yaml'], sorted(os.listdir(dir_name)))
+
+    def test_list_failure(self):
+        api = ListingApi()
+        mode = BackupMode()
+        mode.incremental = True
+        mode.chunk_size = 2
+        get_raw = api._get_raw
+
+        def expired_token(path: str) -> dict:
+            if 'continue=' in path:
+                raise Exception('410 Gone: continue token expired')
+            return get_raw(path)
+
+        api._get_raw = expired_token
+        with tempfile.TemporaryDirectory() as dir_name:
+            with self.assertRaises(Exception) as context:
+                BackupGenerator(StaticConfig(api), mode).create_backup(dir_name)
+            self.assertIn('configmaps', str(context.exception))
+            # No snapshot which looks complete is stored
+            self.assertEqual([], SnapshotStore(dir_name).get_snapshots())
+
+    def test_list_failure_archive(self):
+        api = ListingApi()
+        mode = BackupMode()
+        mode.archive = True
+
+        def failing(path: str) -> dict:
+            raise Exception('403 Forbidden')
+
+        api._get_raw = failing
+        with tempfile.TemporaryDirectory() as dir_name:
+            path = os.path.join(dir_name, 'backup.tar.gz')
+            with self.assertRaises(Exception):
+                BackupGenerator(StaticConfig(api), mode).create_backup(path)
+            # The partial archive is removed
+            self.assertEqual([], os.listdir(dir_name))
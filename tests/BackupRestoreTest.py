@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+from typing import Optional
+from unittest import TestCase
+
+import yaml
+
+from ok8deploy.backup.BackupRestore import BackupRestore, RestoreMode
+from ok8deploy.backup.BackupWriter import ArchiveWriter, DirectoryWriter
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.oc.Oc import K8Api
+
+
+class ApplyingApi(K8Api):
+    def __init__(self, failing: str = None):
+        super().__init__()
+        self.applied = []
+        self.failing = failing
+        self._lock = threading.Lock()
+
+    def apply(self, yml: str, namespace: Optional[str] = None) -> str:
+        data = yaml.safe_load(yml)
+        items = data['items'] if data['kind'] == 'List' else [data]
+        if self.failing is not None and self.failing in [item['metadata']['name'] for item in items]:
+            raise Exception('Invalid object')
+        with self._lock:
+            self.applied.append((namespace, items))
+        return ''
+
+
+class StaticConfig:
+    def __init__(self, api: K8Api):
+        self._api = api
+
+    def create_oc(self) -> K8Api:
+        return self._api
+
+
+class BackupRestoreTest(TestCase):
+    OBJECTS = [
+        {'apiVersion': 'apps/v1', 'kind': 'Deployment',
+         'metadata': {'name': 'app', 'namespace': 'a', 'uid': '1', 'resourceVersion': '2'},
+         'spec': {'replicas': 1}, 'status': {'replicas': 1}},
+        {'apiVersion': 'apps/v1', 'kind': 'ReplicaSet',
+         'metadata': {'name': 'app-1', 'namespace': 'a', 'ownerReferences': [{'kind': 'Deployment'}]}},
+        {'apiVersion': 'v1', 'kind': 'Service', 'metadata': {'name': 'app', 'namespace': 'a'},
+         'spec': {'clusterIP': '10.0.0.1', 'clusterIPs': ['10.0.0.1']}},
+        {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'config', 'namespace': 'a'}},
+        {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'config', 'namespace': 'b'}},
+        {'apiVersion': 'v1', 'kind': 'Namespace', 'metadata': {'name': 'a'}},
+        {'apiVersion': 'v1', 'kind': 'Namespace', 'metadata': {'name': 'b'}},
+        {'apiVersion': 'v1', 'kind': 'PersistentVolume', 'metadata': {'name': 'pv'},
+         'spec': {'claimRef': {'kind': 'PersistentVolumeClaim', 'name': 'data', 'namespace': 'a', 'uid': '3',
+                               'resourceVersion': '4'}}},
+    ]
+
+    def _write(self, writer):
+        for data in self.OBJECTS:
+            writer.write(ItemDescription(data))
+        writer.close()
+
+    def test_restore(self):
+        api = ApplyingApi()
+        mode = RestoreMode()
+        mode.jobs = 2
+        with tempfile.TemporaryDirectory() as dir_name:
+            self._write(DirectoryWriter(dir_name))
+            BackupRestore(StaticConfig(api), mode).restore(dir_name)
+
+        # Cluster scoped objects first
+        self.assertEqual((None, ['Namespace', 'Namespace', 'PersistentVolume']),
+                         (api.applied[0][0], [item['kind'] for item in api.applied[0][1]]))
+        self.assertEqual({'kind': 'PersistentVolumeClaim', 'name': 'data', 'namespace': 'a'},
+                         api.applied[0][1][2]['spec']['claimRef'])
+        applied = {namespace: items for namespace, items in api.applied}
+        self.assertEqual(['ConfigMap', 'Service', 'Deployment'], [item['kind'] for item in applied['a']])
+        self.assertEqual(1, len(applied['b']))
+
+        service = applied['a'][1]
+        self.assertNotIn('clusterIP', service['spec'])
+        deployment = applied['a'][2]
+        self.assertNotIn('status', deployment)
+        self.assertEqual({'name': 'app', 'namespace': 'a'}, deployment['metadata'])
+
+    def test_restore_archive(self):
+        api = ApplyingApi(failing='app')
+        mode = RestoreMode()
+        mode.include_namespaces = ['a']
+        with tempfile.TemporaryDirectory() as dir_name:
+            path = os.path.join(dir_name, 'backup.tar.gz')
+            self._write(ArchiveWriter(path))
+            with self.assertRaises(Exception) as ctx:
+                BackupRestore(StaticConfig(api), mode).restore(path)
+
+        self.assertIn("['Service/app', 'Deployment/app']", str(ctx.exception))
+        # Only namespace a, the remaining objects are applied one by one
+        self.assertEqual([(None, 'Namespace'), ('a', 'ConfigMap')],
+                         [(namespace, items[0]['kind']) for namespace, items in api.applied])
+        self.assertEqual('a', api.applied[0][1][0]['metadata']['name'])
+        self.assertEqual(1, len(api.applied[0][1]))
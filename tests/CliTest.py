@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class CliTest(TestCase):
+    # Modules which should only be imported by the commands using them
+    HEAVY_MODULES = ('yaml', 'ok8deploy.backup', 'ok8deploy.config', 'ok8deploy.deploy', 'ok8deploy.processing',
+                     'ok8deploy.oc')
+
+    def test_lazy_imports(self):
+        script = '''
+import sys
+from ok8deploy import ok8deploy
+sys.argv = ['ok8deploy', '--help']
+try:
+    ok8deploy.main()
+except SystemExit:
+    pass
+print('modules:' + ','.join(sorted(name for name in sys.modules if name.startswith(%r))))
+''' % (self.HEAVY_MODULES,)
+        root = os.path.join(os.path.dirname(__file__), os.pardir)
+        output = subprocess.run([sys.executable, '-c', script], cwd=root, check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        self.assertEqual('modules:', output.strip().split('\n')[-1])
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from typing import List, Optional
+from unittest import TestCase, mock
+
+from ok8deploy.config.AppConfig import AppConfig
+from ok8deploy.config.DeploymentActionConfig import DeploymentActionConfig
+from ok8deploy.oc.Model import PodData
+from ok8deploy.oc.Oc import K8Api
+from ok8deploy.utils.Log import Log
+
+
+class ExecApi(K8Api):
+    def __init__(self, pod_count: int, failing: List[str] = None):
+        super().__init__()
+        self.pod_count = pod_count
+        self.failing = failing or []
+        self.exec_calls = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def get_pods(self, dc_name: Optional[str] = None, pod_name: Optional[str] = None,
+                 namespace: Optional[str] = None) -> List[PodData]:
+        pods = []
+        for i in range(self.pod_count):
+            pod = PodData()
+            pod.name = 'pod-' + str(i)
+            pods.append(pod)
+        return pods
+
+    def exec(self, pod_name: str, cmd: str, args: List[str], namespace: Optional[str] = None,
+             timeout: Optional[float] = None):
+        with self._lock:
+            self.exec_calls.append((pod_name, namespace, timeout))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.log.info('Output of ' + pod_name)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        if pod_name in self.failing:
+            raise Exception('Failed: exit code 1')
+
+
+class DeploymentActionConfigTest(TestCase):
+
+    def _action(self, **exec_config) -> DeploymentActionConfig:
+        app_config = AppConfig('.', None)
+        app_config.data = {'dc': {'name': 'app'}}
+        exec_config.update({'command': 'kill', 'args': ['-HUP', '1']})
+        return DeploymentActionConfig(app_config, {'exec': exec_config})
+
+    def test_concurrent_exec(self):
+        api = ExecApi(6)
+        self._action(concurrency=3, timeout=5).run(api, 'prod')
+        self.assertEqual(6, len(api.exec_calls))
+        self.assertEqual(3, api.max_running)
+        self.assertEqual({('prod', 5)}, {(ns, timeout) for _, ns, timeout in api.exec_calls})
+
+    def test_sequential_by_default(self):
+        api = ExecApi(3)
+        self._action().run(api)
+        self.assertEqual(1, api.max_running)
+        self.assertEqual(['pod-0', 'pod-1', 'pod-2'], [name for name, _, _ in api.exec_calls])
+
+    def test_failures_are_reported(self):
+        api = ExecApi(4, failing=['pod-1', 'pod-3'])
+        with self.assertRaises(Exception) as ctx:
+            self._action(concurrency=2).run(api)
+        # All pods are still processed
+        self.assertEqual(4, len(api.exec_calls))
+        self.assertIn("'pod-1', 'pod-3'", str(ctx.exception))
+
+    def test_max_failures(self):
+        api = ExecApi(5, failing=['pod-0', 'pod-1', 'pod-2', 'pod-3', 'pod-4'])
+        with self.assertRaises(Exception):
+            self._action(maxFailures=2).run(api)
+        self.assertEqual(2, len(api.exec_calls))
+
+    def test_output_buffered(self):
+        for concurrency in [1, 3]:
+            api = ExecApi(3)
+            Log.start_buffer()
+            try:
+                with mock.patch.object(logging.StreamHandler, 'emit') as emit:
+                    self._action(concurrency=concurrency).run(api)
+            finally:
+                lines = Log.stop_buffer()
+            # Nothing is written directly, the output of the pods is kept in order
+            emit.assert_not_called()
+            pod_lines = [line for line in lines if 'Output of' in line]
+            self.assertEqual(3, len(pod_lines))
+            for index, line in enumerate(pod_lines):
+                self.assertIn(f'Output of pod-{index}', line)
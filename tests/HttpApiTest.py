@@ -0,0 +1,236 @@
+import http.client
+import json
+import os
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, mock
+
+import yaml
+
+from ok8deploy.oc.HttpApi import ConnectionPool, HttpApi
+from ok8deploy.oc.Oc import K8Api
+from ok8deploy.utils.Log import Log
+
+
+class BrokenConnection:
+    """
+    Idle connection which fails on the next request
+    """
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.closed = False
+
+    def request(self, method, url, body=None, headers=None):
+        raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Simulates the parts of the api server used by the http client
+    """
+    protocol_version = 'HTTP/1.1'
+
+    DISCOVERY = {
+        '/api/v1': {'resources': [
+            {'name': 'configmaps', 'kind': 'ConfigMap', 'namespaced': True, 'singularName': 'configmap'},
+            {'name': 'namespaces', 'kind': 'Namespace', 'namespaced': False},
+            {'name': 'pods', 'kind': 'Pod', 'namespaced': True},
+            {'name': 'pods/exec', 'kind': 'PodExecOptions', 'namespaced': True},
+        ]},
+        '/apis': {'groups': [{'name': 'apps', 'preferredVersion': {'groupVersion': 'apps/v1'}}]},
+        '/apis/apps/v1': {'resources': [
+            {'name': 'deployments', 'kind': 'Deployment', 'namespaced': True, 'shortNames': ['deploy']},
+        ]},
+    }
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path))
+        if self.headers.get('Upgrade') == 'websocket':
+            self._exec()
+            return
+        if self.path in self.DISCOVERY:
+            self._send(200, self.DISCOVERY[self.path])
+            return
+        if self.path == '/api/v1/namespaces/test/configmaps':
+            self._send(200, {'kind': 'ConfigMapList', 'items': list(self.server.objects.values())})
+            return
+        item = self.server.objects.get(self.path)
+        if item is None:
+            self._send(404, {'kind': 'Status', 'reason': 'NotFound', 'message': 'not found'})
+            return
+        self._send(200, item)
+
+    def do_PATCH(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        path = self.path.split('?')[0]
+        self.server.requests.append(('PATCH', self.path, self.headers['Content-Type']))
+        patch = json.loads(body)
+        existing = self.server.objects.setdefault(path, {'metadata': {}})
+        existing.update({key: value for key, value in patch.items() if key != 'metadata'})
+        existing['metadata'].update(patch['metadata'])
+        self._send(200, existing)
+
+    def _send(self, status: int, data: dict):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _exec(self):
+        self.send_response(101)
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.end_headers()
+        for channel, payload in [(1, b'reloaded'), (3, json.dumps({'status': 'Success'}).encode('utf-8'))]:
+            data = bytes([channel]) + payload
+            self.wfile.write(struct.pack('BB', 0x82, len(data)) + data)
+        self.wfile.write(struct.pack('BB', 0x88, 0))
+        self.close_connection = True
+
+
+class HttpApiTest(TestCase):
+
+    def setUp(self) -> None:
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self._server.connections = 0
+        self._server.requests = []
+        self._server.objects = {}
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        kube_config = os.path.join(self._temp_dir.name, 'config')
+        with open(kube_config, 'w') as f:
+            yaml.dump({
+                'current-context': 'stand-in',
+                'clusters': [{'name': 'local', 'cluster': {
+                    'server': f'http://127.0.0.1:{self._server.server_address[1]}'
+                }}],
+                'users': [{'name': 'user', 'user': {'token': 'secret'}}],
+                'contexts': [{'name': 'stand-in', 'context': {'cluster': 'local', 'user': 'user', 'namespace': 'test'}}]
+            }, f)
+        self._env = mock.patch.dict(os.environ, {'KUBECONFIG': kube_config})
+        self._env.start()
+        self._cache_dir = mock.patch.object(K8Api, 'DISCOVERY_CACHE_DIR', os.path.join(self._temp_dir.name, 'cache'))
+        self._cache_dir.start()
+        self._api = HttpApi()
+
+    def tearDown(self) -> None:
+        self._api.close()
+        self._env.stop()
+        self._cache_dir.stop()
+        self._server.shutdown()
+        self._server.server_close()
+        self._temp_dir.cleanup()
+
+    def test_apply_get(self):
+        api = HttpApi(server_side_apply=True)
+        self.addCleanup(api.close)
+        self.assertIsNone(api.get('ConfigMap/a'))
+
+        api.apply(yaml.dump({'kind': 'List', 'apiVersion': 'v1', 'items': [
+            {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'a'}, 'data': {'key': 'value'}},
+            {'kind': 'Deployment', 'apiVersion': 'apps/v1', 'metadata': {'name': 'b', 'namespace': 'other'}},
+        ]}))
+        self.assertIn(('PATCH', '/api/v1/namespaces/test/configmaps/a?fieldManager=ok8deploy&force=true',
+                       'application/apply-patch+yaml'), self._server.requests)
+        self.assertIn('/apis/apps/v1/namespaces/other/deployments/b', self._server.objects)
+
+        api.annotate('configmap/a', 'yml-hash', '123')
+        item = api.get('ConfigMap/a')
+        self.assertEqual('123', item.get_annotation('yml-hash'))
+        self.assertEqual('value', item.data['data']['key'])
+
+        items = api.get_all('ConfigMap')
+        self.assertEqual(['a'], [item.get_name() for item in items if item.data['kind'] == 'ConfigMap'])
+
+    def test_client_side_apply(self):
+        # Same as the cli client
+        yml = yaml.dump({'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'a'}})
+        with mock.patch('subprocess.run', return_value=subprocess.CompletedProcess([], 0, b'applied', b'')) as run:
+            self.assertEqual('applied', self._api.apply(yml, 'test'))
+        self.assertEqual(['kubectl', 'apply', '-f', '-', '--namespace=test'], run.call_args[0][0])
+        self.assertEqual([], [request for request in self._server.requests if request[0] == 'PATCH'])
+
+    def test_keep_alive(self):
+        api = self._api
+        for _ in range(5):
+            api.get('ConfigMap/a')
+        self.assertEqual(1, self._server.connections)
+
+    def test_stale_connection(self):
+        pool = ConnectionPool(f'http://127.0.0.1:{self._server.server_address[1]}', None)
+        # Sent again using a new connection
+        conn = BrokenConnection(http.client.RemoteDisconnected('closed'))
+        pool._idle.append(conn)
+        status, _ = pool.request('GET', '/api/v1')
+        self.assertEqual(200, status)
+        self.assertTrue(conn.closed)
+
+        # Might have been processed already
+        conn = BrokenConnection(http.client.RemoteDisconnected('closed'))
+        pool._idle = [conn]
+        with self.assertRaises(http.client.RemoteDisconnected):
+            pool.request('POST', '/api/v1', b'{}')
+
+        # Not reused after a timeout
+        conn = BrokenConnection(socket.timeout('timed out'))
+        pool._idle = [conn]
+        with self.assertRaises(socket.timeout):
+            pool.request('GET', '/api/v1')
+        self.assertTrue(conn.closed)
+        self.assertEqual([], pool._idle)
+        pool.close()
+
+    def test_unknown_kind(self):
+        api = self._api
+        with self.assertRaises(Exception):
+            api.get('Unknown/a')
+
+    def test_exec(self):
+        api = self._api
+        Log.start_buffer()
+        try:
+            api.exec('pod-1', 'kill', ['-HUP', '1'])
+        finally:
+            lines = Log.stop_buffer()
+        self.assertIn('reloaded', '\n'.join(lines))
+        self.assertIn(('GET', '/api/v1/namespaces/test/pods/pod-1/exec?command=kill&command=-HUP&command=1'
+                              '&stdout=true&stderr=true'), self._server.requests)
+
+    def test_discovery_cache(self):
+        self._api.get('ConfigMap/a')
+        discovery = [request for request in self._server.requests if request[1] in StandInHandler.DISCOVERY]
+        self.assertEqual(3, len(discovery))
+
+        # A new client uses the disk cache
+        self._server.requests.clear()
+        api = HttpApi()
+        self.assertEqual(['configmaps', 'pods', 'deployments.apps'],
+                         [resource.get_full_name() for resource in api.get_api_resources(namespaced=True)])
+        api.get('deploy/b')
+        self.assertTrue(api.is_discovery_cached())
+        self.assertEqual([('GET', '/apis/apps/v1/namespaces/test/deployments/b')], self._server.requests)
+
+        # Unknown kinds cause a refresh
+        with self.assertRaises(Exception):
+            api.get('Unknown/a')
+        self.assertFalse(api.is_discovery_cached())
+        self.assertIn(('GET', '/apis'), self._server.requests)
+        api.close()
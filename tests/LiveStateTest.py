@@ -0,0 +1,50 @@
+from typing import List, Optional
+from unittest import TestCase
+
+from ok8deploy.deploy.LiveState import LiveState
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.oc.Oc import K8Api
+
+
+class ListingApi(K8Api):
+    def __init__(self):
+        super().__init__()
+        self.list_calls = []
+        self.get_calls = []
+
+    def get_all(self, kind: str, namespace: Optional[str] = None) -> List[ItemDescription]:
+        self.list_calls.append((kind, namespace))
+        if kind == 'Unknown':
+            raise Exception('error: the server doesn\'t have a resource type "Unknown"')
+        return [ItemDescription({'metadata': {'name': 'a', 'annotations': {'yml-hash': '1'}}}),
+                ItemDescription({'metadata': {'name': 'b'}})]
+
+    def get(self, name: str, namespace: Optional[str] = None) -> Optional[ItemDescription]:
+        self.get_calls.append(name)
+        return None
+
+
+class LiveStateTest(TestCase):
+
+    def test_prefetch_groups(self):
+        api = ListingApi()
+        state = LiveState(api)
+        state.prefetch([
+            {'kind': 'ConfigMap', 'metadata': {'name': 'a'}},
+            {'kind': 'ConfigMap', 'metadata': {'name': 'b'}},
+            {'kind': 'ConfigMap', 'metadata': {'name': 'c', 'namespace': 'other'}},
+            {'kind': 'Service', 'metadata': {'name': 'a'}},
+        ], 'project')
+        self.assertEqual([('ConfigMap', 'project'), ('ConfigMap', 'other'), ('Service', 'project')], api.list_calls)
+
+        self.assertEqual('1', state.get('ConfigMap', 'a', 'project').get_annotation('yml-hash'))
+        self.assertIsNone(state.get('ConfigMap', 'b', 'project').get_annotation('yml-hash'))
+        self.assertIsNone(state.get('ConfigMap', 'c', 'other'))
+        self.assertEqual([], api.get_calls)
+
+    def test_fallback_to_get(self):
+        api = ListingApi()
+        state = LiveState(api)
+        state.prefetch([{'kind': 'Unknown', 'metadata': {'name': 'a'}}])
+        self.assertIsNone(state.get('Unknown', 'a'))
+        self.assertEqual(['Unknown/a'], api.get_calls)
@@ -0,0 +1,130 @@
+import os
+from typing import List, Optional
+from unittest import TestCase
+
+import yaml
+
+from ok8deploy.config.Config import ProjectConfig, RunMode
+from ok8deploy.deploy.OcObjectDeployer import OcObjectDeployer, ChangedObject
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.oc.Oc import K8Api
+
+
+class RecordingApi(K8Api):
+    def __init__(self):
+        super().__init__()
+        self.applied = []
+        self.namespaces = []
+        self.annotated = []
+        self.existing = []
+
+    def get(self, name: str, namespace: Optional[str] = None) -> Optional[ItemDescription]:
+        return None
+
+    def get_all(self, kind: str, namespace: Optional[str] = None) -> List[ItemDescription]:
+        return [ItemDescription({'metadata': {'name': name}}) for name in self.existing]
+
+    def apply(self, yml: str, namespace: Optional[str] = None) -> str:
+        data = yaml.safe_load(yml)
+        items = data['items'] if data['kind'] == 'List' else [data]
+        if any(item['metadata']['name'] == 'broken' for item in items):
+            raise Exception('Invalid object')
+        for item in items:
+            assert item['metadata']['annotations']['yml-hash'] != ''
+        for item in items:
+            assert item['metadata'].get('namespace', namespace) == namespace
+        self.applied.append([item['metadata']['name'] for item in items])
+        self.namespaces.append(namespace)
+        return ''
+
+    def annotate(self, name: str, key: str, value: str, namespace: Optional[str] = None):
+        self.annotated.append(name)
+
+
+class OcObjectDeployerTest(TestCase):
+
+    def setUp(self) -> None:
+        self._prj_config = ProjectConfig.load(os.path.join(os.path.dirname(__file__), 'app_deploy_test'))
+        self._app_config = self._prj_config.load_app_config('app')
+
+    def _create_deployer(self, api: K8Api) -> OcObjectDeployer:
+        mode = RunMode()
+        mode.batch_apply = True
+        return OcObjectDeployer(self._prj_config, api, self._app_config, mode)
+
+    def test_batch_apply(self):
+        api = RecordingApi()
+        deployer = self._create_deployer(api)
+        for name in ['a', 'b', 'c']:
+            deployer.deploy_object({'kind': 'ConfigMap', 'metadata': {'name': name}})
+        self.assertEqual([], api.applied)
+
+        deployer.flush()
+        self.assertEqual([['a', 'b', 'c']], api.applied)
+        self.assertEqual([], api.annotated)
+
+    def test_batch_apply_failure(self):
+        api = RecordingApi()
+        deployer = self._create_deployer(api)
+        for name in ['a', 'broken', 'c']:
+            deployer.deploy_object({'kind': 'ConfigMap', 'metadata': {'name': name}})
+
+        with self.assertRaises(Exception) as context:
+            deployer.flush()
+        self.assertIn('ConfigMap/broken', str(context.exception))
+        self.assertEqual([['a'], ['c']], api.applied)
+
+    def test_batch_apply_namespaces(self):
+        api = RecordingApi()
+        deployer = self._create_deployer(api)
+        deployer.deploy_object({'kind': 'ConfigMap', 'metadata': {'name': 'a'}})
+        deployer.deploy_object({'kind': 'ConfigMap', 'metadata': {'name': 'b', 'namespace': 'other'}})
+        deployer.deploy_object({'kind': 'ConfigMap', 'metadata': {'name': 'c'}})
+        deployer.flush()
+        self.assertEqual([['a', 'c'], ['b']], api.applied)
+        self.assertEqual(['oc-project', 'other'], api.namespaces)
+
+    def test_hash_annotation(self):
+        api = RecordingApi()
+        deployer = self._create_deployer(api)
+        data = {'kind': 'ConfigMap', 'metadata': {'name': 'a', 'annotations': {'other': 'value'}}}
+        deployer.deploy_object(data)
+        changed = deployer._pending[0]
+
+        # The hash is calculated without the annotation
+        self.assertEqual({'other': 'value'}, data['metadata']['annotations'])
+        self.assertEqual({'other': 'value', 'yml-hash': changed.hash_val}, changed.data['metadata']['annotations'])
+
+    def test_annotate_existing(self):
+        api = RecordingApi()
+        api.existing = ['a', 'b']
+        deployer = self._create_deployer(api)
+        objects = [{'kind': 'ConfigMap', 'metadata': {'name': 'a'}},
+                   {'kind': 'ConfigMap', 'metadata': {'name': 'b'}}]
+        deployer.prefetch(objects)
+        for data in objects:
+            deployer.deploy_object(data)
+        deployer.flush()
+        self.assertEqual([], api.applied)
+        self.assertEqual(['ConfigMap/a', 'ConfigMap/b'], api.annotated)
+
+    def test_plan_keeps_annotations(self):
+        api = RecordingApi()
+        api.existing = ['a']
+        mode = RunMode()
+        mode.plan = True
+        deployer = OcObjectDeployer(self._prj_config, api, self._app_config, mode)
+        objects = [{'kind': 'ConfigMap', 'metadata': {'name': 'a'}}]
+        deployer.prefetch(objects)
+        deployer.deploy_object(objects[0])
+        deployer.flush()
+        self.assertEqual([], api.annotated)
+
+    def test_chunks(self):
+        items = [ChangedObject({'kind': 'ConfigMap', 'metadata': {'name': str(i)}}, '') for i in range(5)]
+        size = len(items[0].str_repr)
+        chunks = OcObjectDeployer.create_chunks(items, size * 2)
+        self.assertEqual([2, 2, 1], [len(chunk) for chunk in chunks])
+
+        chunks = OcObjectDeployer.create_chunks(items, 10)
+        self.assertEqual([1, 1, 1, 1, 1], [len(chunk) for chunk in chunks])
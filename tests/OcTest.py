@@ -0,0 +1,85 @@
+import json
+import subprocess
+from unittest import TestCase, mock
+
+from ok8deploy.oc.Oc import K8
+from ok8deploy.utils.Log import Log
+
+
+class OcTest(TestCase):
+
+    def _run(self, stdout: str = ''):
+        return mock.patch('subprocess.run', return_value=subprocess.CompletedProcess([], 0, stdout.encode('utf-8'), b''))
+
+    def test_namespace_and_context(self):
+        k8 = K8('my-context')
+        with self._run() as run:
+            k8.annotate('ConfigMap/a', 'key', 'value', 'my-namespace')
+            k8.rollout('app')
+        self.assertEqual(['kubectl', 'annotate', '--overwrite=true', 'ConfigMap/a', 'key=value',
+                          '--context=my-context', '--namespace=my-namespace'], run.call_args_list[0][0][0])
+        self.assertEqual(['kubectl', 'rollout', 'restart', 'deployments', 'app', '--context=my-context'],
+                         run.call_args_list[1][0][0])
+
+    def test_exec_output_buffered(self):
+        k8 = K8()
+        Log.start_buffer()
+        try:
+            with self._run('reloaded'), mock.patch('builtins.print') as print_mock:
+                k8.exec('pod-1', 'kill', ['-HUP', '1'])
+        finally:
+            lines = Log.stop_buffer()
+        # Written together with the other output of the deployment
+        print_mock.assert_not_called()
+        self.assertEqual(2, len(lines))
+        self.assertIn('reloaded', lines[1])
+
+    def test_pod_selector(self):
+        k8 = K8()
+        deployment = json.dumps({'spec': {'selector': {
+            'matchLabels': {'app': 'web'},
+            'matchExpressions': [{'key': 'tier', 'operator': 'In', 'values': ['a', 'b']}]
+        }}})
+        pods = json.dumps({'items': [{
+            'metadata': {'name': 'web-1', 'annotations': {}, 'labels': {'app': 'web'}},
+            'status': {'containerStatuses': [{'ready': True}]}
+        }]})
+        with mock.patch('subprocess.run', side_effect=[
+            subprocess.CompletedProcess([], 0, deployment.encode('utf-8'), b''),
+            subprocess.CompletedProcess([], 0, pods.encode('utf-8'), b''),
+        ]) as run:
+            result = k8.get_pods(dc_name='web', namespace='prod')
+            # Cached
+            self.assertEqual(1, len(k8.get_pods(dc_name='web', namespace='prod')))
+
+        self.assertEqual(['web-1'], [pod.name for pod in result])
+        self.assertEqual(2, run.call_count)
+        self.assertEqual(['kubectl', 'get', 'pods', '-o', 'json', '--selector=app=web,tier in (a,b)',
+                          '--namespace=prod'], run.call_args_list[1][0][0])
+
+    def test_pod_cache_invalidation(self):
+        k8 = K8()
+        pods = json.dumps({'items': []}).encode('utf-8')
+        with mock.patch('subprocess.run', return_value=subprocess.CompletedProcess([], 0, pods, b'')) as run:
+            k8.get_pods(pod_name='a')
+            k8.apply('kind: ConfigMap\n')
+            k8.get_pods(pod_name='a')
+            self.assertEqual(2, run.call_count)
+
+            k8.apply('kind: Deployment\n')
+            k8.get_pods(pod_name='a')
+            self.assertEqual(4, run.call_count)
+        self.assertIn('--field-selector=metadata.name=a', run.call_args_list[0][0][0])
+
+    def test_parse_api_resources(self):
+        output = ('NAME          SHORTNAMES   APIVERSION   NAMESPACED   KIND         VERBS                                    CATEGORIES\n'
+                  'bindings                   v1           true         Binding      [create]\n'
+                  'configmaps    cm           v1           true         ConfigMap    [create delete get list patch watch]\n'
+                  'deployments   deploy       apps/v1      true         Deployment   [create delete get list patch watch]   all\n')
+        resources = K8._parse_api_resources(output)
+        self.assertEqual(['bindings', 'configmaps', 'deployments.apps'],
+                         [resource.get_full_name() for resource in resources])
+        self.assertEqual(['create'], resources[0].verbs)
+        self.assertEqual([], resources[0].short_names)
+        self.assertEqual(['deploy'], resources[2].short_names)
+        self.assertEqual('/apis/apps/v1/namespaces/prod/deployments', resources[2].get_path('prod'))
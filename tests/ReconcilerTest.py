@@ -0,0 +1,156 @@
+import json
+import os
+import queue
+import tempfile
+import time
+from typing import Iterator, Optional
+from unittest import TestCase, mock
+
+import yaml
+
+from ok8deploy.config.Config import ProjectConfig, RunMode
+from ok8deploy.deploy.AppDeploy import AppDeployRunner
+from ok8deploy.deploy.Reconciler import Reconciler
+from ok8deploy.oc.Model import ApiResource
+from ok8deploy.oc.Oc import K8Api
+
+
+class WatchedApi(K8Api):
+    def __init__(self):
+        super().__init__()
+        self.applied = []
+        self.events = queue.Queue()
+
+    def find_api_resource(self, kind: str, api_version: Optional[str] = None) -> Optional[ApiResource]:
+        return ApiResource('configmaps', 'v1', 'ConfigMap', True)
+
+    def _get_raw(self, path: str) -> dict:
+        return {'items': [], 'metadata': {'resourceVersion': '1'}}
+
+    def _stream_raw(self, path: str) -> Iterator[str]:
+        while True:
+            line = self.events.get()
+            if line is None:
+                return
+            yield line
+
+    def apply(self, yml: str, namespace: Optional[str] = None) -> str:
+        self.applied.append(yaml.safe_load(yml))
+        return ''
+
+
+class ReconcilerTest(TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._root = self._tmp_dir.name
+        os.makedirs(os.path.join(self._root, 'app'))
+        self._write('_root.yml', {'project': 'test'})
+        self._write('app/_index.yml', {'enabled': True, 'vars': {'VALUE': 'a'}})
+        self._write('app/cm.yml', {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'cm'},
+                                   'data': {'key': '${VALUE}'}})
+        self._api = WatchedApi()
+        patcher = mock.patch.object(ProjectConfig, 'create_oc', return_value=self._api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._api.events.put(None)
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, data: dict):
+        with open(os.path.join(self._root, name), 'w') as f:
+            yaml.dump(data, f)
+
+    def test_reconcile(self):
+        reconciler = Reconciler(self._root, RunMode())
+        self.assertEqual(1, reconciler.reconcile())
+        self.assertEqual('a', self._api.applied[0]['data']['key'])
+
+        # Nothing changed
+        self.assertEqual(0, reconciler.reconcile())
+
+        # Object has been changed in the cluster
+        changed = dict(self._api.applied[0])
+        changed['metadata'] = {'name': 'cm', 'namespace': 'test', 'annotations': {'yml-hash': 'other'}}
+        self._api.events.put(json.dumps({'type': 'MODIFIED', 'object': changed}))
+        self._wait_for_hash(reconciler, 'other')
+        self.assertEqual(1, reconciler.reconcile())
+        self.assertEqual(2, len(self._api.applied))
+
+        # Configuration has been changed
+        self._write('app/_index.yml', {'enabled': True, 'vars': {'VALUE': 'changed'}})
+        self.assertEqual(1, reconciler.reconcile())
+        self.assertEqual('changed', self._api.applied[2]['data']['key'])
+        self.assertEqual(0, reconciler.reconcile())
+
+    def test_no_processes(self):
+        # The watches are running while the project is loaded again
+        with mock.patch.object(ProjectConfig, 'preload', side_effect=AssertionError('preloaded')):
+            reconciler = Reconciler(self._root, RunMode())
+            self.assertEqual(1, reconciler.reconcile())
+            self._write('_root.yml', {'project': 'test', 'vars': {'OTHER': 'a'}})
+            reconciler.reconcile()
+
+    def test_unchanged_inputs_not_hashed(self):
+        reconciler = Reconciler(self._root, RunMode())
+        self.assertEqual(1, reconciler.reconcile())
+        with mock.patch.object(AppDeployRunner, 'get_input_hash', side_effect=AssertionError('hashed')):
+            self.assertEqual(0, reconciler.reconcile())
+
+    def test_plan(self):
+        mode = RunMode()
+        mode.plan = True
+        reconciler = Reconciler(self._root, mode)
+        self.assertEqual(1, reconciler.reconcile())
+        # Only reported once
+        self.assertEqual(0, reconciler.reconcile())
+        self.assertEqual([], self._api.applied)
+
+    def test_plan_template_change(self):
+        os.makedirs(os.path.join(self._root, 'tpl'))
+        os.makedirs(os.path.join(self._root, 'other'))
+        self._write('tpl/_index.yml', {'type': 'template', 'enabled': True})
+        self._write('tpl/svc.yml', {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'tpl'},
+                                    'data': {'key': '1'}})
+        self._write('app/_index.yml', {'enabled': True, 'applyTemplates': ['tpl'], 'vars': {'VALUE': 'a'}})
+        self._write('other/_index.yml', {'enabled': True})
+        mode = RunMode()
+        mode.plan = True
+        reconciler = Reconciler(self._root, mode, app_names=['app'])
+        self.assertEqual(2, reconciler.reconcile())
+        self.assertEqual(['app'], list(reconciler._apps.keys()))
+
+        self._write('tpl/svc.yml', {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'tpl'},
+                                    'data': {'key': '22'}})
+        with self.assertLogs('Reconciler', level='INFO') as logs:
+            self.assertEqual(1, reconciler.reconcile())
+        self.assertIn('Changed ConfigMap/tpl (test)', '\n'.join(logs.output))
+
+    def test_plan_config_map_change(self):
+        os.makedirs(os.path.join(self._root, 'app', 'files'))
+        with open(os.path.join(self._root, 'app', 'files', 'app.properties'), 'w') as f:
+            f.write('key=1\n')
+        self._write('app/_index.yml', {'enabled': True, 'vars': {'VALUE': 'a'},
+                                       'configmaps': [{'name': 'files', 'files': [{'file': 'files/app.properties'}]}]})
+        mode = RunMode()
+        mode.plan = True
+        reconciler = Reconciler(self._root, mode)
+        self.assertEqual(2, reconciler.reconcile())
+
+        # The file is not part of the app folder itself
+        with open(os.path.join(self._root, 'app', 'files', 'app.properties'), 'w') as f:
+            f.write('key=22\n')
+        with self.assertLogs('Reconciler', level='INFO') as logs:
+            self.assertEqual(1, reconciler.reconcile())
+        self.assertIn('Changed ConfigMap/files (test)', '\n'.join(logs.output))
+
+    @staticmethod
+    def _wait_for_hash(reconciler: Reconciler, hash_val: str):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            item = reconciler._live_state.get('ConfigMap', 'cm', 'test')
+            if item is not None and item.get_annotation('yml-hash') == hash_val:
+                return
+            time.sleep(0.01)
+        raise AssertionError('Watch event has not been processed')
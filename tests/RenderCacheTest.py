@@ -0,0 +1,120 @@
+import os
+import tempfile
+from typing import List, Optional
+from unittest import TestCase, mock
+
+import yaml
+
+from ok8deploy.config.Config import ProjectConfig, RunMode
+from ok8deploy.deploy.AppDeploy import AppDeployment, AppDeployRunner
+from ok8deploy.deploy.RenderCache import RenderCache
+from ok8deploy.oc.Model import ItemDescription
+from ok8deploy.oc.Oc import K8Api
+
+
+class RecordingApi(K8Api):
+    def __init__(self):
+        super().__init__()
+        self.applied = []
+
+    def get_all(self, kind: str, namespace: Optional[str] = None) -> List[ItemDescription]:
+        return []
+
+    def apply(self, yml: str, namespace: Optional[str] = None) -> str:
+        self.applied.append(yaml.safe_load(yml))
+        return ''
+
+
+class RenderCacheTest(TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._root = os.path.join(self._tmp_dir.name, 'project')
+        os.makedirs(os.path.join(self._root, 'app'))
+        os.makedirs(os.path.join(self._root, 'template'))
+        self._write('_root.yml', {'project': 'test', 'vars': {'GLOBAL': 'global'}})
+        self._write('template/_index.yml', {'type': 'template', 'enabled': True})
+        self._write('template/cm.yml', {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'template'},
+                                        'data': {'key': '${VALUE}'}})
+        self._write('app/_index.yml', {'enabled': True, 'applyTemplates': ['template'], 'dc': {'name': 'app'},
+                                       'vars': {'VALUE': 'a'},
+                                       'configmaps': [{'name': 'files', 'files': [{'file': 'app.properties'}]}]})
+        with open(os.path.join(self._root, 'app', 'app.properties'), 'w') as f:
+            f.write('key=${GLOBAL}\n')
+
+        patcher = mock.patch.object(RenderCache, '_default', RenderCache(os.path.join(self._tmp_dir.name, 'cache')))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._api = RecordingApi()
+        patcher = mock.patch.object(ProjectConfig, 'create_oc', return_value=self._api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, name: str, data: dict):
+        with open(os.path.join(self._root, name), 'w') as f:
+            yaml.dump(data, f)
+
+    def _create_runner(self, mode: RunMode) -> AppDeployRunner:
+        root_config = ProjectConfig.load(self._root)
+        return AppDeployRunner(root_config, root_config.load_app_config('app'), mode)
+
+    def test_render(self):
+        mode = RunMode()
+        mode.render_cache = True
+        runner = self._create_runner(mode)
+        objects = runner.render().objects
+        self.assertEqual({'template', 'files'}, {data['metadata']['name'] for data in objects})
+        # Only readable by the user
+        entry = os.path.join(self._tmp_dir.name, 'cache', 'objects', runner.get_input_hash()[:2],
+                             runner.get_input_hash() + '.pickle')
+        self.assertEqual(0o600, os.stat(entry).st_mode & 0o777)
+        self.assertEqual(0o700, os.stat(os.path.join(self._tmp_dir.name, 'cache')).st_mode & 0o777)
+
+        # Rendered from the cache
+        with mock.patch.object(AppDeployRunner, '_load_files', side_effect=AssertionError('rendered')):
+            runner = self._create_runner(mode)
+            bundle = runner.render()
+            self.assertEqual(objects, bundle.objects)
+            self.assertEqual(2, len(bundle.get_hashes()))
+            self.assertEqual(2, len(runner.get_source_dirs()))
+
+        # Each input changes the hash
+        inputs = [self._create_runner(mode).get_input_hash()]
+        with open(os.path.join(self._root, 'app', 'app.properties'), 'w') as f:
+            f.write('key=changed\n')
+        inputs.append(self._create_runner(mode).get_input_hash())
+        self._write('template/cm.yml', {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'changed'}})
+        inputs.append(self._create_runner(mode).get_input_hash())
+        self._write('_root.yml', {'project': 'test', 'vars': {'GLOBAL': 'changed'}})
+        inputs.append(self._create_runner(mode).get_input_hash())
+        # A different version of the package renders differently
+        with mock.patch.object(RenderCache, 'get_code_hash', return_value='other'):
+            inputs.append(self._create_runner(mode).get_input_hash())
+        self.assertEqual(5, len(set(inputs)))
+
+        self.assertEqual('changed', self._create_runner(mode).render().objects[0]['metadata']['name'])
+
+    def test_changed_only(self):
+        mode = RunMode()
+        mode.changed_only = True
+        root_config = ProjectConfig.load(self._root)
+        AppDeployment(root_config, root_config.load_app_config('app'), mode).deploy()
+        self.assertEqual(2, len(self._api.applied))
+        # Only the input hash is stored, the objects might contain values of loaders
+        self.assertFalse(os.path.exists(os.path.join(self._tmp_dir.name, 'cache', 'objects')))
+
+        # Skipped without rendering or contacting the cluster
+        with mock.patch.object(AppDeployRunner, 'render', side_effect=AssertionError('rendered')):
+            root_config = ProjectConfig.load(self._root)
+            AppDeployment(root_config, root_config.load_app_config('app'), mode).deploy()
+        self.assertEqual(2, len(self._api.applied))
+
+        self._write('template/cm.yml', {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'template'},
+                                        'data': {'key': 'changed'}})
+        root_config = ProjectConfig.load(self._root)
+        AppDeployment(root_config, root_config.load_app_config('app'), mode).deploy()
+        self.assertEqual(4, len(self._api.applied))
+        self.assertEqual('changed', self._api.applied[2]['data']['key'])
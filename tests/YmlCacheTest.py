@@ -0,0 +1,95 @@
+import os
+import tempfile
+import time
+from unittest import TestCase, mock
+
+import yaml
+
+from ok8deploy.utils.YmlCache import YmlCache
+
+
+class YmlCacheTest(TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._cache_dir = os.path.join(self._tmp_dir.name, 'cache')
+        self._path = os.path.join(self._tmp_dir.name, 'objects.yml')
+        self._write('kind: ConfigMap\n---\n---\nkind: Service\n')
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write(self, content: str):
+        with open(self._path, 'w') as f:
+            f.write(content)
+
+    def test_load_all(self):
+        cache = YmlCache(self._cache_dir)
+        docs = cache.load_all(self._path)
+        self.assertEqual([{'kind': 'ConfigMap'}, {'kind': 'Service'}], docs)
+
+        # Each call returns a copy
+        docs[0]['kind'] = 'Changed'
+        self.assertEqual('ConfigMap', cache.load_all(self._path)[0]['kind'])
+
+        # A new cache (run) uses the stored entry
+        with mock.patch.object(YmlCache, '_parse', side_effect=AssertionError('parsed')):
+            self.assertEqual([{'kind': 'ConfigMap'}, {'kind': 'Service'}], YmlCache(self._cache_dir).load_all(self._path))
+
+    def test_invalidation(self):
+        YmlCache(self._cache_dir).load_all(self._path)
+        self._write('kind: Secret\n')
+        self.assertEqual([{'kind': 'Secret'}], YmlCache(self._cache_dir).load_all(self._path))
+
+        # Broken entries are ignored
+        for root, _, files in os.walk(self._cache_dir):
+            for name in files:
+                with open(os.path.join(root, name), 'wb') as f:
+                    f.write(b'broken')
+        self.assertEqual([{'kind': 'Secret'}], YmlCache(self._cache_dir).load_all(self._path))
+        self.assertEqual({'kind': 'Secret'}, YmlCache(self._cache_dir).load(self._path))
+
+    def test_preload(self):
+        paths = []
+        for index in range(YmlCache.MIN_PRELOAD_FILES):
+            path = os.path.join(self._tmp_dir.name, f'file-{index}.yml')
+            with open(path, 'w') as f:
+                f.write(f'kind: ConfigMap\nindex: {index}\n')
+            paths.append(path)
+        with open(paths[0], 'a') as f:
+            f.write('invalid: [\n')
+        single_path = os.path.join(self._tmp_dir.name, 'single.yml')
+        with open(single_path, 'w') as f:
+            f.write('kind: Service\n')
+
+        cache = YmlCache(self._cache_dir)
+        cache.preload(paths, [single_path], 2)
+        with mock.patch.object(YmlCache, '_parse', side_effect=AssertionError('parsed')):
+            self.assertEqual([{'kind': 'ConfigMap', 'index': 3}], cache.load_all(paths[3]))
+            self.assertEqual({'kind': 'Service'}, cache.load(single_path))
+
+        # The error is raised once the file is used
+        with self.assertRaises(yaml.YAMLError):
+            cache.load_all(paths[0])
+
+    def test_permissions_and_prune(self):
+        cache = YmlCache(self._cache_dir)
+        cache.load_all(self._path)
+        self.assertEqual(0o700, os.stat(self._cache_dir).st_mode & 0o777)
+        entries = [os.path.join(root, name) for root, _, files in os.walk(self._cache_dir) for name in files]
+        self.assertEqual(1, len(entries))
+        self.assertEqual(0o600, os.stat(entries[0]).st_mode & 0o777)
+
+        # Recently used entries are kept
+        cache.prune()
+        self.assertTrue(os.path.isfile(entries[0]))
+
+        # The folder is only checked once per interval
+        unused = time.time() - YmlCache.MAX_ENTRY_AGE - 60
+        os.utime(entries[0], (unused, unused))
+        cache.prune()
+        self.assertTrue(os.path.isfile(entries[0]))
+
+        os.utime(os.path.join(self._cache_dir, '.pruned'), (unused, unused))
+        cache.prune()
+        self.assertFalse(os.path.isfile(entries[0]))
@@ -2,6 +2,7 @@ from unittest import TestCase, mock
 
 from ok8deploy.config.Config import AppConfig
 from ok8deploy.processing.YmlTemplateProcessor import YmlTemplateProcessor
+from ok8deploy.utils.Errors import ConfigError
 
 
 class YmlTemplateProcessorTest(TestCase):
@@ -81,3 +82,56 @@ vars:
         proc.process(data)
         self.assertEqual('hello', data['root']['item'])
         self.assertEqual('value', data['root']['someKey'])
+
+    def test_chained_vars(self):
+        with mock.patch('builtins.open', mock.mock_open(read_data='''
+vars:
+    OBJECT:
+        name: ${VAR_0}
+    ALIAS: ${OBJECT}
+    VAR_0: ${VAR_1}-0
+    VAR_1: ${VAR_2}-1
+    VAR_2: ${VAR_3}-2
+    VAR_3: ${VAR_4}-3
+    VAR_4: ${VAR_5}-4
+    VAR_5: ${VAR_6}-5
+    VAR_6: ${VAR_7}-6
+    VAR_7: ${VAR_8}-7
+    VAR_8: ${VAR_9}-8
+    VAR_9: ${VAR_10}-9
+    VAR_10: ${VAR_11}-10
+    VAR_11: ${VAR_12}-11
+    VAR_12: ${VAR_13}-12
+    VAR_13: ${VAR_14}-13
+    VAR_14: ${VAR_15}-14
+    VAR_15: end
+''')):
+            app_config = AppConfig('', '')
+
+        proc = YmlTemplateProcessor(app_config)
+        data = {'first': '${ALIAS}', 'second': '${ALIAS}'}
+        proc.process(data)
+        expected = 'end-' + '-'.join(str(index) for index in reversed(range(15)))
+        self.assertEqual({'name': expected}, data['first'])
+
+        # Objects aren't shared between the usages
+        data['first']['name'] = 'changed'
+        self.assertEqual({'name': expected}, data['second'])
+        data = {'item': '${OBJECT}'}
+        proc.process(data)
+        self.assertEqual({'name': expected}, data['item'])
+
+    def test_cyclic_vars(self):
+        with mock.patch('builtins.open', mock.mock_open(read_data='''
+vars:
+    A: ${B}
+    B: x-${C}
+    C:
+        item: ${A}
+''')):
+            app_config = AppConfig('', '')
+
+        proc = YmlTemplateProcessor(app_config)
+        with self.assertRaises(ConfigError) as context:
+            proc.process({'item': '${A}'})
+        self.assertIn('A -> B -> C -> A', str(context.exception))
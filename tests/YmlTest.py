@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+import yaml
+
+from ok8deploy.utils.Yml import Yml
+
+
+class YmlTest(TestCase):
+    OBJECTS = [
+        {'kind': 'ConfigMap', 'apiVersion': 'v1', 'metadata': {'name': 'cm', 'labels': {'app': 'a'}},
+         'data': {'config.json': '{"key": "value"}', 'multi': 'line 1\nline 2\n', 'number': '0x1F',
+                  'list': [1, 2.5, True, None, 'yes', '']}},
+        {'kind': 'ConfigMap', 'metadata': {'name': 'unicode'}, 'data': {'text': 'Grüße ' * 30, '': 'empty key'}},
+        {'kind': 'ConfigMap', 'metadata': {'name': 'keys'}, 'data': {'k' * 128: 'long key', 'trail ': ' lead'}},
+        {'kind': 'Deployment', 'spec': {'template': {'spec': {'containers': [
+            {'name': 'app', 'args': ['--flag', 'long ' * 40, '\tescaped'], 'ports': [{'containerPort': 8080}]}]}}}},
+        {'kind': 'Custom', 'spec': {'tuple': (1, 2)}},
+    ]
+
+    def test_dump_identical(self):
+        for data in self.OBJECTS:
+            self.assertEqual(yaml.dump(data, sort_keys=True), Yml.dump(data))
+        self.assertEqual(yaml.dump_all(self.OBJECTS, default_flow_style=False, sort_keys=True),
+                         Yml.dump_all(self.OBJECTS))
+
+    def test_load(self):
+        self.assertEqual([{'a': 1}, {'b': [1, 2]}], Yml.load_all('a: 1\n---\n---\nb: [1, 2]\n'))
+        self.assertEqual(self.OBJECTS[0], Yml.load(Yml.dump(self.OBJECTS[0])))
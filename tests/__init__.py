@@ -0,0 +1,11 @@
+import atexit
+import tempfile
+
+from ok8deploy.deploy.RenderCache import RenderCache
+from ok8deploy.utils.YmlCache import YmlCache
+
+# The tests must not write into the cache folder of the user, parsed files are only cached in memory
+YmlCache.CACHE_DIR = None
+_render_cache_dir = tempfile.TemporaryDirectory()
+atexit.register(_render_cache_dir.cleanup)
+RenderCache.CACHE_DIR = _render_cache_dir.name